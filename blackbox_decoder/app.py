@@ -3,6 +3,7 @@
 """
 
 # Importing the GUI libraries
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
 from PyQt6.QtGui import QGuiApplication
 from PyQt6.QtWidgets import (
     QWidget,
@@ -18,6 +19,7 @@ from PyQt6.QtWidgets import (
     QFileDialog,
     QMessageBox,
     QFrame,
+    QProgressDialog,
 )
 
 from matplotlib.backends.backend_qt5agg import (
@@ -27,14 +29,18 @@ from matplotlib.backends.backend_qt5agg import (
 from matplotlib.figure import Figure
 
 # Importing the decoding libraries
+from blackbox_decoder.blit import FlightCursor
+from blackbox_decoder.downsample import DownsampledAxes, reduce_series
 from blackbox_decoder.log import FlightRecord
+from blackbox_decoder.progress import Cancelled, Progress
 
 from datetime import timedelta
-from typing import List
+import numpy as np
+from typing import Callable, Dict, List, Optional, Tuple
+
 # Importing plotting libraries
 
 import matplotlib
-matplotlib.use("Qt5Agg")
 
 
 class MplCanvas(FigureCanvas):
@@ -64,13 +70,14 @@ class FlightRecordCanvas(FigureCanvas):
     def __init__(self, parent=None, width=5, height=4, dpi=100):
         self.fig = Figure(figsize=(width, height), dpi=dpi)
         self.ax1 = self.fig.add_subplot(241)
-        self.ax2 = self.fig.add_subplot(242)
-        self.ax3 = self.fig.add_subplot(243)
-        self.ax4 = self.fig.add_subplot(244)
+        # The plots of a section share their x axis, zooming one zooms all of them
+        self.ax2 = self.fig.add_subplot(242, sharex=self.ax1)
+        self.ax3 = self.fig.add_subplot(243, sharex=self.ax1)
+        self.ax4 = self.fig.add_subplot(244, sharex=self.ax1)
         self.ax5 = self.fig.add_subplot(245)
-        self.ax6 = self.fig.add_subplot(246)
-        self.ax7 = self.fig.add_subplot(247)
-        self.ax8 = self.fig.add_subplot(248)
+        self.ax6 = self.fig.add_subplot(246, sharex=self.ax5)
+        self.ax7 = self.fig.add_subplot(247, sharex=self.ax5)
+        self.ax8 = self.fig.add_subplot(248, sharex=self.ax5)
 
         # Adding Titles and Labels
 
@@ -112,6 +119,117 @@ class FlightRecordCanvas(FigureCanvas):
         super(FlightRecordCanvas, self).__init__(self.fig)
         self.setParent(parent)
 
+    def subplots(self) -> List:
+        """
+        The 8 subplots, the Rollup plots first
+        """
+        return [
+            self.ax1,
+            self.ax2,
+            self.ax3,
+            self.ax4,
+            self.ax5,
+            self.ax6,
+            self.ax7,
+            self.ax8,
+        ]
+
+
+# The x column and the (subplot, columns, step) plotted of the Rollup and Detail DataFrames
+ROLLUP_X: str = "entryTimeMsecs"
+ROLLUP_SERIES: List[Tuple[int, List[str], bool]] = [
+    (
+        0,
+        [
+            "outVoltX10Avg",
+            "outVoltX10Peak",
+            "tethVoltX10Avg",
+            "tethVoltX10Peak",
+            "battVoltX10Avg",
+            "battVoltX10Peak",
+        ],
+        False,
+    ),
+    (1, ["tethCurrentX10Avg", "tethCurrentX10Peak"], False),
+    (2, ["tethReady", "tethActive", "tethGood", "tethOn"], True),
+    (3, ["battOn", "battDrain", "battKill"], True),
+]
+DETAIL_X: str = "recNumb"
+DETAIL_SERIES: List[Tuple[int, List[str], bool]] = [
+    (4, ["tethVoltX10", "battVoltX10", "outVoltX10"], False),
+    (5, ["tethCurrentX10"], False),
+    (6, ["tethReady", "tethActive", "tethGood", "tethOn"], True),
+    (7, ["battOn", "battDrain", "battKill"], True),
+]
+
+
+def flight_sections(df_list: List) -> List[Tuple]:
+    """
+    The DataFrame, x column and series of each section of a flight, the Rollup first
+    """
+    sections = [(df_list[0], ROLLUP_X, ROLLUP_SERIES)]
+    if len(df_list) > 1:
+        sections.append((df_list[1], DETAIL_X, DETAIL_SERIES))
+    return sections
+
+
+def flight_overview(
+    df_list: List, buckets: int
+) -> Dict[Tuple[int, str], Tuple[np.ndarray, np.ndarray]]:
+    """
+    Downsamples every plotted series of a flight, for plot_flight()
+
+    Args:
+        df_list (List[pd.DataFrame]): The Rollup and, if any, Detail DataFrames of the flight
+        buckets (int): The number of buckets, usually the width of a subplot in pixels
+
+    Returns:
+        Dict[Tuple[int, str], Tuple[np.ndarray, np.ndarray]]: The downsampled x and y values by subplot and column
+    """
+    overview = {}
+    for df, x, series in flight_sections(df_list):
+        x_values = df[x].to_numpy()
+        for i, columns, step in series:
+            for column in columns:
+                overview[(i, column)] = reduce_series(
+                    x_values, df[column].to_numpy(), buckets, step
+                )
+    return overview
+
+
+def plot_flight(
+    plots: List[DownsampledAxes],
+    df_list: List,
+    overview: Optional[Dict[Tuple[int, str], Tuple[np.ndarray, np.ndarray]]] = None,
+):
+    """
+    Plots the DataFrames of a flight on the 8 subplots of a FlightRecordCanvas
+
+    Plotting another flight on the same plots swaps the data of the existing lines, the
+    Detail plots are emptied if the flight has no Detail records.
+
+    Args:
+        plots (List[DownsampledAxes]): The downsampled subplots, the Rollup plots first
+        df_list (List[pd.DataFrame]): The Rollup and, if any, Detail DataFrames of the flight
+        overview (Optional[Dict]): The series already downsampled by flight_overview()
+    """
+    overview = overview or {}
+    if len(df_list) == 1:
+        for i, _, _ in DETAIL_SERIES:
+            plots[i].clear()
+
+    for df, x, series in flight_sections(df_list):
+        x_values = df[x].to_numpy()
+        for i, columns, step in series:
+            for column in columns:
+                plots[i].plot(
+                    x_values,
+                    df[column].to_numpy(),
+                    label=column,
+                    step=step,
+                    overview=overview.get((i, column)),
+                )
+
 
 class PlotWindow(QMainWindow):
     def __init__(self, flight_record: FlightRecord, flight_number: int = 1):
@@ -126,7 +244,6 @@ class PlotWindow(QMainWindow):
         self.setGeometry(0, 0, screen_rect.width(), screen_rect.height())
 
         df_list = flight_record.to_dataframe(flight_number - 1)
-        df = df_list[0]
 
         layout = QVBoxLayout()
 
@@ -140,95 +257,200 @@ class PlotWindow(QMainWindow):
         layout.addWidget(toolbar)
         layout.addWidget(self.flight_record_canvas)
 
-        # Plotting the data
-        x: str = "entryTimeMsecs"
-        voltage: List[str] = [
-            "outVoltX10Avg",
-            "outVoltX10Peak",
-            "tethVoltX10Avg",
-            "tethVoltX10Peak",
-            "battVoltX10Avg",
-            "battVoltX10Peak",
-        ]
-        for v in voltage:
-            df.plot(x=x, y=v, ax=self.flight_record_canvas.ax1, label=v)
-
-        current: List[str] = ["tethCurrentX10Avg", "tethCurrentX10Peak"]
-        for c in current:
-            df.plot(x=x, y=c, ax=self.flight_record_canvas.ax2, label=c)
-
-        tether_flags: List[str] = [
-            "tethReady",
-            "tethActive",
-            "tethGood",
-            "tethOn"
+        # Plotting the data, each series is downsampled to the width of its axes and
+        # again for the visible range on every zoom or pan
+        self.plots = [
+            DownsampledAxes(ax) for ax in self.flight_record_canvas.subplots()
         ]
-        for t in tether_flags:
-            df.plot(
-                x=x,
-                y=t,
-                ax=self.flight_record_canvas.ax3,
-                label=t,
-                drawstyle="steps-post",
-            )
 
-        battery_flags: List[str] = ["battOn", "battDrain", "battKill"]
-        for b in battery_flags:
-            df.plot(
-                x=x,
-                y=b,
-                ax=self.flight_record_canvas.ax4,
-                label=b,
-                drawstyle="steps-post",
+        plot_flight(self.plots, df_list)
+
+        # Setting the layout
+        widget = QWidget()
+        widget.setLayout(layout)
+        self.setCentralWidget(widget)
+
+
+class DecodeWorker(QObject):
+    """
+    The DecodeWorker class runs a decoding task on a background thread
+
+    The task is called with a Progress whose reports are forwarded to the progress signal,
+    cancel() stops the task at its next report. It is safe to call from any thread, but
+    connected to a signal it must be called directly rather than queued to the busy thread
+    of the worker, e.g. by connecting worker.tracker.cancel.
+    """
+
+    progress = pyqtSignal(str, float)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, task: Callable[[Progress], object]):
+        super().__init__()
+        self.task = task
+        self.tracker = Progress(self.progress.emit)
+
+    def run(self):
+        try:
+            result = self.task(self.tracker)
+        except Cancelled:
+            self.cancelled.emit()
+        except Exception as error:
+            self.failed.emit(str(error))
+        else:
+            self.finished.emit(result)
+
+    def cancel(self):
+        self.tracker.cancel()
+
+
+class PrefetchWorker(QObject):
+    """
+    The PrefetchWorker class builds the DataFrames of flights on a background thread
+
+    The plotted series of each flight are also downsampled to the given number of
+    buckets, then the flight is sent to the loaded signal.
+    """
+
+    loaded = pyqtSignal(int, object, object)
+    finished = pyqtSignal()
+
+    def __init__(
+        self, flight_record: FlightRecord, flight_numbers: List[int], buckets: int
+    ):
+        super().__init__()
+        self.flight_record = flight_record
+        self.flight_numbers = flight_numbers
+        self.buckets = buckets
+        self.tracker = Progress()
+
+    def run(self):
+        for flight_number in self.flight_numbers:
+            if self.tracker.cancelled:
+                break
+            df_list = self.flight_record.to_dataframe(flight_number - 1)
+            self.loaded.emit(
+                flight_number, df_list, flight_overview(df_list, self.buckets)
             )
+        self.finished.emit()
 
-        # Detail Plots
-        if len(df_list) > 1:
-            df = df_list[1]
-            x = "recNumb"
-
-            voltage: List[str] = [
-                "tethVoltX10",
-                "battVoltX10",
-                "outVoltX10",
-            ]
-            for v in voltage:
-                df.plot(x=x, y=v, ax=self.flight_record_canvas.ax5, label=v)
-
-            current: List[str] = ["tethCurrentX10"]
-            for c in current:
-                df.plot(x=x, y=c, ax=self.flight_record_canvas.ax6, label=c)
-
-            tether_flags: List[str] = [
-                "tethReady",
-                "tethActive",
-                "tethGood",
-                "tethOn"
-            ]
-            for t in tether_flags:
-                df.plot(
-                    x=x,
-                    y=t,
-                    ax=self.flight_record_canvas.ax7,
-                    label=t,
-                    drawstyle="steps-post",
-                )
+    def cancel(self):
+        self.tracker.cancel()
 
-            battery_flags: List[str] = ["battOn", "battDrain", "battKill"]
-            for b in battery_flags:
-                df.plot(
-                    x=x,
-                    y=b,
-                    ax=self.flight_record_canvas.ax8,
-                    label=b,
-                    drawstyle="steps-post",
-                )
 
-        # Setting the layout
+class MultiFlightWindow(QMainWindow):
+    """
+    The MultiFlightWindow class plots several flights on a single figure
+
+    The subplots and lines are created once, switching flights only swaps the data of the
+    lines. The DataFrames of the other flights are prefetched on a background thread, the
+    FlightRecord is only used by that thread once the window is open. A vertical cursor
+    following the mouse is blitted over the figure.
+    """
+
+    def __init__(self, flight_record: FlightRecord, flight_numbers: List[int]):
+        super().__init__()
+        self.setAutoFillBackground(True)
+
+        # Setting size to the entire screen
+        screen = QGuiApplication.primaryScreen()
+        screen_rect = screen.availableGeometry()
+        self.setGeometry(0, 0, screen_rect.width(), screen_rect.height())
+
+        self.flight_numbers = flight_numbers
+        # The DataFrames and downsampled series of each prefetched flight
+        self.frames: Dict[int, Tuple[List, Dict]] = {
+            flight_numbers[0]: (flight_record.to_dataframe(flight_numbers[0] - 1), {})
+        }
+        # The flight to show once its DataFrames are prefetched
+        self.pending: Optional[int] = None
+
+        layout = QVBoxLayout()
+        selector_layout = QHBoxLayout()
+
+        self.flight_record_canvas = FlightRecordCanvas()
+        toolbar = NavigationToolbar(self.flight_record_canvas, self)
+        self.plots = [
+            DownsampledAxes(ax) for ax in self.flight_record_canvas.subplots()
+        ]
+        self.cursor = FlightCursor(
+            self.flight_record_canvas, self.flight_record_canvas.subplots()
+        )
+
+        # The flight selector
+        self.previous_button = QPushButton("Previous")
+        self.next_button = QPushButton("Next")
+        self.flight_selector = QSpinBox()
+        self.flight_selector.setMinimum(flight_numbers[0])
+        self.flight_selector.setMaximum(flight_numbers[-1])
+        self.status_label = QLabel("")
+
+        selector_layout.addWidget(QLabel("Flight:"))
+        selector_layout.addWidget(self.previous_button)
+        selector_layout.addWidget(self.flight_selector)
+        selector_layout.addWidget(self.next_button)
+        selector_layout.addWidget(self.status_label)
+        selector_layout.addStretch()
+
+        layout.addLayout(selector_layout)
+        layout.addWidget(toolbar)
+        layout.addWidget(self.flight_record_canvas)
+
+        self.previous_button.clicked.connect(lambda: self.flight_selector.stepBy(-1))
+        self.next_button.clicked.connect(lambda: self.flight_selector.stepBy(1))
+        self.flight_selector.valueChanged.connect(self.show_flight)
+
         widget = QWidget()
         widget.setLayout(layout)
         self.setCentralWidget(widget)
 
+        self.show_flight(flight_numbers[0])
+
+        # Prefetching the other flights
+        self.thread = QThread(self)
+        # The canvas is not laid out yet, a subplot is about a quarter of the screen wide
+        self.worker = PrefetchWorker(
+            flight_record, flight_numbers[1:], screen_rect.width() // 4
+        )
+        self.worker.moveToThread(self.thread)
+        self.thread.started.connect(self.worker.run)
+        self.worker.loaded.connect(self.loaded)
+        self.worker.finished.connect(self.thread.quit)
+        self.thread.start()
+
+    def loaded(self, flight_number: int, df_list: List, overview: Dict):
+        """
+        Keeps the prefetched DataFrames of a flight and shows it if it was selected
+        """
+        self.frames[flight_number] = (df_list, overview)
+        if self.pending == flight_number:
+            self.show_flight(flight_number)
+
+    def show_flight(self, flight_number: int):
+        """
+        Swaps the plotted data for the one of another flight
+        """
+        if flight_number not in self.frames:
+            # Shown once the prefetching thread reaches it
+            self.pending = flight_number
+            self.status_label.setText(f"Loading flight {flight_number}...")
+            return
+
+        self.pending = None
+        self.status_label.setText("")
+        self.setWindowTitle(f"Flight Record {flight_number}")
+        plot_flight(self.plots, *self.frames[flight_number])
+        for plot in self.plots:
+            plot.rescale()
+        self.flight_record_canvas.draw_idle()
+
+    def closeEvent(self, event):
+        self.worker.cancel()
+        self.thread.quit()
+        self.thread.wait()
+        super().closeEvent(event)
+
 
 class MainWindow(QMainWindow):
     """
@@ -270,7 +492,7 @@ class MainWindow(QMainWindow):
         settings_layout = QGridLayout()
 
         # Adding the Plot Window
-        self.plot_windows: List[PlotWindow] = []
+        self.plot_windows: List[QMainWindow] = []
 
         # Internal Variables
         self.flight_record = None
@@ -337,6 +559,55 @@ class MainWindow(QMainWindow):
         widget.setLayout(pagelayout)
         self.setCentralWidget(widget)
 
+    def run_in_background(
+        self, task: Callable[[Progress], object], title: str, done: Callable
+    ):
+        """
+        Runs a decoding task on a background thread while a progress dialog is shown
+
+        Args:
+            task (Callable[[Progress], object]): The task, called with its Progress
+            title (str): The label of the progress dialog
+            done (Callable): Called on the GUI thread with the result of the task
+        """
+        self.browse_button.setEnabled(False)
+        self.decode_button.setEnabled(False)
+
+        dialog = QProgressDialog(title, "Cancel", 0, 1000, self)
+        dialog.setMinimumDuration(200)
+        thread = QThread(self)
+        worker = DecodeWorker(task)
+        worker.moveToThread(thread)
+
+        def update(stage: str, fraction: float):
+            dialog.setLabelText(f"{title} ({stage})")
+            dialog.setValue(int(fraction * 1000))
+
+        def finish():
+            dialog.close()
+            thread.quit()
+            self.browse_button.setEnabled(True)
+            self.decode_button.setEnabled(True)
+
+        def failed(error: str):
+            finish()
+            QMessageBox.warning(self, "Error", error)
+
+        thread.started.connect(worker.run)
+        worker.progress.connect(update)
+        worker.finished.connect(finish)
+        worker.finished.connect(done)
+        worker.failed.connect(failed)
+        worker.cancelled.connect(finish)
+        # The worker thread is busy in run(), a slot of the worker would only be called
+        # once the decode is over, so the Event of the tracker is set from this thread
+        dialog.canceled.connect(worker.tracker.cancel)
+        thread.finished.connect(thread.deleteLater)
+
+        # Kept so the worker is not collected while the thread runs
+        self.worker = worker
+        thread.start()
+
     def decode_log_file(self):
         """
         Decodes the lof file and outputs the data into a pandas dataframe
@@ -348,8 +619,21 @@ class MainWindow(QMainWindow):
                 "Please select a log file to decode"
             )
             return
-        # Decoding the log file
-        self.flight_record = FlightRecord(self.file_name)
+        # Decoding the log file on a background thread, the records of each flight are decoded when it is plotted
+        file_name = self.file_name
+        self.run_in_background(
+            lambda progress: FlightRecord(
+                file_name, lazy=True, disk_cache=True, progress=progress
+            ),
+            "Decoding the log file",
+            self.show_flight_record,
+        )
+
+    def show_flight_record(self, flight_record: FlightRecord):
+        """
+        Shows the summary of a decoded flight record
+        """
+        self.flight_record = flight_record
 
         if not self.flight_record:
             QMessageBox.warning(self, "Error", "Error decoding the log file")
@@ -376,7 +660,8 @@ class MainWindow(QMainWindow):
 
     def show_plot_window(self):
         """
-        Shows the plot windows of however many flights are selected
+        Shows the plot window of the selected flight, or a single window switching between
+        the flights when multiple flights are decoded
         """
         if self.flight_record is None:
             QMessageBox.warning(self, "Error", "No flight record to display")
@@ -389,16 +674,31 @@ class MainWindow(QMainWindow):
             self.plot_windows = []
 
         if self.checkbox.isChecked():
-            self.plot_windows = [
-                PlotWindow(self.flight_record, i + 1)
-                for i in range(self.num_flights_selector.value())
-            ]
+            flight_numbers = list(range(1, self.num_flights_selector.value() + 1))
         else:
-            window = PlotWindow(
-                self.flight_record,
-                self.num_flights_selector.value()
-            )
-            self.plot_windows = [window]
+            flight_numbers = [self.num_flights_selector.value()]
+
+        flight_record = self.flight_record
+
+        def build_dataframes(progress: Progress):
+            # The DataFrames are kept by the FlightRecord for the plot window, the other
+            # flights are prefetched by the window once it is open
+            progress.update("dataframes", 0, 1)
+            flight_record.to_dataframe(flight_numbers[0] - 1)
+            return flight_numbers
+
+        self.run_in_background(
+            build_dataframes, "Building the flight data", self.open_plot_windows
+        )
+
+    def open_plot_windows(self, flight_numbers: List[int]):
+        """
+        Opens the plot window of the flights once the DataFrames of the first were built
+        """
+        if len(flight_numbers) > 1:
+            self.plot_windows = [MultiFlightWindow(self.flight_record, flight_numbers)]
+        else:
+            self.plot_windows = [PlotWindow(self.flight_record, flight_numbers[0])]
         for window in self.plot_windows:
             window.show()
 
@@ -420,6 +720,8 @@ class MainWindow(QMainWindow):
 
 
 def main():
+    # The backend of pyplot is only switched when the GUI is launched
+    matplotlib.use("Qt5Agg")
     app = QApplication([])
     window = MainWindow()
     window.show()
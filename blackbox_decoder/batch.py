@@ -0,0 +1,158 @@
+"""
+Batch decoding of whole directories of log files
+
+The logs are spread across a pool of worker processes and the result of each file is
+returned as soon as it is decoded. A file that fails to decode is reported with its
+error instead of stopping the batch. A file whose worker process dies, breaking the pool,
+is found by decoding the files that were in flight again one at a time, and the batch
+goes on in a new pool.
+"""
+
+import datetime
+import glob
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from blackbox_decoder.log import FlightRecord, Log
+
+
+class BatchResult(NamedTuple):
+    """
+    The result of decoding a single log file of a batch
+
+    - path: The path to the log file
+    - drone_name: The name of the drone from the General Info packet
+    - flight_count: The number of flights in the log
+    - flight_time: The total flight time of the log
+    - outputs: The paths of the files written for the log
+    - error: The error raised while decoding, None if the log decoded
+    """
+
+    path: str
+    drone_name: Optional[str] = None
+    flight_count: int = 0
+    flight_time: Optional[datetime.timedelta] = None
+    outputs: Tuple[str, ...] = ()
+    error: Optional[str] = None
+
+
+def find_logs(target: str) -> List[str]:
+    """
+    Finds the log files of a directory or matching a glob pattern
+
+    Args:
+        target (str): A directory, a glob pattern or the path to a single log file
+
+    Returns:
+        List[str]: The sorted paths of the log files
+    """
+    if os.path.isdir(target):
+        target = os.path.join(target, "*.log")
+    return sorted(path for path in glob.glob(target) if os.path.isfile(path))
+
+
+def decode_file(path: str, output_dir: Optional[str] = None) -> BatchResult:
+    """
+    Decodes a single log file, this is the task run by each worker process
+
+    Args:
+        path (str): The path to the log file
+        output_dir (Optional[str]): The directory to write the CSV files of the log to,
+        in a subdirectory named after the log. Nothing is written if None.
+
+    Returns:
+        BatchResult: The summary of the log or the error raised while decoding it
+    """
+    try:
+        log = Log(path)
+        record = FlightRecord(log)
+        outputs: List[str] = []
+        if output_dir is not None:
+            name = os.path.splitext(os.path.basename(path))[0]
+            outputs = log.write_csv(os.path.join(output_dir, name))
+        return BatchResult(
+            path=path,
+            drone_name=record.get_drone_name(),
+            flight_count=len(record),
+            flight_time=record.get_flight_time(),
+            outputs=tuple(outputs),
+        )
+    except Exception as e:
+        return BatchResult(path=path, error=f"{e.__class__.__name__}: {e}")
+
+
+def decode_pool(
+    queue: Deque[str],
+    workers: int,
+    output_dir: Optional[str],
+    broken: List[str],
+) -> Iterator[BatchResult]:
+    """
+    Decodes the queued log files in a pool with at most one file per worker in flight
+
+    When a worker process dies the pool is broken, no more files are submitted and the
+    files that were in flight are added to broken instead of being yielded.
+
+    Args:
+        queue (Deque[str]): The paths to the log files, consumed as they are submitted
+        workers (int): The number of worker processes
+        output_dir (Optional[str]): The directory to write the CSV files of each log to
+        broken (List[str]): Receives the paths of the files in flight when the pool broke
+
+    Yields:
+        BatchResult: The result of each log in the order they finish
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        running: Dict[Future, str] = {}
+        while queue or running:
+            while queue and not broken and len(running) < workers:
+                path = queue.popleft()
+                running[executor.submit(decode_file, path, output_dir)] = path
+            if not running:
+                return
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = running.pop(future)
+                try:
+                    yield future.result()
+                except BrokenProcessPool:
+                    broken.append(path)
+                except Exception as e:
+                    yield BatchResult(path=path, error=f"{e.__class__.__name__}: {e}")
+
+
+def decode_batch(
+    paths: Iterable[str],
+    workers: Optional[int] = None,
+    output_dir: Optional[str] = None,
+) -> Iterator[BatchResult]:
+    """
+    Decodes log files in parallel and yields their results as they finish
+
+    Args:
+        paths (Iterable[str]): The paths to the log files
+        workers (Optional[int]): The number of worker processes, defaults to the number of CPUs
+        output_dir (Optional[str]): The directory to write the CSV files of each log to
+
+    Yields:
+        BatchResult: The result of each log in the order they finish
+    """
+    workers = workers or os.cpu_count() or 1
+    queue = deque(paths)
+    while queue:
+        broken: List[str] = []
+        yield from decode_pool(queue, workers, output_dir, broken)
+
+        # Any of the files in flight may have killed its worker, each is decoded again
+        # alone so only the one that did is reported
+        for path in broken:
+            crashed: List[str] = []
+            yield from decode_pool(deque([path]), 1, output_dir, crashed)
+            if crashed:
+                yield BatchResult(
+                    path=path,
+                    error="BrokenProcessPool: the worker process decoding the log died",
+                )
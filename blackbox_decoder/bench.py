@@ -0,0 +1,416 @@
+"""
+Benchmarks of the stages of decoding a log
+
+A synthetic log of a given size is written with blackbox_decoder.synth, or an existing
+log is read, and each stage of the decoder is timed on it: parsing the rows, decoding the
+packets of each class, splicing the flights, building the DataFrames of every flight and
+writing the CSV files. Each stage records its best wall time over the repeats, the peak
+resident memory while it ran and the rows it handled per second.
+
+The results are saved as JSON so a later commit can be compared against them:
+
+    python -m blackbox_decoder.bench --detail-rows 1000000 --flights 10 --save base.json
+    python -m blackbox_decoder.bench --detail-rows 1000000 --flights 10 --baseline base.json
+
+The comparison exits with 1 when a stage got slower than the threshold.
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from blackbox_decoder.log import (
+    FLIGHT_SECTIONS,
+    Detail,
+    FlightInfo,
+    FlightRecord,
+    GeneralInfo,
+    Log,
+    Rollup,
+)
+from blackbox_decoder.parse import (
+    HEADER,
+    block_payload,
+    iter_records,
+    map_sections,
+    parse_log,
+)
+from blackbox_decoder.synth import write_log
+
+# The version of the layout of the results
+BENCH_VERSION = 1
+
+# The seconds between two samples of the resident memory
+SAMPLE_INTERVAL = 0.005
+
+# The ratio to the baseline time above which a stage is reported as slower
+THRESHOLD = 1.25
+
+# The difference in seconds under which a stage is never reported as slower, the stages
+# of a small log are too short to be timed reliably
+NOISE_SECONDS = 0.01
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss() -> Optional[int]:
+    """
+    The resident memory of the process
+
+    Returns:
+        Optional[int]: The number of bytes, None where /proc is not available
+    """
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def max_rss() -> int:
+    # The peak resident memory of the whole process, in kilobytes on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class MemorySampler:
+    """
+    The MemorySampler class samples the resident memory in a thread while a stage runs
+
+    Where /proc is not available the peak is the one of the whole process.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+
+    def sample(self):
+        while True:
+            self.peak = max(self.peak, rss() or 0)
+            if self.stopped.wait(self.interval):
+                return
+
+    def __enter__(self) -> "MemorySampler":
+        if rss() is not None:
+            self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        if self.thread.is_alive():
+            self.thread.join()
+            self.peak = max(self.peak, rss() or 0)
+        else:
+            self.peak = max_rss()
+
+
+class Stage:
+    """
+    The Stage class keeps the measurements of a benchmarked stage over its repeats
+
+    Args:
+        name (str): The name of the stage, such as "decode/Detail"
+        rows (int): The number of rows handled by the stage
+    """
+
+    def __init__(self, name: str, rows: int = 0):
+        self.name = name
+        self.rows = rows
+        self.seconds: List[float] = []
+        self.peak_rss = 0
+
+    def measure(self, function: Callable[[], Any]) -> Any:
+        """
+        Runs a stage once, timing it and sampling the memory it uses
+
+        Args:
+            function (Callable[[], Any]): The stage
+
+        Returns:
+            Any: The return value of the stage
+        """
+        with MemorySampler() as sampler:
+            start = time.perf_counter()
+            result = function()
+            self.seconds.append(time.perf_counter() - start)
+        self.peak_rss = max(self.peak_rss, sampler.peak)
+        return result
+
+    def result(self) -> Dict[str, Any]:
+        best = min(self.seconds)
+        return {
+            "seconds": best,
+            "peak_rss_mb": self.peak_rss / 2**20,
+            "rows": self.rows,
+            "rows_per_sec": self.rows / best if best > 0 else None,
+        }
+
+
+def decode_stages(path: str, stages: Dict[str, Stage]) -> Log:
+    """
+    Decodes a log with every stage timed
+
+    Args:
+        path (str): The path to the log file
+        stages (Dict[str, Stage]): The stages keyed by name, added if missing
+
+    Returns:
+        Log: The decoded log
+    """
+
+    def stage(name: str, rows: int = 0) -> Stage:
+        if name not in stages:
+            stages[name] = Stage(name, rows)
+        return stages[name]
+
+    data = stage("parse").measure(lambda: parse_log(path))
+    stages["parse"].rows = sum(len(data[header]) for header in HEADER)
+
+    def read() -> Dict[str, bytearray]:
+        # The packed bytes of each section, read the way the Log constructor does
+        payloads = {header: bytearray() for header in HEADER}
+        sections = map_sections(path)
+        if sections is not None:
+            for header in HEADER:
+                for block in sections[header]:
+                    payloads[header] += block_payload(block)
+        else:
+            for header, rec, offset, payload in iter_records(path):
+                payloads[header] += payload
+        return payloads
+
+    payloads = stage("read", stages["parse"].rows).measure(read)
+
+    # The packets of each class are decoded the way Log.decode_sections does
+    log = Log.__new__(Log)
+    log.flight_time = data["Flight Time"]
+    log.gen_info = GeneralInfo.from_bytes(
+        0, 0, bytes(payloads[HEADER[0]][: GeneralInfo.packet_size()])
+    )
+    sections = {
+        "milli_detail": (Detail, HEADER[1]),
+        "minute_rollup": (Rollup, HEADER[2]),
+        "second_rollup": (Rollup, HEADER[3]),
+        "flight_events": (FlightInfo, HEADER[4]),
+    }
+    for packet in (Detail, Rollup, FlightInfo):
+        names = [name for name, (p, _) in sections.items() if p is packet]
+        rows = sum(len(payloads[sections[name][1]]) for name in names)
+
+        def decode(names=names, packet=packet):
+            return {
+                name: Log.decode(packet, payloads[sections[name][1]]) for name in names
+            }
+
+        tables = stage(
+            f"decode/{packet.__name__}", rows // packet.packet_size()
+        ).measure(decode)
+        for name, table in tables.items():
+            setattr(log, name, table)
+    return log
+
+
+def run(path: str, repeat: int = 3) -> Dict[str, Dict[str, Any]]:
+    """
+    Benchmarks every stage of decoding a log
+
+    Args:
+        path (str): The path to the log file
+        repeat (int): The number of times each stage is run, the best time is kept
+
+    Returns:
+        Dict[str, Dict[str, Any]]: The seconds, peak RSS, rows and rows per second of each stage
+    """
+    stages: Dict[str, Stage] = {}
+    for _ in range(repeat):
+        log = decode_stages(path, stages)
+
+        rows = sum(len(getattr(log, section)) for section in FLIGHT_SECTIONS)
+        record = stages.setdefault("splice", Stage("splice", rows)).measure(
+            lambda: FlightRecord(log)
+        )
+
+        def to_dataframes() -> int:
+            record.frames.clear()
+            record.cache.clear()
+            rows = 0
+            for i in range(len(record)):
+                try:
+                    rows += sum(len(frame) for frame in record.to_dataframe(i))
+                except IndexError:
+                    # A flight without Rollup records has no DataFrame
+                    continue
+            return rows
+
+        dataframes = stages.setdefault("to_dataframe", Stage("to_dataframe"))
+        dataframes.rows = dataframes.measure(to_dataframes)
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            rows = 1 + sum(
+                len(getattr(log, section))
+                for section in (*FLIGHT_SECTIONS, "flight_events")
+            )
+            stages.setdefault("write_csv", Stage("write_csv", rows)).measure(
+                lambda: log.write_csv(output_dir)
+            )
+    return {name: stage.result() for name, stage in stages.items()}
+
+
+def git_commit() -> Optional[str]:
+    # The commit being benchmarked, None outside of a git checkout
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(
+    results: Dict[str, Any], baseline: Dict[str, Any], threshold: float = THRESHOLD
+) -> List[str]:
+    """
+    Compares the stages of two benchmarks of the same log
+
+    Args:
+        results (Dict[str, Any]): The results of run() saved by main
+        baseline (Dict[str, Any]): The results to compare against
+        threshold (float): The ratio of the times above which a stage is slower, if it is
+        also slower by more than NOISE_SECONDS
+
+    Returns:
+        List[str]: The names of the stages slower than the baseline
+    """
+    if results["params"] != baseline["params"]:
+        raise ValueError(
+            f"The baseline benchmarked {baseline['params']}, not {results['params']}"
+        )
+    return [
+        name
+        for name, stage in results["stages"].items()
+        if name in baseline["stages"]
+        and stage["seconds"] > threshold * baseline["stages"][name]["seconds"]
+        and stage["seconds"] - baseline["stages"][name]["seconds"] > NOISE_SECONDS
+    ]
+
+
+def report_results(results: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None):
+    print(f"{'stage':<20}{'seconds':>10}{'peak MB':>10}{'rows/s':>14}", end="")
+    print(f"{'baseline':>10}" if baseline else "")
+    for name, stage in results["stages"].items():
+        rate = stage["rows_per_sec"]
+        line = (
+            f"{name:<20}{stage['seconds']:>10.4f}{stage['peak_rss_mb']:>10.1f}"
+            f"{rate if rate is not None else 0:>14,.0f}"
+        )
+        if baseline and name in baseline["stages"]:
+            line += f"{stage['seconds'] / baseline['stages'][name]['seconds']:>9.2f}x"
+        print(line)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the stages of decoding a log"
+    )
+    parser.add_argument(
+        "--log",
+        type=str,
+        default=None,
+        help="Benchmark this log instead of a synthetic one",
+    )
+    parser.add_argument(
+        "--detail-rows",
+        type=int,
+        default=100_000,
+        help="The number of Millisecond detail rows of the synthetic log (default: 100000)",
+    )
+    parser.add_argument(
+        "--flights",
+        type=int,
+        default=1,
+        help="The number of flights of the synthetic log (default: 1)",
+    )
+    parser.add_argument(
+        "-r",
+        "--repeat",
+        type=int,
+        default=3,
+        help="The number of runs of each stage, the best is kept (default: 3)",
+    )
+    parser.add_argument(
+        "--save", type=str, default=None, help="Save the results to this JSON file"
+    )
+    parser.add_argument(
+        "--baseline",
+        type=str,
+        default=None,
+        help="Compare the results to this JSON file saved by --save",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=THRESHOLD,
+        help=f"The ratio to the baseline time of a slower stage (default: {THRESHOLD})",
+    )
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.log is not None:
+            path = args.log
+            params: Dict[str, Any] = {"log": os.path.abspath(path)}
+        else:
+            path = os.path.join(directory, "synthetic.log")
+            params = {"detail_rows": args.detail_rows, "flights": args.flights}
+            start = time.perf_counter()
+            write_log(path, args.detail_rows, args.flights)
+            print(
+                f"Wrote {path} ({os.path.getsize(path) / 2**20:.1f} MB) in "
+                f"{time.perf_counter() - start:.2f} s",
+                file=sys.stderr,
+            )
+        params["bytes"] = os.path.getsize(path)
+        results = {
+            "version": BENCH_VERSION,
+            "commit": git_commit(),
+            "python": sys.version.split()[0],
+            "params": params,
+            "stages": run(path, args.repeat),
+        }
+
+    baseline = None
+    if args.baseline is not None:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    report_results(results, baseline)
+
+    if args.save is not None:
+        with open(args.save, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if baseline is not None:
+        slower = compare(results, baseline, args.threshold)
+        if slower:
+            print(
+                f"Slower than {args.baseline} ({baseline.get('commit')}): "
+                + ", ".join(slower),
+                file=sys.stderr,
+            )
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
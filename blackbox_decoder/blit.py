@@ -0,0 +1,135 @@
+"""
+Blitted interactive updates of the plots
+
+Redrawing a figure of 8 subplots takes tens of milliseconds, too slow to follow the
+mouse. The BlitManager keeps a copy of the rendered figure, taken on every full draw,
+and only draws its animated artists on top of it. The FlightCursor uses it to move a
+vertical cursor across the axes sharing an x axis with the one under the mouse.
+"""
+
+from typing import List, Optional, Sequence
+
+from matplotlib.lines import Line2D
+
+
+class BlitManager:
+    """
+    The BlitManager class redraws a few animated artists over a saved background
+
+    Args:
+        canvas (matplotlib.backend_bases.FigureCanvasBase): The canvas of the figure
+        artists (Sequence[matplotlib.artist.Artist]): The animated artists
+    """
+
+    def __init__(self, canvas, artists: Sequence = ()):
+        self.canvas = canvas
+        self.background = None
+        self.artists: List = []
+        for artist in artists:
+            self.add_artist(artist)
+        self.cid = canvas.mpl_connect("draw_event", self.on_draw)
+
+    def add_artist(self, artist):
+        """
+        Adds an artist drawn by the BlitManager instead of the full draws of the figure
+
+        Args:
+            artist (matplotlib.artist.Artist): The artist, it must belong to the figure of the canvas
+
+        Returns:
+            None
+        """
+        artist.set_animated(True)
+        self.artists.append(artist)
+
+    def on_draw(self, event=None):
+        """
+        Saves the freshly drawn figure as the background and draws the artists over it
+
+        Args:
+            event (matplotlib.backend_bases.DrawEvent): The draw event, passed by the callback
+
+        Returns:
+            None
+        """
+        self.background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self.draw_artists()
+
+    def draw_artists(self):
+        figure = self.canvas.figure
+        for artist in self.artists:
+            figure.draw_artist(artist)
+
+    def update(self):
+        """
+        Redraws the artists over the background and blits the figure to the screen
+
+        The figure is drawn in full if it was never drawn before.
+
+        Returns:
+            None
+        """
+        if self.background is None:
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self.background)
+        self.draw_artists()
+        self.canvas.blit(self.canvas.figure.bbox)
+        self.canvas.flush_events()
+
+
+class FlightCursor:
+    """
+    The FlightCursor class draws a vertical cursor following the mouse
+
+    The cursor is drawn on every axes sharing the x axis of the one under the mouse, so
+    the same instant is marked on all the plots of a section.
+
+    Args:
+        canvas (matplotlib.backend_bases.FigureCanvasBase): The canvas of the figure
+        axes (Sequence[matplotlib.axes.Axes]): The axes to draw the cursor on
+    """
+
+    def __init__(self, canvas, axes: Sequence):
+        # Added as artists so the cursor never changes the data limits of the axes
+        self.lines = {
+            ax: ax.add_artist(
+                Line2D(
+                    [0, 0],
+                    [0, 1],
+                    transform=ax.get_xaxis_transform(),
+                    color="gray",
+                    linewidth=0.8,
+                    visible=False,
+                )
+            )
+            for ax in axes
+        }
+        self.blit = BlitManager(canvas, self.lines.values())
+        self.cid = canvas.mpl_connect("motion_notify_event", self.on_move)
+
+    def move(self, ax, x: Optional[float]):
+        """
+        Moves the cursor of the axes sharing the x axis of an axes
+
+        Args:
+            ax (matplotlib.axes.Axes): The axes under the mouse, or None to hide the cursor
+            x (Optional[float]): The x position of the cursor
+
+        Returns:
+            None
+        """
+        shared = ax.get_shared_x_axes().get_siblings(ax) if ax is not None else []
+        for other, line in self.lines.items():
+            if other in shared and x is not None:
+                line.set_xdata([x, x])
+                line.set_visible(True)
+            else:
+                line.set_visible(False)
+        self.blit.update()
+
+    def on_move(self, event):
+        if event.inaxes in self.lines:
+            self.move(event.inaxes, event.xdata)
+        elif any(line.get_visible() for line in self.lines.values()):
+            self.move(None, None)
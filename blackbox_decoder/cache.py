@@ -0,0 +1,235 @@
+"""
+Persistent on-disk cache of decoded logs
+
+The decoded arrays of a log are saved to an uncompressed .npz file named after the hash of
+the content of the log, in a directory named after the version of the decoder layouts.
+An index maps the path, size and modification time of each log to its hash so an
+unchanged log is found without reading it again. The least recently used entries are
+evicted once the cache grows past its maximum size.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+# Bumped whenever the saved arrays change meaning
+CACHE_VERSION = 1
+
+# The default maximum size of the cache in bytes
+CACHE_SIZE = 2 << 30
+
+
+def cache_dir() -> str:
+    """
+    The default directory of the cache, set with the BLACKBOX_CACHE_DIR variable
+
+    Returns:
+        str: The path to the directory
+    """
+    default = os.path.join(os.path.expanduser("~"), ".cache", "blackbox_decoder")
+    return os.environ.get("BLACKBOX_CACHE_DIR", default)
+
+
+def layout_version(packets: Iterable[type]) -> str:
+    """
+    A fingerprint of the layouts of the packet classes, a change to any of the size structs
+    invalidates the cache
+
+    Args:
+        packets (Iterable[type]): The packet classes
+
+    Returns:
+        str: The fingerprint
+    """
+    layouts = [
+        (
+            packet.__name__,
+            packet.packet_size(),
+            packet.start_bit(),
+            list(packet.get_size_struct().items()),
+            list(packet.scaled_fields),
+        )
+        for packet in packets
+    ]
+    digest = hashlib.blake2b(repr((CACHE_VERSION, layouts)).encode(), digest_size=8)
+    return digest.hexdigest()
+
+
+def file_hash(path: str) -> str:
+    """
+    The hash of the content of a file
+
+    Args:
+        path (str): The path to the file
+
+    Returns:
+        str: The hex digest of the file
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class LogCache:
+    """
+    The LogCache class saves and loads the decoded arrays of log files
+
+    Args:
+        directory (Optional[str]): The directory of the cache, defaults to cache_dir()
+        max_size (Optional[int]): The maximum size of the cache in bytes, defaults to the
+        BLACKBOX_CACHE_SIZE variable or CACHE_SIZE
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_size: Optional[int] = None):
+        self.directory = directory if directory is not None else cache_dir()
+        if max_size is None:
+            max_size = int(os.environ.get("BLACKBOX_CACHE_SIZE", CACHE_SIZE))
+        self.max_size = max_size
+        self.index_path = os.path.join(self.directory, "index.json")
+
+    def read_index(self) -> Dict[str, list]:
+        try:
+            with open(self.index_path, "r") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def write_index(self, index: Dict[str, list]):
+        self.replace(
+            self.index_path, lambda file: file.write(json.dumps(index).encode())
+        )
+
+    def replace(self, path: str, write):
+        """
+        Writes a file atomically through a temporary file in the same directory
+
+        Args:
+            path (str): The path to the file
+            write (Callable): A function writing the content to a binary file object
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                write(file)
+            os.replace(temp, path)
+        except BaseException:
+            os.unlink(temp)
+            raise
+
+    def key(self, path: str) -> str:
+        """
+        The content hash of a log, read from the index when its size and modification time
+        did not change
+
+        Args:
+            path (str): The path to the log file
+
+        Returns:
+            str: The hash of the log
+        """
+        stat = os.stat(path)
+        signature = [stat.st_size, stat.st_mtime_ns]
+        index = self.read_index()
+        entry = index.get(os.path.abspath(path))
+        if entry is not None and entry[:2] == signature:
+            return entry[2]
+
+        digest = file_hash(path)
+        index[os.path.abspath(path)] = signature + [digest]
+        self.write_index(index)
+        return digest
+
+    def entry_path(self, path: str, layout: str) -> str:
+        return os.path.join(self.directory, layout, self.key(path) + ".npz")
+
+    def load(self, path: str, layout: str) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Loads the arrays saved for a log
+
+        Args:
+            path (str): The path to the log file
+            layout (str): The layout version of the decoder
+
+        Returns:
+            Optional[Dict[str, np.ndarray]]: The saved arrays or None if the log is not cached
+        """
+        entry = self.entry_path(path, layout)
+        if not os.path.exists(entry):
+            return None
+        try:
+            with np.load(entry, allow_pickle=False) as npz:
+                arrays = {name: npz[name] for name in npz.files}
+        except Exception:
+            # A truncated or corrupt entry is removed so the log is decoded again
+            self.remove(path, layout)
+            return None
+        # Mark the entry as recently used
+        os.utime(entry)
+        return arrays
+
+    def remove(self, path: str, layout: str):
+        """
+        Removes the entry of a log, such as one that could not be loaded
+
+        Args:
+            path (str): The path to the log file
+            layout (str): The layout version of the decoder
+        """
+        try:
+            os.unlink(self.entry_path(path, layout))
+        except FileNotFoundError:
+            pass
+
+    def store(self, path: str, layout: str, arrays: Dict[str, np.ndarray]):
+        """
+        Saves the arrays of a log and evicts the least recently used entries
+
+        Args:
+            path (str): The path to the log file
+            layout (str): The layout version of the decoder
+            arrays (Dict[str, np.ndarray]): The arrays to save
+        """
+        self.replace(
+            self.entry_path(path, layout), lambda file: np.savez(file, **arrays)
+        )
+        self.evict()
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache fits its maximum size
+        """
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".npz"):
+                    stat = os.stat(os.path.join(root, name))
+                    entries.append(
+                        (stat.st_mtime, stat.st_size, os.path.join(root, name))
+                    )
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        removed = set()
+        for _, size, entry in entries:
+            if total <= self.max_size:
+                break
+            os.unlink(entry)
+            removed.add(os.path.basename(entry)[: -len(".npz")])
+            total -= size
+
+        if removed:
+            index = self.read_index()
+            self.write_index(
+                {
+                    path: entry
+                    for path, entry in index.items()
+                    if entry[2] not in removed
+                }
+            )
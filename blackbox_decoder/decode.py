@@ -0,0 +1,414 @@
+"""
+Vectorized decoding of the fixed size log packets
+
+Instead of building a BitStream per record, all of the hex rows of a section are packed
+into a single (N, packet_size) uint8 array and every field is extracted for every row
+at once using shifts and masks. The get_size_struct() of each packet class in
+blackbox_decoder.log is compiled once, when the class is created, into a PacketLayout
+holding the word index, shifts, mask and sign bit of every field.
+"""
+
+from typing import Dict, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+
+def decode_text(raw: bytes) -> str:
+    """
+    Decodes a byte field stored in reverse order into a string
+
+    Args:
+        raw (bytes): The raw bytes of the field
+
+    Returns:
+        str: The decoded string or "ERROR" if the bytes are not valid utf-8
+    """
+    try:
+        return raw.decode("utf-8")[::-1]
+    except UnicodeDecodeError:
+        return "ERROR"
+
+
+def encode_text(text: str, size: int) -> bytes:
+    """
+    Encodes a string into a byte field stored in reverse order, the inverse of decode_text
+
+    Args:
+        text (str): The string
+        size (int): The size of the field in bytes
+
+    Returns:
+        bytes: The reversed utf-8 bytes, padded with zeros on the left to the size of the field
+    """
+    raw = text[::-1].encode("utf-8")[:size]
+    return raw.rjust(size, b"\x00")
+
+
+def pack_rows(rows: Sequence[str], packet_size: int) -> np.ndarray:
+    """
+    Packs the hex words of each row into a single array of bytes
+
+    Args:
+        rows (Sequence[str]): The rows of a section as returned by parse_log
+        packet_size (int): The size of a packet in bytes
+
+    Returns:
+        np.ndarray: A (N, packet_size) array of uint8
+    """
+    # bytes.fromhex skips the whitespace between the hex words
+    payload = bytes.fromhex(" ".join(row.split(None, 2)[2] for row in rows))
+    return np.frombuffer(payload, dtype=np.uint8).reshape(-1, packet_size)
+
+
+def packed_view(buffer, packet_size: int, offset: int = 0) -> np.ndarray:
+    """
+    Views the packets of a buffer as a packed array without copying them
+
+    Args:
+        buffer: Any object supporting the buffer protocol, such as bytes, a memoryview or an mmap of a flash dump
+        packet_size (int): The size of a packet in bytes
+        offset (int): The byte position of the first packet in the buffer
+
+    Returns:
+        np.ndarray: A (N, packet_size) array of uint8 sharing the memory of the buffer
+    """
+    view = memoryview(buffer).cast("B")[offset:]
+    if len(view) % packet_size:
+        raise ValueError(
+            f"The buffer holds {len(view)} bytes, not a whole number of {packet_size} byte packets"
+        )
+    return np.frombuffer(view, dtype=np.uint8).reshape(-1, packet_size)
+
+
+def decode_section(
+    packet: type, rows: Sequence[str], scale: bool = True
+) -> Dict[str, np.ndarray]:
+    """
+    Decodes all of the rows of a section into column arrays
+
+    The values match the ones of the per record classes: the X10 fields are divided by
+    10 and byte fields are decoded into strings.
+
+    Args:
+        packet (type): The packet class of the section (Detail, Rollup or FlightInfo)
+        rows (Sequence[str]): The rows of the section as returned by parse_log
+        scale (bool): Whether to divide the X10 fields by 10, otherwise the raw integers are kept
+
+    Returns:
+        Dict[str, np.ndarray]: A dictionary where the key is the name of the field and the value is the column
+    """
+    return decode_packed(packet, pack_rows(rows, packet.packet_size()), scale)
+
+
+class FieldPlan(NamedTuple):
+    """
+    The precomputed extraction of a field from the 64 bit big endian words of a packet
+    """
+
+    name: str
+    kind: str  # "uint", "int" or "bytes"
+    pos: int  # The first bit of the field in the packet
+    size: int  # The size of the field in bits
+    word: int  # The index of the word holding the first bit
+    left: int  # The number of bits of the field spilling into the next word
+    right: int  # The right shift aligning the field in its word
+    mask: int
+    sign: int  # The sign bit of an "int" field, 0 otherwise
+    scaled: bool  # Whether the field is stored as ten times its value
+    shift: int  # The right shift aligning the field in the whole packet
+
+
+class PacketLayout:
+    """
+    The PacketLayout class is the compiled plan of the fields of a packet class
+
+    The size struct of the packet is walked once, in the order the fields are stored
+    and from the alignment bit of the packet, into the word index, shifts, mask and
+    sign bit of every field. Every packet type is then decoded by the same routines.
+
+    Args:
+        packet (type): The packet class, its get_size_struct(), packet_size(),
+        start_bit(), scaled_fields and reversed_fields define the layout
+    """
+
+    def __init__(self, packet: type):
+        self.name = packet.__name__
+        self.packet_size = packet.packet_size()
+        self.words = -(-self.packet_size // 8)
+        size_struct = packet.get_size_struct()
+
+        fields = (
+            reversed(size_struct.items())
+            if packet.reversed_fields
+            else size_struct.items()
+        )
+        plans: Dict[str, FieldPlan] = {}
+        pos = packet.start_bit()
+        for key, (fmt, size) in fields:
+            kind = fmt.split(":")[0]
+            offset = pos % 64
+            left = max(0, offset + size - 64)
+            plans[key] = FieldPlan(
+                name=key,
+                kind=kind,
+                pos=pos,
+                size=size,
+                word=pos // 64,
+                left=left,
+                right=64 - offset - size + left,
+                mask=(1 << size) - 1,
+                sign=1 << (size - 1) if kind == "int" else 0,
+                scaled=key in packet.scaled_fields,
+                shift=8 * self.packet_size - pos - size,
+            )
+            pos += size
+
+        # The fields in their original order in the C code
+        self.fields = {key: plans[key] for key in size_struct}
+
+    def to_words(self, packed: np.ndarray) -> np.ndarray:
+        """
+        Views the rows of a packed array as big endian 64 bit words
+
+        Args:
+            packed (np.ndarray): A (N, packet_size) array of uint8
+
+        Returns:
+            np.ndarray: A (N, words) array of big endian uint64, padded with zeros when
+            the packet is not a whole number of words
+        """
+        if self.packet_size % 8:
+            padded = np.zeros((len(packed), 8 * self.words), dtype=np.uint8)
+            padded[:, : self.packet_size] = packed
+            packed = padded
+        return np.ascontiguousarray(packed).view(">u8")
+
+    def decode_field(
+        self, packed: np.ndarray, key: str, scale: bool = True, words=None
+    ) -> np.ndarray:
+        """
+        Decodes a single field of an array of packed records
+
+        Args:
+            packed (np.ndarray): A (N, packet_size) array of uint8
+            key (str): The name of the field
+            scale (bool): Whether to divide the X10 fields by 10, otherwise the raw integers are kept
+            words (Optional[np.ndarray]): The words of the packed array if already computed
+
+        Returns:
+            np.ndarray: The column of the field
+        """
+        plan = self.fields[key]
+        if plan.kind == "bytes":
+            raw = packed[:, plan.pos // 8 : (plan.pos + plan.size) // 8]
+            return np.array([decode_text(bytes(row)) for row in raw], dtype=object)
+
+        if words is None:
+            words = self.to_words(packed)
+        value = words[:, plan.word]
+        if plan.left:
+            value = (value << np.uint64(plan.left)) | (
+                words[:, plan.word + 1] >> np.uint64(64 - plan.left)
+            )
+        value = ((value >> np.uint64(plan.right)) & np.uint64(plan.mask)).astype(
+            np.int64
+        )
+        if plan.sign:
+            # Sign extension of the two's complement value
+            value = (value ^ plan.sign) - plan.sign
+        if scale and plan.scaled:
+            value = value / 10
+        return value
+
+    def decode_packed(
+        self, packed: np.ndarray, scale: bool = True
+    ) -> Dict[str, np.ndarray]:
+        """
+        Decodes every field of an array of packed records
+
+        Args:
+            packed (np.ndarray): A (N, packet_size) array of uint8
+            scale (bool): Whether to divide the X10 fields by 10, otherwise the raw integers are kept
+
+        Returns:
+            Dict[str, np.ndarray]: The column of every field
+        """
+        words = self.to_words(packed)
+        return {
+            key: self.decode_field(packed, key, scale, words) for key in self.fields
+        }
+
+    def decode_values(self, buffer, scale: bool = True) -> Tuple:
+        """
+        Decodes a single packet straight from its bytes
+
+        The packet is read as one big integer and every field is shifted and masked out of it.
+
+        Args:
+            buffer: The bytes of the packet, any object supporting the buffer protocol
+            scale (bool): Whether to divide the X10 fields by 10, otherwise the raw integers are kept
+
+        Returns:
+            Tuple: The value of each field in its original order in the C code
+        """
+        view = memoryview(buffer).cast("B")
+        if len(view) != self.packet_size:
+            raise ValueError(
+                f"A {self.name} packet is {self.packet_size} bytes, got {len(view)}"
+            )
+        value = int.from_bytes(view, "big")
+
+        values = []
+        for plan in self.fields.values():
+            if plan.kind == "bytes":
+                raw = bytes(view[plan.pos // 8 : (plan.pos + plan.size) // 8])
+                values.append(decode_text(raw))
+                continue
+            field = (value >> plan.shift) & plan.mask
+            if field & plan.sign:
+                field -= plan.sign << 1
+            values.append(field / 10 if scale and plan.scaled else field)
+        return tuple(values)
+
+    def decode_record(
+        self, buffer, scale: bool = True
+    ) -> Dict[str, Union[int, float, str]]:
+        """
+        Decodes a single packet straight from its bytes into a dictionary
+
+        Args:
+            buffer: The bytes of the packet, any object supporting the buffer protocol
+            scale (bool): Whether to divide the X10 fields by 10, otherwise the raw integers are kept
+
+        Returns:
+            Dict[str, Union[int, float, str]]: The value of each field in its original order in the C code
+        """
+        return dict(zip(self.fields, self.decode_values(buffer, scale)))
+
+    def encode_packed(
+        self, columns: Dict[str, np.ndarray], rows: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Packs the raw values of every field into packets, the inverse of decode_packed
+
+        Args:
+            columns (Dict[str, np.ndarray]): The raw column of each field, the X10 fields
+            as stored and byte fields as strings. A missing field is packed as zeros
+            rows (Optional[int]): The number of packets, the length of the columns by default
+
+        Returns:
+            np.ndarray: A (N, packet_size) array of uint8
+        """
+        if rows is None:
+            rows = len(next(iter(columns.values())))
+        words = np.zeros((rows, self.words), dtype=np.uint64)
+        texts = []
+        for key, plan in self.fields.items():
+            if key not in columns:
+                continue
+            if plan.kind == "bytes":
+                texts.append((plan, columns[key]))
+                continue
+            value = np.asarray(columns[key]).astype(np.int64) & plan.mask
+            value = value.astype(np.uint64)
+            if plan.left:
+                words[:, plan.word] |= value >> np.uint64(plan.left)
+                words[:, plan.word + 1] |= (
+                    value & np.uint64((1 << plan.left) - 1)
+                ) << np.uint64(64 - plan.left)
+            else:
+                words[:, plan.word] |= value << np.uint64(plan.right)
+
+        packed = words.astype(">u8").view(np.uint8)[:, : self.packet_size].copy()
+        for plan, column in texts:
+            lo, hi = plan.pos // 8, (plan.pos + plan.size) // 8
+            for row, text in enumerate(column):
+                packed[row, lo:hi] = np.frombuffer(encode_text(text, hi - lo), np.uint8)
+        return packed
+
+    def encode_values(self, values: Dict[str, Union[int, float, str]]) -> bytes:
+        """
+        Packs the values of a single packet, the inverse of decode_record
+
+        Args:
+            values (Dict[str, Union[int, float, str]]): The decoded value of each field,
+            the X10 fields divided by 10. A missing field is packed as zeros
+
+        Returns:
+            bytes: The bytes of the packet
+        """
+        columns = {}
+        for key, value in values.items():
+            plan = self.fields[key]
+            if plan.scaled:
+                value = round(value * 10)
+            columns[key] = [value] if plan.kind == "bytes" else np.array([value])
+        return self.encode_packed(columns, 1).tobytes()
+
+
+def field_layout(packet: type) -> Dict[str, Tuple[int, str, int]]:
+    """
+    The position of every field of a packet
+
+    Args:
+        packet (type): The packet class (Detail, Rollup or FlightInfo)
+
+    Returns:
+        Dict[str, Tuple[int, str, int]]: The first bit, kind ("uint", "int" or "bytes") and size in bits of each field
+    """
+    return {
+        key: (plan.pos, plan.kind, plan.size)
+        for key, plan in packet.layout.fields.items()
+    }
+
+
+def decode_field(
+    packet: type, packed: np.ndarray, key: str, scale: bool = True
+) -> np.ndarray:
+    """
+    Decodes a single field of an array of packed records
+
+    Args:
+        packet (type): The packet class of the section (Detail, Rollup or FlightInfo)
+        packed (np.ndarray): A (N, packet_size) array of uint8
+        key (str): The name of the field
+        scale (bool): Whether to divide the X10 fields by 10, otherwise the raw integers are kept
+
+    Returns:
+        np.ndarray: The column of the field
+    """
+    return packet.layout.decode_field(packed, key, scale)
+
+
+def decode_packed(
+    packet: type, packed: np.ndarray, scale: bool = True
+) -> Dict[str, np.ndarray]:
+    """
+    Decodes an array of packed records into column arrays
+
+    Args:
+        packet (type): The packet class of the section (Detail, Rollup or FlightInfo)
+        packed (np.ndarray): A (N, packet_size) array of uint8
+        scale (bool): Whether to divide the X10 fields by 10, otherwise the raw integers are kept
+
+    Returns:
+        Dict[str, np.ndarray]: A dictionary where the key is the name of the field and the value is the column
+    """
+    return packet.layout.decode_packed(packed, scale)
+
+
+def decode_record(
+    packet: type, buffer, scale: bool = True
+) -> Dict[str, Union[int, float, str]]:
+    """
+    Decodes a single packet straight from its bytes
+
+    Args:
+        packet (type): The packet class (Detail, Rollup or FlightInfo)
+        buffer: The bytes of the packet, any object supporting the buffer protocol
+        scale (bool): Whether to divide the X10 fields by 10, otherwise the raw integers are kept
+
+    Returns:
+        Dict[str, Union[int, float, str]]: The value of each field in its original order in the C code
+    """
+    return packet.layout.decode_record(buffer, scale)
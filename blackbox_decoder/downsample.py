@@ -0,0 +1,334 @@
+"""
+Downsampling of the plotted series to about one point per pixel
+
+Analog channels are reduced to the minimum and maximum of each pixel wide bucket, which
+keeps the envelope of the signal and every spike visible. Step flags only keep the rows
+where their value changes, which draws exactly the same steps. The series of an Axes are
+downsampled again for the visible range whenever its x limits change, so zooming in with
+the navigation toolbar brings back the full detail.
+"""
+
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# Series with fewer points per bucket are plotted as they are
+MIN_POINTS_PER_BUCKET = 4
+
+
+def visible_range(x: np.ndarray, lo: float, hi: float) -> Tuple[int, int]:
+    """
+    The rows of a sorted series within the x limits of a view
+
+    One row is kept on each side of the limits so the lines reach the edges of the view.
+
+    Args:
+        x (np.ndarray): The sorted x values
+        lo (float): The lower x limit
+        hi (float): The upper x limit
+
+    Returns:
+        Tuple[int, int]: The start and stop of the visible rows
+    """
+    start = max(int(np.searchsorted(x, lo, side="left")) - 1, 0)
+    stop = min(int(np.searchsorted(x, hi, side="right")) + 1, len(x))
+    return start, stop
+
+
+def is_sorted(x: np.ndarray) -> bool:
+    """
+    Whether the x values of a series never decrease
+
+    Args:
+        x (np.ndarray): The x values
+
+    Returns:
+        bool: True if the series is sorted
+    """
+    return len(x) < 2 or bool(np.all(x[1:] >= x[:-1]))
+
+
+def bucket_starts(x: np.ndarray, buckets: int) -> np.ndarray:
+    """
+    The first row of each non empty bucket of a series
+
+    A sorted series is split into buckets of equal width in x, any other series into
+    buckets of an equal number of rows.
+
+    Args:
+        x (np.ndarray): The x values
+        buckets (int): The number of buckets, usually the width of the Axes in pixels
+
+    Returns:
+        np.ndarray: The first row of each bucket
+    """
+    if is_sorted(x) and len(x) > 1:
+        edges = np.linspace(x[0], x[-1], buckets + 1)
+        starts = np.searchsorted(x, edges[:-1], side="left")
+    else:
+        starts = np.linspace(0, len(x), buckets + 1).astype(np.int64)[:-1]
+    return np.unique(starts[starts < len(x)])
+
+
+def first_in_bucket(mask: np.ndarray, bucket: np.ndarray) -> np.ndarray:
+    """
+    The first row of each bucket where a mask is set
+
+    Args:
+        mask (np.ndarray): The rows to choose from
+        bucket (np.ndarray): The bucket of each row
+
+    Returns:
+        np.ndarray: The chosen rows
+    """
+    rows = np.flatnonzero(mask)
+    _, first = np.unique(bucket[rows], return_index=True)
+    return rows[first]
+
+
+def minmax(x: np.ndarray, y: np.ndarray, buckets: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Reduces an analog series to the minimum and maximum of each bucket
+
+    Args:
+        x (np.ndarray): The x values
+        y (np.ndarray): The y values
+        buckets (int): The number of buckets, usually the width of the Axes in pixels
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The x and y values of the kept rows, in their original order
+    """
+    if len(x) <= MIN_POINTS_PER_BUCKET * buckets:
+        return x, y
+
+    starts = bucket_starts(x, buckets)
+    bucket = np.repeat(np.arange(len(starts)), np.diff(starts, append=len(x)))
+    lows = np.minimum.reduceat(y, starts)
+    highs = np.maximum.reduceat(y, starts)
+
+    rows = np.unique(
+        np.concatenate(
+            [
+                first_in_bucket(y == lows[bucket], bucket),
+                first_in_bucket(y == highs[bucket], bucket),
+                [0, len(x) - 1],
+            ]
+        )
+    )
+    return x[rows], y[rows]
+
+
+def steps(x: np.ndarray, y: np.ndarray, buckets: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Reduces a step series, drawn with drawstyle="steps-post", to the rows where it changes
+
+    A series changing more often than twice per bucket is reduced to its minimum and
+    maximum per bucket instead.
+
+    Args:
+        x (np.ndarray): The x values
+        y (np.ndarray): The y values
+        buckets (int): The number of buckets, usually the width of the Axes in pixels
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The x and y values of the kept rows, in their original order
+    """
+    if len(x) <= MIN_POINTS_PER_BUCKET * buckets:
+        return x, y
+
+    changes = np.flatnonzero(y[1:] != y[:-1]) + 1
+    if len(changes) > 2 * buckets:
+        return minmax(x, y, buckets)
+    rows = np.unique(np.concatenate([[0], changes, [len(x) - 1]]))
+    return x[rows], y[rows]
+
+
+def reduce_series(
+    x: np.ndarray, y: np.ndarray, buckets: int, step: bool = False
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Downsamples a whole series, with steps() for flags and minmax() otherwise
+
+    Args:
+        x (np.ndarray): The x values
+        y (np.ndarray): The y values, bool flags are reduced as 0 and 1
+        buckets (int): The number of buckets, usually the width of the Axes in pixels
+        step (bool): Whether the series is a flag drawn as steps
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The x and y values of the kept rows
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if y.dtype == bool:
+        y = y.astype(np.uint8)
+    return (steps if step else minmax)(x, y, buckets)
+
+
+class Series(NamedTuple):
+    """
+    A series plotted by a DownsampledAxes
+    """
+
+    line: object  # The matplotlib Line2D drawing the series
+    x: np.ndarray
+    y: np.ndarray
+    step: bool  # Whether the series is a flag drawn as steps
+    ordered: Optional[bool]  # Whether the x values are sorted, None until needed
+    overview: Tuple[np.ndarray, np.ndarray]  # The whole series downsampled
+
+
+class DownsampledAxes:
+    """
+    The DownsampledAxes class plots downsampled series on a Matplotlib Axes
+
+    The full series are kept and downsampled again for the visible range whenever the
+    x limits of the Axes change, such as on a zoom or pan of the navigation toolbar, or
+    the canvas is resized.
+    Plotting a label again swaps the data of its line instead of creating a new one.
+
+    Args:
+        ax (matplotlib.axes.Axes): The Axes to plot on
+    """
+
+    def __init__(self, ax):
+        self.ax = ax
+        self.series: Dict[str, Series] = {}
+        ax.callbacks.connect("xlim_changed", self.update)
+        ax.figure.canvas.mpl_connect("resize_event", self.update)
+
+    def buckets(self) -> int:
+        # One bucket per pixel of the width of the Axes
+        return max(int(self.ax.bbox.width), 1)
+
+    def reduce(self, series: Series) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Downsamples the visible range of a series
+
+        Args:
+            series (Series): The series
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The x and y values to draw
+        """
+        x, y = series.x, series.y
+        if series.ordered is None:
+            series = series._replace(ordered=is_sorted(x))
+            self.series[series.line.get_label()] = series
+        if series.ordered:
+            start, stop = visible_range(x, *sorted(self.ax.get_xlim()))
+            x, y = x[start:stop], y[start:stop]
+        return (steps if series.step else minmax)(x, y, self.buckets())
+
+    def plot(
+        self,
+        x: np.ndarray,
+        y: np.ndarray,
+        label: str,
+        step: bool = False,
+        overview: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    ):
+        """
+        Plots a downsampled series, or replaces the data of the series with the same label
+
+        The line of a replaced series keeps its old data until rescale() is called.
+
+        Args:
+            x (np.ndarray): The x values
+            y (np.ndarray): The y values, bool flags are plotted as 0 and 1
+            label (str): The label of the series in the legend
+            step (bool): Whether the series is a flag drawn as steps
+            overview (Optional[Tuple[np.ndarray, np.ndarray]]): The whole series
+            downsampled by reduce_series(), if it was already computed such as on a
+            background thread
+
+        Returns:
+            None
+        """
+        x = np.asarray(x)
+        y = np.asarray(y)
+        if y.dtype == bool:
+            y = y.astype(np.uint8)
+        if overview is None:
+            overview = reduce_series(x, y, self.buckets(), step)
+
+        if label in self.series:
+            line = self.series[label].line
+        else:
+            line = self.ax.plot(
+                *overview,
+                label=label,
+                drawstyle="steps-post" if step else "default",
+            )[0]
+            # A fixed location, "best" would go through every point on each draw
+            self.ax.legend(loc="upper right")
+        self.series[label] = Series(line, x, y, step, None, overview)
+
+    def clear(self):
+        """
+        Empties every series, their lines are kept for the next plot
+
+        Returns:
+            None
+        """
+        empty = np.empty(0)
+        for label, series in self.series.items():
+            self.series[label] = series._replace(
+                x=empty, y=empty, ordered=True, overview=(empty, empty)
+            )
+            series.line.set_data(empty, empty)
+
+    def rescale(self, margin: float = 0.05):
+        """
+        Fits the limits of the Axes to the whole series and draws their overview
+
+        The limits come from the overviews, which keep the first and last rows and the
+        extremes of every series.
+
+        Args:
+            margin (float): The margin added around the y values, as a fraction of their range
+
+        Returns:
+            None
+        """
+        filled = [series for series in self.series.values() if len(series.x) > 0]
+        for series in self.series.values():
+            series.line.set_data(*series.overview)
+        if not filled:
+            self.ax.figure.canvas.draw_idle()
+            return
+
+        x_lo = min(s.overview[0].min() for s in filled)
+        x_hi = max(s.overview[0].max() for s in filled)
+        y_lo = float(min(s.overview[1].min() for s in filled))
+        y_hi = float(max(s.overview[1].max() for s in filled))
+        pad = (y_hi - y_lo) * margin or 0.5
+        if x_hi > x_lo:
+            self.ax.set_xlim(x_lo, x_hi, emit=False)
+        self.ax.set_ylim(y_lo - pad, y_hi + pad)
+        self.ax.figure.canvas.draw_idle()
+
+    def update(self, ax=None):
+        """
+        Downsamples every series again for the visible x range
+
+        Args:
+            ax: The Axes whose limits changed or the resize event, passed by the callbacks
+
+        Returns:
+            None
+        """
+        for series in self.series.values():
+            series.line.set_data(*self.reduce(series))
+        self.ax.figure.canvas.draw_idle()
+
+    def points(self) -> Dict[str, int]:
+        """
+        The number of points currently drawn for each series
+
+        Returns:
+            Dict[str, int]: The number of points of each label
+        """
+        return {
+            label: len(series.line.get_xdata()) for label, series in self.series.items()
+        }
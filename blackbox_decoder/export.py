@@ -0,0 +1,238 @@
+"""
+Columnar export of the decoded logs to Apache Parquet or Arrow IPC files
+
+Each section of a Log is written to its own file with typed columns, in row groups of a
+fixed number of records. A lazy Log is decoded one row group at a time so the full log
+never has to be decoded in memory at once. The flights of a FlightRecord can also be
+written as one partition per flight.
+
+pyarrow is an optional dependency, it is only needed by this module. The partitions of
+the flights can also be written as CSV files without it.
+"""
+
+import csv
+import os
+from typing import Dict, List
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+from blackbox_decoder.log import FlightRecord, Log
+from blackbox_decoder.table import LogTable
+
+# The number of records written per row group
+ROW_GROUP_SIZE = 1 << 20
+
+# The file name of each section, the same names as Log.write_csv
+SECTION_FILES = {
+    "milli_detail": "Detail",
+    "minute_rollup": "MinuteRollup",
+    "second_rollup": "SecondRollup",
+    "flight_events": "FlightInfo",
+}
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+
+def require_pyarrow():
+    if pa is None:
+        raise ImportError(
+            "pyarrow is required to export Parquet or Arrow files: "
+            'pip install "blackbox-decoder[parquet]"'
+        )
+
+
+class TableWriter:
+    """
+    The TableWriter class writes record batches to a Parquet or Arrow IPC file
+
+    Args:
+        path (str): The path to the file
+        schema (pa.Schema): The schema of the batches
+        format (str): "parquet" or "arrow"
+        compression (str): The compression codec such as "zstd", "lz4" or "none"
+    """
+
+    def __init__(self, path: str, schema, format: str, compression: str):
+        if format == "parquet":
+            self.writer = pq.ParquetWriter(path, schema, compression=compression)
+        else:
+            options = pa.ipc.IpcWriteOptions(
+                compression=None if compression == "none" else compression
+            )
+            self.writer = pa.ipc.new_file(path, schema, options=options)
+
+    def write(self, batch):
+        self.writer.write_batch(batch)
+
+    def close(self):
+        self.writer.close()
+
+
+def table_batch(table: LogTable):
+    """
+    Converts the columns of a LogTable into a record batch
+
+    Args:
+        table (LogTable): The records to convert
+
+    Returns:
+        pa.RecordBatch: The typed columns, the 1 bit flags as bool and X10 fields as float32
+    """
+    columns: Dict[str, np.ndarray] = table.frame_columns()
+    return pa.RecordBatch.from_pydict(
+        {
+            key: pa.array(column, type=pa.string() if column.dtype == object else None)
+            for key, column in columns.items()
+        }
+    )
+
+
+def write_table(
+    table: LogTable,
+    path: str,
+    format: str = "parquet",
+    compression: str = "zstd",
+    row_group_size: int = ROW_GROUP_SIZE,
+) -> str:
+    """
+    Writes a LogTable to a file one row group at a time
+
+    Args:
+        table (LogTable): The records to write
+        path (str): The path to the file
+        format (str): "parquet" or "arrow"
+        compression (str): The compression codec
+        row_group_size (int): The number of records per row group
+
+    Returns:
+        str: The path of the written file
+    """
+    require_pyarrow()
+    schema = table_batch(table.take(slice(0, 0))).schema
+    writer = TableWriter(path, schema, format, compression)
+    try:
+        for start in range(0, len(table), row_group_size):
+            # Only the records of the row group are decoded when the table is lazy
+            writer.write(table_batch(table.take(slice(start, start + row_group_size))))
+    finally:
+        writer.close()
+    return path
+
+
+def write_log(
+    log: Log,
+    output_dir: str = ".",
+    format: str = "parquet",
+    compression: str = "zstd",
+    row_group_size: int = ROW_GROUP_SIZE,
+) -> List[str]:
+    """
+    Writes each section of a Log to its own file
+
+    Args:
+        log (Log): The decoded log
+        output_dir (str): The directory to write the files to
+        format (str): "parquet" or "arrow"
+        compression (str): The compression codec
+        row_group_size (int): The number of records per row group
+
+    Returns:
+        List[str]: The paths of the written files
+    """
+    require_pyarrow()
+    extension = FORMATS[format]
+    os.makedirs(output_dir, exist_ok=True)
+
+    path = os.path.join(output_dir, "GenInfo" + extension)
+    batch = pa.RecordBatch.from_pylist([log.gen_info.structure])
+    writer = TableWriter(path, batch.schema, format, compression)
+    writer.write(batch)
+    writer.close()
+    paths = [path]
+
+    for section, name in SECTION_FILES.items():
+        path = os.path.join(output_dir, name + extension)
+        paths.append(
+            write_table(
+                getattr(log, section), path, format, compression, row_group_size
+            )
+        )
+    return paths
+
+
+def write_flights(
+    record: FlightRecord,
+    output_dir: str = ".",
+    format: str = "parquet",
+    compression: str = "zstd",
+    row_group_size: int = ROW_GROUP_SIZE,
+) -> List[str]:
+    """
+    Writes the Rollup and Detail records of each flight to a partition named
+    flight=<i>, where i is the index of the flight in FlightRecord.to_dataframe
+
+    Args:
+        record (FlightRecord): The spliced flights
+        output_dir (str): The directory to write the partitions to
+        format (str): "parquet" or "arrow"
+        compression (str): The compression codec
+        row_group_size (int): The number of records per row group
+
+    Returns:
+        List[str]: The paths of the written files
+    """
+    require_pyarrow()
+    extension = FORMATS[format]
+    paths = []
+    for i, flight in enumerate(record.flights):
+        partition = os.path.join(output_dir, f"flight={i}")
+        os.makedirs(partition, exist_ok=True)
+
+        for name, table in [
+            ("Rollup", flight.rollup()),
+            ("Detail", flight.table("milli_detail")),
+        ]:
+            if len(table) > 0:
+                path = os.path.join(partition, name + extension)
+                paths.append(
+                    write_table(table, path, format, compression, row_group_size)
+                )
+    return paths
+
+
+def write_flights_csv(record: FlightRecord, output_dir: str = ".") -> List[str]:
+    """
+    Writes each flight of a FlightRecord to CSV files in its own flight=<i> directory
+
+    Args:
+        record (FlightRecord): The flight record
+        output_dir (str): The directory holding the partitions
+
+    Returns:
+        List[str]: The paths of the written files
+    """
+    paths = []
+    for i, flight in enumerate(record.flights):
+        partition = os.path.join(output_dir, f"flight={i}")
+        os.makedirs(partition, exist_ok=True)
+
+        for name, table in [
+            ("Rollup", flight.rollup()),
+            ("Detail", flight.table("milli_detail")),
+        ]:
+            if len(table) > 0:
+                path = os.path.join(partition, name + ".csv")
+                with open(path, "w", newline="") as file:
+                    writer = csv.writer(file)
+                    writer.writerow(table.keys())
+                    for row in table:
+                        writer.writerow(row)
+                paths.append(path)
+    return paths
@@ -0,0 +1,138 @@
+"""
+Incremental decoding of a log file that is still being written
+
+A LogFollower keeps the byte offset and parser state of the last read of a log. Each poll
+only decodes the rows appended since then, appends them to the sections of its Log and
+updates the flights of its FlightRecord without splicing the log again. The columns of
+each section are kept in buffers that double their capacity when full, so appending is
+amortized over the new rows instead of copying the whole section on every poll.
+"""
+
+from typing import Dict
+
+import numpy as np
+
+from blackbox_decoder.log import (
+    LOG_SECTIONS,
+    FlightRecord,
+    GeneralInfo,
+    Log,
+)
+from blackbox_decoder.parse import LogTail
+from blackbox_decoder.table import LogTable
+
+# The Log attribute of each section header
+SECTION_NAMES = {
+    "Millisecond detail": "milli_detail",
+    "Minute Rollup": "minute_rollup",
+    "Second Rollup": "second_rollup",
+    "Flight Events": "flight_events",
+}
+
+
+class SectionBuffer:
+    """
+    The SectionBuffer class holds the raw columns of a growing section
+
+    The columns are allocated with spare capacity that doubles when it runs out, and the
+    table of the section is made of views of the filled rows.
+
+    Args:
+        packet (type): The packet class of the section
+        capacity (int): The number of rows allocated up front
+    """
+
+    def __init__(self, packet: type, capacity: int = 1024):
+        self.packet = packet
+        self.length = 0
+        empty = LogTable.from_packed(
+            packet, np.empty((0, packet.packet_size()), dtype=np.uint8)
+        )
+        self.columns = {
+            key: np.empty(capacity, dtype=empty.raw_column(key).dtype)
+            for key in empty.keys()
+        }
+
+    def append(self, table: LogTable):
+        """
+        Copies the records of a table after the filled rows
+
+        Args:
+            table (LogTable): The new records of the section
+        """
+        end = self.length + len(table)
+        for key, column in self.columns.items():
+            if end > len(column):
+                grown = np.empty(max(end, 2 * len(column)), dtype=column.dtype)
+                grown[: self.length] = column[: self.length]
+                self.columns[key] = column = grown
+            column[self.length : end] = table.raw_column(key)
+        self.length = end
+
+    def table(self) -> LogTable:
+        """
+        The filled rows of the section
+
+        Returns:
+            LogTable: A table of views of the columns, later appends do not change it
+        """
+        return LogTable(
+            self.packet,
+            {key: column[: self.length] for key, column in self.columns.items()},
+        )
+
+
+class LogFollower:
+    """
+    The LogFollower class decodes the records appended to a log file as it grows
+
+    Args:
+        log_file (str): The path to the log file
+        cache_size (int): The number of flights whose decoded records are kept by the FlightRecord
+    """
+
+    def __init__(self, log_file: str, cache_size: int = 8):
+        self.tail = LogTail(log_file)
+
+        # An empty log the new records are appended to
+        self.log = Log.__new__(Log)
+        self.log.gen_info = None
+        self.log.flight_time = self.tail.flight_time()
+        self.buffers = {
+            section: SectionBuffer(packet) for section, packet in LOG_SECTIONS.items()
+        }
+        for section, buffer in self.buffers.items():
+            setattr(self.log, section, buffer.table())
+        self.record = FlightRecord(self.log, cache_size=cache_size)
+
+    def poll(self) -> Dict[str, LogTable]:
+        """
+        Decodes the rows appended to the log since the last poll
+
+        Args:
+            None
+
+        Returns:
+            Dict[str, LogTable]: The new records of each section that grew, keyed by the Log attribute such as "milli_detail"
+        """
+        payloads = {section: bytearray() for section in SECTION_NAMES.values()}
+        for header, rec, offset, payload in self.tail.read():
+            if header == "General Info":
+                if self.log.gen_info is None:
+                    self.log.gen_info = GeneralInfo.from_bytes(rec, offset, payload)
+                continue
+            payloads[SECTION_NAMES[header]] += payload
+        self.log.flight_time = self.tail.flight_time()
+
+        new: Dict[str, LogTable] = {}
+        for section, payload in payloads.items():
+            if not payload:
+                continue
+            table = Log.decode(LOG_SECTIONS[section], payload)
+            self.buffers[section].append(table)
+            setattr(self.log, section, self.buffers[section].table())
+            new[section] = table
+
+        if new:
+            self.record.extend({section: len(table) for section, table in new.items()})
+        return new
@@ -0,0 +1,367 @@
+"""
+Fleet wide index of the flights of decoded logs
+
+The summary of every flight of a log, the drone ID, FlightInfo counters, record and time
+ranges and the voltages of its Rollups, is saved to a SQLite database so questions about
+a whole fleet are answered without decoding the logs again. A log is only indexed again
+when its size or modification time changed. The logs are decoded through the on-disk
+cache, so opening the flight of a query result loads it from the cache instead of
+scanning the log file.
+"""
+
+import datetime
+import json
+import os
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from blackbox_decoder.cache import LogCache, cache_dir
+from blackbox_decoder.log import FLIGHT_SECTIONS, Flight, FlightRecord
+from blackbox_decoder.parse import read_timestamps
+
+# Bumped whenever the columns of the index change, the logs are then indexed again
+INDEX_VERSION = 1
+
+# The FlightInfo fields saved for each flight
+FLIGHT_COUNTERS = [
+    "numbSecActive",
+    "numbSecShutdown",
+    "numbSecTethOn",
+    "numbSecBattOn",
+    "numbTethOnChanges",
+    "numbTethGdChanges",
+    "numbTethRdyChanges",
+    "numbTethActChanges",
+    "numbBattOnChanges",
+    "numbBattKillChanges",
+    "numbBattDrainChanges",
+    "numbBattOutKillChanges",
+    "maxTemp",
+    "minTemp",
+]
+
+# The voltages of the Rollups, summarized by the minimum of their average, the maximum of
+# their peak and the mean of their average
+VOLTAGES = ["tethVolt", "battVolt", "outVolt"]
+
+FLIGHT_COLUMNS: List[Tuple[str, str]] = [
+    ("path", "TEXT NOT NULL"),
+    ("flight", "INTEGER NOT NULL"),
+    ("drone", "TEXT"),
+    ("logBegin", "TEXT"),
+    ("logEnd", "TEXT"),
+    ("begRecNumb", "INTEGER"),
+    ("endRecNumb", "INTEGER"),
+    ("firstMsecs", "INTEGER"),
+    ("lastMsecs", "INTEGER"),
+    ("detailRows", "INTEGER"),
+    ("rollupRows", "INTEGER"),
+    *((counter, "INTEGER") for counter in FLIGHT_COUNTERS),
+    *(
+        (f"{voltage}{stat}", "REAL")
+        for voltage in VOLTAGES
+        for stat in ("Min", "Max", "Avg")
+    ),
+    ("ranges", "TEXT"),
+]
+
+
+def index_path() -> str:
+    """
+    The default path of the index, set with the BLACKBOX_INDEX variable
+
+    Returns:
+        str: The path to the SQLite database
+    """
+    return os.environ.get("BLACKBOX_INDEX", os.path.join(cache_dir(), "fleet.sqlite"))
+
+
+def summarize_flight(record: FlightRecord, i: int) -> Dict[str, Any]:
+    """
+    The summary of a flight saved by the index
+
+    Args:
+        record (FlightRecord): The flight record
+        i (int): The index of the flight in the flight record
+
+    Returns:
+        Dict[str, Any]: The value of every column of FLIGHT_COLUMNS except path, drone and the log timestamps
+    """
+    flight = record.flights[i]
+    summary: Dict[str, Any] = {
+        "flight": i,
+        "begRecNumb": flight.start,
+        "endRecNumb": flight.end,
+        "ranges": json.dumps({s: list(r) for s, r in flight.ranges.items()}),
+    }
+
+    events = record.log.flight_events
+    rows = np.flatnonzero(events.raw_column("begRecNumb") == flight.start)
+    for counter in FLIGHT_COUNTERS:
+        summary[counter] = int(events.column(counter)[rows[0]]) if len(rows) else None
+
+    rollup = flight.rollup()
+    detail = flight.table("milli_detail")
+    summary["rollupRows"] = len(rollup)
+    summary["detailRows"] = len(detail)
+    times = [
+        table.raw_column("entryTimeMsecs") for table in (rollup, detail) if len(table)
+    ]
+    summary["firstMsecs"] = int(min(t.min() for t in times)) if times else None
+    summary["lastMsecs"] = int(max(t.max() for t in times)) if times else None
+
+    for voltage in VOLTAGES:
+        if len(rollup):
+            avg = rollup.column(f"{voltage}X10Avg")
+            peak = rollup.column(f"{voltage}X10Peak")
+            stats = (float(avg.min()), float(peak.max()), float(avg.mean()))
+        else:
+            stats = (None, None, None)
+        for stat, value in zip(("Min", "Max", "Avg"), stats):
+            summary[f"{voltage}{stat}"] = value
+    return summary
+
+
+def flight_key(flight: Flight) -> Tuple[int, int, Dict[str, Tuple[int, int]]]:
+    # The record numbers and row ranges identifying a flight in its flight record
+    return (
+        flight.start,
+        flight.end,
+        {section: tuple(flight.ranges[section]) for section in FLIGHT_SECTIONS},
+    )
+
+
+class FleetIndex:
+    """
+    The FleetIndex class keeps the summaries of the flights of many logs in SQLite
+
+    Args:
+        path (Optional[str]): The path to the database, defaults to index_path()
+        disk_cache (Union[bool, LogCache]): The on-disk cache the logs are decoded
+        through, True for the default LogCache
+    """
+
+    def __init__(
+        self, path: Optional[str] = None, disk_cache: Union[bool, LogCache] = True
+    ):
+        self.path = path if path is not None else index_path()
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.disk_cache = LogCache() if disk_cache is True else disk_cache
+        self.connection = sqlite3.connect(self.path)
+        self.connection.row_factory = sqlite3.Row
+        self.create()
+
+    def create(self):
+        """
+        Creates the tables of the index, dropping them if they were made by another INDEX_VERSION
+        """
+        with self.connection:
+            version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+            if version != INDEX_VERSION:
+                self.connection.execute("DROP TABLE IF EXISTS flights")
+                self.connection.execute("DROP TABLE IF EXISTS logs")
+                self.connection.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS logs ("
+                "path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, drone TEXT, "
+                "flights INTEGER, indexed TEXT)"
+            )
+            columns = ", ".join(f"{name} {kind}" for name, kind in FLIGHT_COLUMNS)
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS flights ({columns}, "
+                "PRIMARY KEY (path, flight))"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS flights_drone ON flights (drone, logBegin)"
+            )
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self) -> "FleetIndex":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM flights").fetchone()[0]
+
+    def is_current(self, path: str) -> bool:
+        """
+        Whether a log is indexed and did not change since
+
+        Args:
+            path (str): The path to the log file
+
+        Returns:
+            bool: True if the log does not need to be indexed again
+        """
+        stat = os.stat(path)
+        row = self.connection.execute(
+            "SELECT size, mtime FROM logs WHERE path = ?", (os.path.abspath(path),)
+        ).fetchone()
+        return row is not None and tuple(row) == (stat.st_size, stat.st_mtime_ns)
+
+    def add(self, path: str, record: Optional[FlightRecord] = None) -> int:
+        """
+        Indexes the flights of a log, replacing the ones indexed before
+
+        Args:
+            path (str): The path to the log file
+            record (Optional[FlightRecord]): The flight record of the log if already decoded
+
+        Returns:
+            int: The number of flights indexed
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        if record is None:
+            record = FlightRecord(path, lazy=True, disk_cache=self.disk_cache)
+        drone = record.get_drone_name()
+        beginning, end = read_timestamps(path)
+
+        rows = []
+        for i in range(len(record)):
+            summary = summarize_flight(record, i)
+            summary.update(
+                path=path,
+                drone=drone,
+                logBegin=beginning.isoformat() if beginning is not None else None,
+                logEnd=end.isoformat() if end is not None else None,
+            )
+            rows.append([summary[name] for name, _ in FLIGHT_COLUMNS])
+
+        names = ", ".join(name for name, _ in FLIGHT_COLUMNS)
+        marks = ", ".join("?" for _ in FLIGHT_COLUMNS)
+        with self.connection:
+            self.connection.execute("DELETE FROM flights WHERE path = ?", (path,))
+            self.connection.executemany(
+                f"INSERT INTO flights ({names}) VALUES ({marks})", rows
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO logs VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    path,
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                    drone,
+                    len(rows),
+                    datetime.datetime.now().isoformat(timespec="seconds"),
+                ),
+            )
+        return len(rows)
+
+    def update(self, paths: Iterable[str]) -> Dict[str, Union[int, str]]:
+        """
+        Indexes the logs that are new or changed since they were indexed
+
+        A log that is missing or fails to decode is reported with its error and the others
+        are still indexed. A missing [BEGIN] or [END] timestamp is indexed as NULL.
+
+        Args:
+            paths (Iterable[str]): The paths to the log files
+
+        Returns:
+            Dict[str, Union[int, str]]: The number of flights of each indexed log, or its error
+        """
+        updated: Dict[str, Union[int, str]] = {}
+        for path in paths:
+            try:
+                if self.is_current(path):
+                    continue
+                updated[path] = self.add(path)
+            except Exception as e:
+                updated[path] = f"{e.__class__.__name__}: {e}"
+        return updated
+
+    def prune(self) -> List[str]:
+        """
+        Removes the logs that no longer exist from the index
+
+        Returns:
+            List[str]: The paths of the removed logs
+        """
+        paths = [
+            row["path"] for row in self.connection.execute("SELECT path FROM logs")
+        ]
+        missing = [path for path in paths if not os.path.exists(path)]
+        with self.connection:
+            for path in missing:
+                self.connection.execute("DELETE FROM flights WHERE path = ?", (path,))
+                self.connection.execute("DELETE FROM logs WHERE path = ?", (path,))
+        return missing
+
+    def query(
+        self,
+        drone: Optional[str] = None,
+        since: Optional[datetime.datetime] = None,
+        until: Optional[datetime.datetime] = None,
+        where: Optional[str] = None,
+        params: Iterable[Any] = (),
+    ) -> List[sqlite3.Row]:
+        """
+        Finds the indexed flights matching some conditions
+
+        The dates are compared to the [BEGIN] timestamp of the log holding the flight,
+        e.g. query("BV-ALEDPM", since=last_month, where="numbBattDrainChanges > 0").
+
+        Args:
+            drone (Optional[str]): The ID of the drone
+            since (Optional[datetime.datetime]): The earliest log timestamp
+            until (Optional[datetime.datetime]): The latest log timestamp
+            where (Optional[str]): An SQL condition on the columns of FLIGHT_COLUMNS
+            params (Iterable[Any]): The parameters of the placeholders of where
+
+        Returns:
+            List[sqlite3.Row]: The matching flights, by log timestamp and flight
+        """
+        conditions: List[str] = []
+        values: List[Any] = []
+        if drone is not None:
+            conditions.append("drone = ?")
+            values.append(drone)
+        if since is not None:
+            conditions.append("logBegin >= ?")
+            values.append(since.isoformat())
+        if until is not None:
+            conditions.append("logBegin <= ?")
+            values.append(until.isoformat())
+        if where is not None:
+            conditions.append(f"({where})")
+            values.extend(params)
+
+        sql = "SELECT * FROM flights"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY logBegin, path, flight"
+        return self.connection.execute(sql, values).fetchall()
+
+    def open(self, row: sqlite3.Row) -> Tuple[FlightRecord, int]:
+        """
+        Opens the flight of a query result
+
+        The log is loaded from the on-disk cache it was decoded into when indexed, it is
+        only decoded again if the cache entry was evicted.
+
+        Args:
+            row (sqlite3.Row): A row returned by query
+
+        Returns:
+            Tuple[FlightRecord, int]: The flight record of the log and the index of the flight, for to_dataframe
+        """
+        record = FlightRecord(row["path"], lazy=True, disk_cache=self.disk_cache)
+        ranges = {
+            section: tuple(bounds)
+            for section, bounds in json.loads(row["ranges"]).items()
+        }
+        for i, flight in enumerate(record.flights):
+            if flight_key(flight) == (row["begRecNumb"], row["endRecNumb"], ranges):
+                return record, i
+        raise LookupError(
+            f"Flight {row['begRecNumb']} is not in {row['path']} anymore, "
+            "index the log again"
+        )
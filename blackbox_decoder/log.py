@@ -1,15 +1,38 @@
 import csv
 import datetime
-from typing import Dict, List, Tuple, Union
+import heapq
+import os
+from collections import OrderedDict
+from concurrent.futures import Executor
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple, Union
 import numpy as np
-import pandas as pd
 
-from bitstring import BitStream
-
-from blackbox_decoder.parse import parse_log
+from blackbox_decoder.cache import LogCache, layout_version
+from blackbox_decoder.decode import PacketLayout, packed_view
+from blackbox_decoder.parallel import MIN_PARALLEL_ROWS, decode_parallel
+from blackbox_decoder.parse import (
+    HEADER,
+    block_payload,
+    block_rows,
+    iter_records,
+    map_sections,
+    read_flight_time,
+    split_row,
+)
+from blackbox_decoder.profiler import stage
+from blackbox_decoder.progress import Progress, report
+from blackbox_decoder.stats import FlightStats, section_stats
+from blackbox_decoder.table import LogRecord, LogTable
+
+if TYPE_CHECKING:
+    # pandas is only imported once a DataFrame is built
+    import pandas as pd
 
 SIGMA = 8
 
+# The sections of the Log that are spliced into flights
+FLIGHT_SECTIONS = ("milli_detail", "minute_rollup", "second_rollup")
+
 LOG_PACKET_SIZES = {
     "GeneralInfo": 25,
     "Detail": 16,
@@ -19,13 +42,67 @@ LOG_PACKET_SIZES = {
 
 
 class BaseLog:
+    """
+    The BaseLog class is a single decoded packet
+
+    Only the record number, the offset and the decoded values are kept, in slots, the
+    names of the fields are shared by every record of a packet type.
+    """
+
+    __slots__ = ("rec", "offset", "values")
+
+    # Fields stored as ten times their value, divided by 10 once decoded
+    scaled_fields: List[str] = []
+    # Whether the fields are stored in the reverse order of get_size_struct()
+    reversed_fields = True
+    # The compiled layout of the packet, set when a subclass is created
+    layout: PacketLayout
+    # The names of the values of a record and the position of each name
+    fields: Tuple[str, ...]
+    index: Dict[str, int]
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # The size struct is compiled once per packet type instead of on every record
+        cls.layout = PacketLayout(cls)
+        cls.fields = cls.record_fields()
+        cls.index = {key: i for i, key in enumerate(cls.fields)}
+
     def __init__(self, data: str):
-        parts = data.split()
-        self.rec = int(parts[0])
-        self.offset = int(parts[1], 16)
-        self.concat = "".join(parts[2:])
-        self.s = BitStream(hex=self.concat)
-        self.structure = {}
+        self.load(*split_row(data))
+
+    def load(self, rec: int, offset: int, payload: bytes):
+        """
+        Decodes the fields of the packet with the compiled layout of the class
+
+        Args:
+            rec (int): The record number
+            offset (int): The offset of the record
+            payload (bytes): The bytes of the packet
+
+        Returns:
+            None
+        """
+        self.rec = rec
+        self.offset = offset
+        self.values = self.layout.decode_values(payload)
+
+    @classmethod
+    def record_fields(cls) -> Tuple[str, ...]:
+        """
+        The names of the values of a record, in the order they are kept
+
+        Args:
+            None
+
+        Returns:
+            Tuple[str, ...]: The names of the fields
+        """
+        return tuple(cls.layout.fields)
+
+    @property
+    def structure(self) -> dict:
+        return dict(zip(self.fields, self.values))
 
     def __str__(self):
         s = ""
@@ -38,15 +115,51 @@ class BaseLog:
         return str(self)
 
     def __iter__(self):
-        return iter(self.structure.values())
+        return iter(self.values)
 
     def __getitem__(self, key):
-        return self.structure[key]
+        return self.values[self.index[key]]
 
-    def packet_size(self):
-        return LOG_PACKET_SIZES[self.__class__.__name__]
+    @classmethod
+    def from_bytes(cls, rec: int, offset: int, payload: bytes) -> "BaseLog":
+        """
+        Creates a record from the values yielded by parse.iter_records
 
-    def get_size_struct(self) -> Dict[str, Tuple[str, int]]:
+        Args:
+            rec (int): The record number
+            offset (int): The offset of the record
+            payload (bytes): The bytes of the packet
+
+        Returns:
+            BaseLog: The decoded record
+        """
+        record = cls.__new__(cls)
+        record.load(rec, offset, payload)
+        return record
+
+    @classmethod
+    def packet_size(cls) -> int:
+        # A packet type missing from LOG_PACKET_SIZES is just large enough for its fields
+        bit_sum = sum(value[1] for value in cls.get_size_struct().values())
+        return LOG_PACKET_SIZES.get(cls.__name__, -(-bit_sum // 8))
+
+    @classmethod
+    def start_bit(cls) -> int:
+        """
+        The bit position the first field is read from, aligning the structure to the
+        end of the packet
+
+        Args:
+            None
+
+        Returns:
+            int: The number of leading bits to skip in the packet
+        """
+        bit_sum = sum(value[1] for value in cls.get_size_struct().values())
+        return (8 * cls.packet_size()) % bit_sum
+
+    @classmethod
+    def get_size_struct(cls) -> Dict[str, Tuple[str, int]]:
         """
         This method should be implemented in the subclass and should return a dictionary
         where the key is the name of the field and the value is a tuple where the first
@@ -67,28 +180,29 @@ class GeneralInfo(BaseLog):
     - mins_run: The number of minutes the log has been running
     """
 
-    def __init__(self, data: str):
-        super().__init__(data)
-        size_struct = self.get_size_struct()
-
-        bit_sum = sum(value[1] for value in size_struct.values())
-        shift = (8 * self.packet_size()) % bit_sum
+    # The raw packet is kept to save the log to the cache
+    __slots__ = ("payload",)
 
-        self.s.pos = shift
+    # The fields are stored in the order of get_size_struct()
+    reversed_fields = False
 
-        for key, value in size_struct.items():
-            self.structure[key] = self.s.read(value[0])
+    @classmethod
+    def record_fields(cls) -> Tuple[str, ...]:
+        # The fields are listed from the ID down to mins_run
+        return tuple(reversed(cls.layout.fields))
 
-        self.structure["ID"] = (
-            self.structure["ID"].decode()[::-1].translate({ord("\x00"): None})
-        )
-        self.structure["date_initialized"] = datetime.datetime.fromtimestamp(
-            self.structure["date_initialized"]
+    def load(self, rec: int, offset: int, payload: bytes):
+        super().load(rec, offset, payload)
+        self.payload = bytes(payload)
+        values = dict(zip(self.layout.fields, self.values))
+        values["ID"] = values["ID"].translate({ord("\x00"): None})
+        values["date_initialized"] = datetime.datetime.fromtimestamp(
+            values["date_initialized"]
         )
-        self.structure = dict(reversed(list(self.structure.items())))
-        assert self.s.pos == self.s.len
+        self.values = tuple(reversed(list(values.values())))
 
-    def get_size_struct(self) -> Dict[str, Tuple[str, int]]:
+    @classmethod
+    def get_size_struct(cls) -> Dict[str, Tuple[str, int]]:
         """
         The size and structure of the General Info packet
 
@@ -147,30 +261,18 @@ class Detail(BaseLog):
     - lowPower: 1 bit each for the main flags
     """
 
-    def __init__(self, data: str):
-        super().__init__(data)
-        # This is a store of both the size and the structure of the data
-        size_struct = self.get_size_struct()
-        # Reverse the size_struct dictionary for the BitStream
-        size_struct = dict(reversed(list(size_struct.items())))
-        # We calculate the total number of bits in the structure and shift the bits to align the data we parse
-        bit_sum = sum(value[1] for value in size_struct.values())
-        shift = (
-            8 * LOG_PACKET_SIZES["Detail"]
-        ) % bit_sum  # WE SHIFT THE BITS TO ALIGN THE DATA
-        # self.s.pos = shift
-        # WE parse the data using the accepted type and size using the size_struct
-        for key, value in size_struct.items():
-            self.structure[key] = self.s.read(value[0])
-
-        # Reverse the structure to its original structure in the C code
-        self.structure = dict(reversed(list(self.structure.items())))
-
-        # Divided all current and voltage values by 10
-        for key in ["tethCurrentX10", "tethVoltX10", "battVoltX10", "outVoltX10"]:
-            self.structure[key] /= 10
-
-    def get_size_struct(self) -> Dict[str, Tuple[str, int]]:
+    __slots__ = ()
+
+    # Current and voltage fields stored as ten times their value
+    scaled_fields = ["tethCurrentX10", "tethVoltX10", "battVoltX10", "outVoltX10"]
+
+    @classmethod
+    def start_bit(cls) -> int:
+        # The Detail packet is read from the first bit, the alignment shift is not applied
+        return 0
+
+    @classmethod
+    def get_size_struct(cls) -> Dict[str, Tuple[str, int]]:
         """
         The size and structure of the General Info packet
 
@@ -204,29 +306,22 @@ class Detail(BaseLog):
 
 
 class Rollup(BaseLog):
-    def __init__(self, data: str):
-        super().__init__(data)
-        size_struct = self.get_size_struct()
-        # Reverse the size_struct dictionary for the BitStream
-        size_struct = dict(reversed(list(size_struct.items())))
-
-        bit_sum = sum(value[1] for value in size_struct.values())
-        shift = (8 * LOG_PACKET_SIZES["Rollup"]) % bit_sum
-        self.s.pos = shift
-
-        for key, value in size_struct.items():
-            self.structure[key] = self.s.read(value[0])
-
-        # Reverse the structure to its original structure in the C code
-        self.structure = dict(reversed(list(self.structure.items())))
-
-        # Divided all current and voltage values by 10
-        for key in ["tethCurrentX10Avg", "tethCurrentX10Peak", "tethVoltX10Avg", "tethVoltX10Peak", "battVoltX10Avg", "battVoltX10Peak", "outVoltX10Avg", "outVoltX10Peak"]:
-            self.structure[key] /= 10
-
-        assert self.s.pos == self.s.len
-
-    def get_size_struct(self) -> Dict[str, Tuple[str, int]]:
+    __slots__ = ()
+
+    # Current and voltage fields stored as ten times their value
+    scaled_fields = [
+        "tethCurrentX10Avg",
+        "tethCurrentX10Peak",
+        "tethVoltX10Avg",
+        "tethVoltX10Peak",
+        "battVoltX10Avg",
+        "battVoltX10Peak",
+        "outVoltX10Avg",
+        "outVoltX10Peak",
+    ]
+
+    @classmethod
+    def get_size_struct(cls) -> Dict[str, Tuple[str, int]]:
         """
         The size and structure of the General Info packet
 
@@ -299,28 +394,10 @@ class FlightInfo(BaseLog):
     - begRecNumb: The record number that last time we started
     """
 
-    def __init__(self, data: str):
-        super().__init__(data)
-        size_struct = self.get_size_struct()
-        # Reverse the size_struct dictionary for the BitStream
-        size_struct = dict(reversed(list(size_struct.items())))
-
-        bit_sum = sum(value[1] for value in size_struct.values())
-        shift = (8 * LOG_PACKET_SIZES[self.__class__.__name__]) % bit_sum
-        self.s.pos = shift
-
-        for key, value in size_struct.items():
-            self.structure[key] = self.s.read(value[0])
+    __slots__ = ()
 
-        try:
-            self.structure["data"] = self.structure["data"].decode("utf-8")[::-1]
-        except UnicodeDecodeError:
-            self.structure["data"] = "ERROR"
-        # Reverse the structure to its original structure in the C code
-        self.structure = dict(reversed(list(self.structure.items())))
-        assert self.s.pos == self.s.len
-
-    def get_size_struct(self) -> Dict[str, Tuple[str, int]]:
+    @classmethod
+    def get_size_struct(cls) -> Dict[str, Tuple[str, int]]:
         """
         The size and structure of the General Info packet
 
@@ -355,54 +432,311 @@ class FlightInfo(BaseLog):
         }
 
 
+# The packet class of each section of the Log
+LOG_SECTIONS = {
+    "milli_detail": Detail,
+    "minute_rollup": Rollup,
+    "second_rollup": Rollup,
+    "flight_events": FlightInfo,
+}
+
+# The version of the decoder layouts the on-disk cache is keyed by
+LAYOUT_VERSION = layout_version([GeneralInfo, Detail, Rollup, FlightInfo])
+
+
 class Log:
-    def __init__(self, log_file: str):
-        self.data = parse_log(log_file)
-        self.flight_time = self.data["Flight Time"]
-        self.gen_info = GeneralInfo(self.data["General Info"][0])
-        self.milli_detail = [Detail(x) for x in self.data["Millisecond detail"]]
-        self.minute_rollup = [Rollup(x) for x in self.data["Minute Rollup"]]
-        self.second_rollup = [Rollup(x) for x in self.data["Second Rollup"]]
-        self.flight_events = [FlightInfo(x) for x in self.data["Flight Events"]]
-        # Writing the data to a CSV file
-
-    def write_csv(self):
+    def __init__(
+        self,
+        log_file: str,
+        workers: Optional[int] = None,
+        lazy: bool = False,
+        progress: Optional[Progress] = None,
+    ):
+        """
+        The constructor for the Log class
+
+        Args:
+            log_file (str): The path to the log file
+            workers (Optional[int]): The number of worker processes decoding the
+            Millisecond detail and Rollup sections in chunks, decoded in this process if None
+            lazy (bool): Whether to keep the Millisecond detail and Rollup sections packed
+            and only decode their fields when they are read. The whole log is still read and
+            packed, which is most of the time of a decode, so this mostly saves memory
+            progress (Optional[Progress]): Receives the progress of the "parse" and "decode" stages,
+            Progress.cancel() stops the decode by raising Cancelled
+
+        Returns:
+            None
+        """
+        with stage("Log", bytes=os.path.getsize(log_file)) as span:
+            payloads = {section: bytearray() for section in HEADER}
+            sections = map_sections(log_file, progress)
+            if sections is not None:
+                # The blocks of rows are decoded straight from the memory mapped log
+                self.gen_info = GeneralInfo(block_rows(sections["General Info"][0])[0])
+                with stage("pack") as packing:
+                    for section in HEADER:
+                        for block in sections[section]:
+                            payloads[section] += block_payload(block)
+                    packing.bytes = sum(len(payload) for payload in payloads.values())
+                self.flight_time = sections["Flight Time"]
+            else:
+                # Each record is appended to the packed bytes of its section while it is read
+                with stage("read_records", bytes=span.bytes) as reading:
+                    for section, rec, offset, payload in iter_records(
+                        log_file, progress
+                    ):
+                        if section == "General Info" and not payloads[section]:
+                            self.gen_info = GeneralInfo.from_bytes(rec, offset, payload)
+                        payloads[section] += payload
+                        reading.rows += 1
+                self.flight_time = read_flight_time(log_file)
+
+            self.decode_sections(payloads, workers, lazy, progress)
+            span.rows = sum(
+                len(getattr(self, section))
+                for section in (*FLIGHT_SECTIONS, "flight_events")
+            )
+
+    @classmethod
+    def from_buffers(
+        cls,
+        gen_info,
+        sections: Dict[str, object],
+        flight_time: datetime.timedelta = datetime.timedelta(0),
+        workers: Optional[int] = None,
+        lazy: bool = False,
+    ) -> "Log":
+        """
+        This method decodes a log from the raw bytes of its sections instead of a text log file
+
+        The buffers can be a binary dump of the flash of the powerboard or the bytes already extracted by a parser,
+        the packets are decoded in place without being converted to hex text.
+
+        Args:
+            gen_info: The bytes of the General Info packet
+            sections (Dict[str, object]): The buffer of each section keyed by its HEADER, such as "Millisecond detail",
+            any object supporting the buffer protocol. A missing section is empty
+            flight_time (datetime.timedelta): The time between the [BEGIN] and [END] timestamps
+            workers (Optional[int]): The number of worker processes decoding the Millisecond detail and Rollup sections
+            lazy (bool): Whether to keep the Millisecond detail and Rollup sections packed, the buffers must then stay open
+
+        Returns:
+            Log: The decoded log
+        """
+        log = cls.__new__(cls)
+        log.gen_info = GeneralInfo.from_bytes(0, 0, bytes(gen_info))
+        log.flight_time = flight_time
+        log.decode_sections(
+            {header: sections.get(header, b"") for header in HEADER[1:]}, workers, lazy
+        )
+        return log
+
+    def decode_sections(
+        self,
+        payloads: Dict[str, object],
+        workers: Optional[int],
+        lazy: bool,
+        progress: Optional[Progress] = None,
+    ):
+        """
+        This method decodes the packed bytes of the Millisecond detail, Rollup and Flight Events sections
+
+        Args:
+            payloads (Dict[str, object]): The packed bytes of each section keyed by its HEADER
+            workers (Optional[int]): The number of worker processes decoding the large sections in chunks
+            lazy (bool): Whether to defer decoding the Millisecond detail and Rollup fields until they are read
+            progress (Optional[Progress]): Receives the progress after each section
+
+        Returns:
+            None
+        """
+        executor = None
+        if workers is not None and workers > 1:
+            # Imported here as multiprocessing is slow to import and rarely needed
+            from concurrent.futures import ProcessPoolExecutor
+
+            executor = ProcessPoolExecutor(max_workers=workers)
+        try:
+            report(progress, "decode", 0, 4)
+            self.milli_detail = self.decode(
+                Detail, payloads["Millisecond detail"], executor, workers, lazy
+            )
+            report(progress, "decode", 1, 4)
+            self.minute_rollup = self.decode(
+                Rollup, payloads["Minute Rollup"], executor, workers, lazy
+            )
+            report(progress, "decode", 2, 4)
+            self.second_rollup = self.decode(
+                Rollup, payloads["Second Rollup"], executor, workers, lazy
+            )
+            report(progress, "decode", 3, 4)
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+        self.flight_events = self.decode(FlightInfo, payloads["Flight Events"])
+        report(progress, "decode", 4, 4)
+
+    @staticmethod
+    def decode(
+        packet: type,
+        payload,
+        executor: Optional[Executor] = None,
+        chunks: Optional[int] = None,
+        lazy: bool = False,
+    ) -> LogTable:
+        """
+        Decodes the packed bytes of a section into a LogTable
+
+        Args:
+            packet (type): The packet class of the section
+            payload: The concatenated payloads of the records of the section, any object supporting the buffer protocol
+            executor (Optional[Executor]): The pool decoding large sections in chunks
+            chunks (Optional[int]): The number of chunks to split large sections into
+            lazy (bool): Whether to defer decoding each field until it is read
+
+        Returns:
+            LogTable: The decoded section
+        """
+        packed = packed_view(payload, packet.packet_size())
+        with stage(f"decode/{packet.__name__}", len(packed), packed.nbytes):
+            if lazy:
+                return LogTable.from_packed(packet, packed, lazy=True)
+            if executor is not None and len(packed) >= MIN_PARALLEL_ROWS:
+                return decode_parallel(packet, packed, executor, chunks)
+            return LogTable.from_packed(packet, packed)
+
+    def write_csv(self, output_dir: str = ".") -> List[str]:
+        """
+        This method writes each section of the log to a CSV file
+
+        Args:
+            output_dir (str): The directory to write the CSV files to
+
+        Returns:
+            List[str]: The paths of the written files
+        """
+        paths = [
+            os.path.join(output_dir, name)
+            for name in [
+                "GenInfo.csv",
+                "Detail.csv",
+                "MinuteRollup.csv",
+                "SecondRollup.csv",
+                "FlightInfo.csv",
+            ]
+        ]
+        os.makedirs(output_dir, exist_ok=True)
+
         # Gen Info to CSV
-        with open("GenInfo.csv", "w", newline="") as file:
+        with open(paths[0], "w", newline="") as file:
             writer = csv.writer(file)
             writer.writerow(self.gen_info.structure.keys())
             writer.writerow(self.gen_info.structure.values())
 
         # Detail to CSV
-        with open("Detail.csv", "w", newline="") as file:
+        with open(paths[1], "w", newline="") as file:
             writer = csv.writer(file)
-            writer.writerow(self.milli_detail[0].structure.keys())
+            writer.writerow(self.milli_detail.keys())
             for detail in self.milli_detail:
-                writer.writerow(detail.structure.values())
+                writer.writerow(detail)
 
         # Rollup to CSV
-        with open("MinuteRollup.csv", "w", newline="") as file:
+        with open(paths[2], "w", newline="") as file:
             writer = csv.writer(file)
-            writer.writerow(self.minute_rollup[0].structure.keys())
+            writer.writerow(self.minute_rollup.keys())
             for rollup in self.minute_rollup:
-                writer.writerow(rollup.structure.values())
+                writer.writerow(rollup)
 
-        with open("SecondRollup.csv", "w", newline="") as file:
+        with open(paths[3], "w", newline="") as file:
             writer = csv.writer(file)
-            writer.writerow(self.second_rollup[0].structure.keys())
+            writer.writerow(self.second_rollup.keys())
             for rollup in self.second_rollup:
-                writer.writerow(rollup.structure.values())
+                writer.writerow(rollup)
 
         # Flight Info to CSV
-        with open("FlightInfo.csv", "w", newline="") as file:
+        with open(paths[4], "w", newline="") as file:
             writer = csv.writer(file)
-            writer.writerow(self.flight_events[0].structure.keys())
+            writer.writerow(self.flight_events.keys())
             for flight_info in self.flight_events:
-                writer.writerow(flight_info.structure.values())
+                writer.writerow(flight_info)
+
+        return paths
+
+    def write_parquet(
+        self, output_dir: str = ".", format: str = "parquet", compression: str = "zstd"
+    ) -> List[str]:
+        """
+        This method writes each section of the log to a Parquet or Arrow IPC file, this requires pyarrow
+
+        Args:
+            output_dir (str): The directory to write the files to
+            format (str): "parquet" or "arrow"
+            compression (str): The compression codec such as "zstd", "lz4" or "none"
+
+        Returns:
+            List[str]: The paths of the written files
+        """
+        # Imported here as pyarrow is an optional dependency
+        from blackbox_decoder.export import write_log
+
+        return write_log(self, output_dir, format, compression)
 
     def __bool__(self):
         # If the size of the data is 0, return False
-        return bool(self.data)
+        return any(
+            len(table) > 0
+            for table in (
+                self.milli_detail,
+                self.minute_rollup,
+                self.second_rollup,
+                self.flight_events,
+            )
+        )
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        This method returns the decoded log as plain arrays that can be saved without pickling
+
+        Args:
+            None
+
+        Returns:
+            Dict[str, np.ndarray]: The arrays of the log
+        """
+        arrays = {
+            "gen_info/rec": np.array(self.gen_info.rec),
+            "gen_info/offset": np.array(self.gen_info.offset),
+            "gen_info/payload": np.frombuffer(self.gen_info.payload, dtype=np.uint8),
+            "flight_time": np.array(
+                self.flight_time // datetime.timedelta(microseconds=1)
+            ),
+        }
+        for section in LOG_SECTIONS:
+            arrays.update(getattr(self, section).to_arrays(section))
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "Log":
+        """
+        This method restores a log saved by to_arrays without reading the log file
+
+        Args:
+            arrays (Dict[str, np.ndarray]): The saved arrays
+
+        Returns:
+            Log: The restored log
+        """
+        log = cls.__new__(cls)
+        log.gen_info = GeneralInfo.from_bytes(
+            int(arrays["gen_info/rec"]),
+            int(arrays["gen_info/offset"]),
+            arrays["gen_info/payload"].tobytes(),
+        )
+        log.flight_time = datetime.timedelta(microseconds=int(arrays["flight_time"]))
+        for section, packet in LOG_SECTIONS.items():
+            setattr(log, section, LogTable.from_arrays(packet, section, arrays))
+        return log
 
     def get_name(self) -> str:
         """
@@ -417,6 +751,101 @@ class Log:
         return self.gen_info.get_drone_name()
 
 
+class Flight:
+    """
+    The Flight class holds the records of a single flight of a FlightRecord
+
+    The records are not copied, each section of the flight is a range of the rows of that section sorted by recNumb.
+    """
+
+    def __init__(
+        self,
+        record: "FlightRecord",
+        start: int,
+        end: int,
+        ranges: Dict[str, Tuple[int, int]],
+    ):
+        """
+        The constructor for the Flight class
+
+        Args:
+            record (FlightRecord): The flight record the flight belongs to
+            start (int): The begRecNumb of the flight
+            end (int): The begRecNumb of the next flight
+            ranges (Dict[str, Tuple[int, int]]): The range of sorted rows of each section
+
+        Returns:
+            None
+        """
+        self.record = record
+        self.start = start
+        self.end = end
+        self.ranges = ranges
+
+    def __len__(self):
+        return sum(hi - lo for lo, hi in self.ranges.values())
+
+    def __iter__(self) -> Iterator[LogRecord]:
+        """
+        Iterates over the records of every section in recNumb order
+        """
+        return heapq.merge(
+            *(self.records(section) for section in FLIGHT_SECTIONS),
+            key=lambda x: x["recNumb"],
+        )
+
+    def indices(self, section: str) -> np.ndarray:
+        """
+        This method returns the row indices of a section that belong to the flight
+
+        Args:
+            section (str): The name of the section in the Log such as "milli_detail"
+
+        Returns:
+            np.ndarray: A view of the row indices sorted by recNumb
+        """
+        lo, hi = self.ranges[section]
+        return self.record.orders[section][lo:hi]
+
+    def records(self, section: str) -> Iterator[LogRecord]:
+        """
+        This method returns the records of a section that belong to the flight
+
+        Args:
+            section (str): The name of the section in the Log such as "milli_detail"
+
+        Returns:
+            Iterator[LogRecord]: The records sorted by recNumb
+        """
+        return iter(self.table(section))
+
+    def table(self, section: str) -> LogTable:
+        """
+        This method returns the decoded records of a section that belong to the flight
+
+        The records are decoded on first access and kept by the FlightRecord.
+
+        Args:
+            section (str): The name of the section in the Log such as "milli_detail"
+
+        Returns:
+            LogTable: The records sorted by recNumb
+        """
+        return self.record.flight_table(self, section)
+
+    def rollup(self) -> LogTable:
+        """
+        This method returns the minute and second Rollup records of the flight
+
+        Returns:
+            LogTable: The records sorted by recNumb, the minute rollup comes first on equal recNumbs
+        """
+        rollup = LogTable.concat(
+            [self.table("minute_rollup"), self.table("second_rollup")]
+        )
+        return rollup.take(np.argsort(rollup.raw_column("recNumb"), kind="stable"))
+
+
 class FlightRecord:
     """
      The FlightRecord class is used to store the flight records of the drone
@@ -426,24 +855,125 @@ class FlightRecord:
     The Details log updates every millisecond and the Rollup log updates every second AND every minute. The FlightInfo log updates per flight. We need to be able to first split the minute rollup if there are multiple flights in the log. If there are multiple flights in the log, we need to split the minute rollup logs into two flights. Using the corresponding recNumbs in the minute rollup logs, we can determine the start and end of each flight. We can then splice together the second and minute rollup logs for each flight.
     """
 
-    def __init__(self, input: Union[str, Log]):
+    def __init__(
+        self,
+        input: Union[str, Log],
+        lazy: bool = False,
+        cache_size: int = 8,
+        disk_cache: Union[bool, LogCache] = False,
+        progress: Optional[Progress] = None,
+    ):
         """
         The constructor for the FlightRecord class
 
+        In lazy mode only the recNumbs of the Detail and Rollup records are decoded up front,
+        the other fields of a flight are decoded the first time the flight is read. Splicing
+        needs the recNumb of every record, so the whole log is still read and packed: lazy
+        mode saves the decode of the other fields and their memory, not the scan of the
+        file. Opening a log again is only fast through the disk_cache.
+
         Args:
             input (Union[str, Log]): The input can either be a string or a Log object
+            lazy (bool): Whether to decode the records of each flight on first access, only used when input is a string
+            cache_size (int): The number of flights whose decoded records are kept
+            disk_cache (Union[bool, LogCache]): The on-disk cache of decoded logs to load
+            the log from and save it to, True for the default LogCache. Only used when input is a string
+            progress (Optional[Progress]): Receives the progress of the "parse", "decode" and "splice" stages,
+            Progress.cancel() stops the decode by raising Cancelled
 
         Returns:
             None
         """
-        if isinstance(input, str):
-            self.log = Log(input)
-        else:
+        # The decoded records of the most recently read flights
+        self.cache: OrderedDict[Tuple[int, int, str], LogTable] = OrderedDict()
+        self.frames: OrderedDict[Tuple[int, int], List["pd.DataFrame"]] = OrderedDict()
+        self.cache_size = cache_size
+        # The statistics of every flight, computed when first requested
+        self.summaries: Optional[Dict[Tuple[int, int], FlightStats]] = None
+
+        if not isinstance(input, str):
             self.log = input
-
-        self.splice()
+            self.splice(progress)
+            # sort the flights by size in descending order
+            self.flights.reverse()
+            return
+
+        if disk_cache is True:
+            disk_cache = LogCache()
+        if disk_cache:
+            arrays = disk_cache.load(input, LAYOUT_VERSION)
+            if arrays is not None:
+                try:
+                    self.log = Log.from_arrays(arrays)
+                    self.load_splice(arrays)
+                    return
+                except (KeyError, ValueError):
+                    # An entry missing some arrays is decoded again and replaced
+                    disk_cache.remove(input, LAYOUT_VERSION)
+
+        self.log = Log(input, lazy=lazy, progress=progress)
+        self.splice(progress)
         # sort the flights by size in descending order
         self.flights.reverse()
+        if disk_cache:
+            disk_cache.store(
+                input, LAYOUT_VERSION, {**self.log.to_arrays(), **self.splice_arrays()}
+            )
+
+    def splice_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        This method returns the sorted row indices and flight ranges found by splice as arrays
+
+        Args:
+            None
+
+        Returns:
+            Dict[str, np.ndarray]: The arrays of the splice
+        """
+        arrays = {
+            f"splice/orders/{section}": order for section, order in self.orders.items()
+        }
+        arrays["splice/bounds"] = np.array(
+            [[flight.start, flight.end] for flight in self.flights], dtype=np.int64
+        ).reshape(-1, 2)
+        arrays["splice/ranges"] = np.array(
+            [
+                [flight.ranges[section] for section in FLIGHT_SECTIONS]
+                for flight in self.flights
+            ],
+            dtype=np.int64,
+        ).reshape(-1, len(FLIGHT_SECTIONS), 2)
+        return arrays
+
+    def load_splice(self, arrays: Dict[str, np.ndarray]):
+        """
+        This method restores the flights saved by splice_arrays instead of splicing the log again
+
+        Args:
+            arrays (Dict[str, np.ndarray]): The saved arrays
+
+        Returns:
+            None
+        """
+        self.orders = {
+            section: arrays[f"splice/orders/{section}"] for section in FLIGHT_SECTIONS
+        }
+        # The sorted recNumbs are only gathered if the log is extended
+        self.sorted_recs: Dict[str, np.ndarray] = {}
+        self.flights = [
+            Flight(
+                self,
+                int(start),
+                int(end),
+                {
+                    section: (int(lo), int(hi))
+                    for section, (lo, hi) in zip(FLIGHT_SECTIONS, ranges)
+                },
+            )
+            for (start, end), ranges in zip(
+                arrays["splice/bounds"], arrays["splice/ranges"]
+            )
+        ]
 
     def __len__(self):
         """
@@ -481,57 +1011,209 @@ class FlightRecord:
         """
         return self.log.get_name()
 
-    def to_dataframe(self, i: int = 0) -> List[pd.DataFrame]:
+    def to_dataframe(self, i: int = 0) -> List["pd.DataFrame"]:
         """
         This method converts the selected flight to a pandas DataFrame
 
+        The DataFrames are built straight from the typed columns of the flight and kept for later calls.
+        Each call returns shallow copies of the kept frames, so adding, dropping or replacing
+        a column does not reach later calls. The copies share the column values with the
+        record, a column converted in place (df[col] *= 10) must be replaced instead.
+
         Args:
-            number_of_flights (int): The number of flights to convert to a DataFrame
+            i (int): The index of the flight to convert to a DataFrame
 
         Returns:
-            List[pd.DataFrame]: A list of pandas DataFrames
+            List[pd.DataFrame]: The Rollup DataFrame and, if the flight has any, the Detail DataFrame
         """
+        flight = self.flights[i]
+        key = (flight.start, flight.end)
+        if key in self.frames:
+            self.frames.move_to_end(key)
+            return [frame.copy(deep=False) for frame in self.frames[key]]
+
+        import pandas as pd
+
         flights: List[pd.DataFrame] = []
-        flight = [x for x in self.flights[i] if x.__class__.__name__ == "Rollup"]
-        flight.sort(key=lambda x: x.structure["recNumb"])
-        data = {key: [] for key in flight[0].structure.keys()}
-        for record in flight:
-            for key, value in record.structure.items():
-                data[key].append(value)
+        with stage("to_dataframe") as span:
+            rollup = flight.rollup()
+            if len(rollup) == 0:
+                raise IndexError(f"Flight {i} has no Rollup records")
+            flights.append(pd.DataFrame(rollup.frame_columns(), copy=False))
+
+            detail = flight.table("milli_detail")
+            if len(detail) > 0:
+                flights.append(pd.DataFrame(detail.frame_columns(), copy=False))
+            span.rows = sum(len(frame) for frame in flights)
+            span.bytes = sum(
+                int(frame.memory_usage(index=False).sum()) for frame in flights
+            )
+
+        self.frames[key] = flights
+        while len(self.frames) > self.cache_size:
+            self.frames.popitem(last=False)
+        return [frame.copy(deep=False) for frame in flights]
+
+    def stats(self, i: int = 0) -> FlightStats:
+        """
+        This method returns the statistics and flag transitions of a flight
 
-        flights.append(pd.DataFrame(data))
+        The statistics of every flight are computed together in one pass over the sorted
+        sections the first time they are requested, and kept until the log is extended.
+        This pass is deliberately deferred rather than run while the records are decoded:
+        it reads every analog column and flag of the flight sections, which a lazy record
+        would otherwise have to decode up front even if stats is never called. On a lazy
+        record the first call therefore decodes those columns of the whole log.
 
-        flight = [x for x in self.flights[i] if x.__class__.__name__ == "Detail"]
-        flight.sort(key=lambda x: x.structure["recNumb"])
-        try:
-            data = {key: [] for key in flight[0].structure.keys()}
-            for record in flight:
-                for key, value in record.structure.items():
-                    data[key].append(value)
-            flights.append(pd.DataFrame(data))
-        except IndexError:
-            pass
+        Args:
+            i (int): The index of the flight
 
-        return flights
+        Returns:
+            FlightStats: The min, max and mean of each analog channel and the transitions of each flag, per section
+        """
+        if self.summaries is None:
+            per_section = {
+                section: section_stats(
+                    getattr(self.log, section),
+                    self.orders[section],
+                    [flight.ranges[section] for flight in self.flights],
+                )
+                for section in FLIGHT_SECTIONS
+            }
+            self.summaries = {
+                (flight.start, flight.end): FlightStats(
+                    {section: stats[j] for section, stats in per_section.items()}
+                )
+                for j, flight in enumerate(self.flights)
+            }
+        flight = self.flights[i]
+        return self.summaries[(flight.start, flight.end)]
+
+    def flight_table(self, flight: Flight, section: str) -> LogTable:
+        """
+        This method returns the decoded records of a section of a flight
 
-    def splice(self):
+        The tables of the last cache_size flights read are kept, the least recently used are discarded.
+
+        Args:
+            flight (Flight): The flight
+            section (str): The name of the section in the Log such as "milli_detail"
+
+        Returns:
+            LogTable: The records sorted by recNumb
+        """
+        key = (flight.start, flight.end, section)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        table = getattr(self.log, section).take(flight.indices(section))
+        self.cache[key] = table
+        while len(self.cache) > self.cache_size * len(FLIGHT_SECTIONS):
+            self.cache.popitem(last=False)
+        return table
+
+    def splice(self, progress: Optional[Progress] = None):
         """
         This method will use the flight events begRecNumb to determine each flight
-        We will loop though the flight events and hold the entry of the begRecNumb and the next begRecNumb in the flight events
-        If there are items within the comb list that are between the two begRecNumb values, we will add them to the flight list
+        Each section is sorted by recNumb once, then the begRecNumb of each flight event and of the next flight event are searched in the sorted recNumbs
+        The records of a flight are the range of sorted rows of each section between the two begRecNumb values
+
+        Args:
+            progress (Optional[Progress]): Receives the progress after each section is sorted
         """
+        # The sorted row indices and recNumbs of each section
+        self.orders: Dict[str, np.ndarray] = {}
+        sorted_recs: Dict[str, np.ndarray] = {}
+        # Only kept by extend, a log that is never extended does not hold them
+        self.sorted_recs: Dict[str, np.ndarray] = {}
+        with stage("splice") as span:
+            for i, section in enumerate(FLIGHT_SECTIONS):
+                report(progress, "splice", i, len(FLIGHT_SECTIONS) + 1)
+                rec = getattr(self.log, section).raw_column("recNumb")
+                with stage("splice/sort", len(rec), rec.nbytes):
+                    self.orders[section] = np.argsort(rec, kind="stable")
+                sorted_recs[section] = rec[self.orders[section]]
+                span.rows += len(rec)
+
+            report(progress, "splice", len(FLIGHT_SECTIONS), len(FLIGHT_SECTIONS) + 1)
+            self.flights = self.bound_flights(sorted_recs)
+        report(progress, "splice", 1, 1)
+
+    def bound_flights(self, sorted_recs: Dict[str, np.ndarray]) -> List[Flight]:
+        """
+        This method searches the begRecNumb of each flight event and of the next flight event in the sorted recNumbs
 
-        comb: List[BaseLog] = (
-            self.log.milli_detail + self.log.minute_rollup + self.log.second_rollup
-        )
-        comb.sort(key=lambda x: x.structure["recNumb"])
+        Args:
+            sorted_recs (Dict[str, np.ndarray]): The sorted recNumbs of each section
 
-        self.flights = []
-        for i in range(len(self.log.flight_events) - 1):
-            start = self.log.flight_events[i].structure["begRecNumb"]
-            end = self.log.flight_events[i + 1].structure["begRecNumb"]
+        Returns:
+            List[Flight]: The flights with any records, in the order of the flight events
+        """
+        beg = self.log.flight_events.raw_column("begRecNumb")
+        starts, ends = beg[:-1], beg[1:]
+        bounds = {
+            section: (
+                np.searchsorted(sorted_recs[section], starts, side="left"),
+                np.searchsorted(sorted_recs[section], ends, side="left"),
+            )
+            for section in FLIGHT_SECTIONS
+        }
 
-            flight = [x for x in comb if start <= x.structure["recNumb"] < end]
+        flights = []
+        for i in range(len(starts)):
+            ranges = {}
+            for section, (lo, hi) in bounds.items():
+                # A flight event starting after the next one has no records
+                ranges[section] = (int(lo[i]), int(max(lo[i], hi[i])))
+            flight = Flight(self, int(starts[i]), int(ends[i]), ranges)
 
             if len(flight) > 0:
-                self.flights.append(flight)
+                flights.append(flight)
+        return flights
+
+    def extend(self, added: Dict[str, int]):
+        """
+        This method updates the flights after records were appended to the sections of the log
+
+        The new rows are merged into the sorted rows and recNumbs of each section and the flights are bounded
+        again by binary search, so the existing rows are neither sorted, gathered nor decoded again. A flight that gained records
+        is extended and a new flight event opens a new flight. The cached records of extended flights are dropped.
+
+        Args:
+            added (Dict[str, int]): The number of rows appended to the end of each section, including "flight_events"
+
+        Returns:
+            None
+        """
+        sorted_recs = self.sorted_recs
+        for section in FLIGHT_SECTIONS:
+            rec = getattr(self.log, section).raw_column("recNumb")
+            order = self.orders[section]
+            count = added.get(section, 0)
+            if section not in sorted_recs:
+                sorted_recs[section] = rec[order]
+            if count:
+                new = np.arange(len(rec) - count, len(rec))
+                new = new[np.argsort(rec[new], kind="stable")]
+                # Placed after the existing rows with the same recNumb, as a stable sort would
+                positions = np.searchsorted(
+                    sorted_recs[section], rec[new], side="right"
+                )
+                self.orders[section] = np.insert(order, positions, new)
+                sorted_recs[section] = np.insert(
+                    sorted_recs[section], positions, rec[new]
+                )
+
+        previous = {(flight.start, flight.end): flight for flight in self.flights}
+        self.flights = self.bound_flights(sorted_recs)
+        self.summaries = None
+        # sort the flights by size in descending order
+        self.flights.reverse()
+
+        for flight in self.flights:
+            old = previous.get((flight.start, flight.end))
+            if old is not None and old.ranges != flight.ranges:
+                self.frames.pop((flight.start, flight.end), None)
+                for section in FLIGHT_SECTIONS:
+                    self.cache.pop((flight.start, flight.end, section), None)
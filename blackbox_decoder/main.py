@@ -1,17 +1,379 @@
 import argparse
-from typing import Dict, List
-
-from bitstring import BitArray, Bits, BitStream, pack
+import datetime
+import os
+import sys
+import time
+from typing import List, Optional
 
 # from blackbox_decoder.app import app
-from blackbox_decoder.log import Log, FlightRecord
-from blackbox_decoder.parse import parse_log
+from blackbox_decoder.batch import decode_batch, find_logs
+from blackbox_decoder.follow import LogFollower
+from blackbox_decoder.index import FleetIndex
+from blackbox_decoder.log import FLIGHT_SECTIONS, Log, FlightRecord
+from blackbox_decoder.profiler import Profiler
+from blackbox_decoder.stats import analog_fields
+
+
+def open_record(path: str, args: argparse.Namespace) -> FlightRecord:
+    # Only the recNumbs are decoded up front, the other fields when a command reads them
+    return FlightRecord(path, lazy=True, disk_cache=args.cache)
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Parse a log file")
-    parser.add_argument("log", type=str, help="The log file to parse")
 
-    args = parser.parse_args()
+def format_value(value: Optional[float]) -> str:
+    return "" if value is None else f"{value:g}"
+
+
+def decode(args: argparse.Namespace) -> int:
     log = Log(args.log)
     record = FlightRecord(log)
     print(record.to_dataframe())
+    return 0
+
+
+def summary(args: argparse.Namespace) -> int:
+    paths = [path for target in args.paths for path in find_logs(target)]
+    print("path\tdrone\tflights\tflight_time", flush=True)
+    failed = 0
+    for path in paths:
+        try:
+            record = open_record(path, args)
+        except Exception as e:
+            failed += 1
+            print(f"{path}\tERROR\t{e.__class__.__name__}: {e}", file=sys.stderr)
+            continue
+        print(
+            "\t".join(
+                [
+                    path,
+                    record.get_drone_name(),
+                    str(len(record)),
+                    str(record.get_flight_time()),
+                ]
+            ),
+            flush=True,
+        )
+    return 1 if failed else 0
+
+
+def flights(args: argparse.Namespace) -> int:
+    record = open_record(args.log, args)
+    print(
+        "\t".join(["flight", "begRecNumb", "endRecNumb", *FLIGHT_SECTIONS]), flush=True
+    )
+    for i, flight in enumerate(record.flights):
+        print(
+            "\t".join(
+                [
+                    str(i),
+                    str(flight.start),
+                    str(flight.end),
+                    *(str(hi - lo) for lo, hi in flight.ranges.values()),
+                ]
+            ),
+            flush=True,
+        )
+    return 0
+
+
+def stats(args: argparse.Namespace) -> int:
+    record = open_record(args.log, args)
+    indices = args.flight if args.flight else range(len(record))
+    invalid = [i for i in indices if not 0 <= i < len(record)]
+    if invalid:
+        args.parser.error(
+            f"argument -f/--flight: invalid flight {invalid[0]}, "
+            f"{args.log} has {len(record)} flights numbered from 0"
+        )
+    channels = analog_fields(getattr(record.log, args.section).packet)
+    print("flight\trows\tchannel\tmin\tmax\tmean", flush=True)
+    for i in indices:
+        section = record.stats(i).sections[args.section]
+        for channel in channels:
+            values = section.channels[channel]
+            print(
+                "\t".join(
+                    [
+                        str(i),
+                        str(section.rows),
+                        channel,
+                        *(format_value(value) for value in values),
+                    ]
+                ),
+                flush=True,
+            )
+    return 0
+
+
+def export(args: argparse.Namespace) -> int:
+    # pyarrow is only imported by the command that needs it
+    from blackbox_decoder.export import write_flights, write_flights_csv, write_log
+
+    if args.per_flight:
+        record = open_record(args.log, args)
+        if args.format == "csv":
+            paths = write_flights_csv(record, args.output)
+        else:
+            paths = write_flights(record, args.output, args.format, args.compression)
+    else:
+        # The sections are written as they are, without splicing the flights
+        log = (
+            open_record(args.log, args).log if args.cache else Log(args.log, lazy=True)
+        )
+        if args.format == "csv":
+            paths = log.write_csv(args.output)
+        else:
+            paths = write_log(log, args.output, args.format, args.compression)
+    for path in paths:
+        print(path, flush=True)
+    return 0
+
+
+def batch(args: argparse.Namespace) -> int:
+    paths = [path for target in args.paths for path in find_logs(target)]
+    failed = 0
+    for result in decode_batch(paths, args.workers, args.output):
+        if result.error is not None:
+            failed += 1
+            print(f"{result.path}\tERROR\t{result.error}", file=sys.stderr)
+            continue
+        print(
+            "\t".join(
+                [
+                    result.path,
+                    result.drone_name,
+                    str(result.flight_count),
+                    str(result.flight_time),
+                    *result.outputs,
+                ]
+            ),
+            flush=True,
+        )
+    print(f"Decoded {len(paths) - failed}/{len(paths)} logs", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def follow(args: argparse.Namespace) -> int:
+    follower = LogFollower(args.log)
+    try:
+        while True:
+            new = follower.poll()
+            if new:
+                print(
+                    "\t".join(
+                        [
+                            *(
+                                f"{section}+{len(table)}"
+                                for section, table in new.items()
+                            ),
+                            f"flights={len(follower.record)}",
+                        ]
+                    ),
+                    flush=True,
+                )
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        return 0
+
+
+def index(args: argparse.Namespace) -> int:
+    paths = [path for target in args.paths for path in find_logs(target)]
+    with FleetIndex(args.db) as fleet:
+        failed = 0
+        for path, result in fleet.update(paths).items():
+            if isinstance(result, str):
+                failed += 1
+                print(f"{path}\tERROR\t{result}", file=sys.stderr)
+            else:
+                print(f"{path}\t{result} flights", file=sys.stderr)
+
+        if args.drone or args.since or args.where:
+            for row in fleet.query(args.drone, since=args.since, where=args.where):
+                print(
+                    "\t".join(
+                        str(row[name])
+                        for name in ("path", "flight", "drone", "logBegin")
+                    ),
+                    flush=True,
+                )
+    return 1 if failed else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Parse a log file")
+    parser.add_argument(
+        "--profile",
+        type=str,
+        default=None,
+        help="Time the stages of the decode and save them to this JSON file, "
+        "in the Chrome trace format if it ends with .trace.json. "
+        "The worker processes of a batch are profiled with BLACKBOX_PROFILE",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    decode_parser = subparsers.add_parser("decode", help="Decode a single log file")
+    decode_parser.add_argument("log", type=str, help="The log file to parse")
+    decode_parser.set_defaults(func=decode)
+
+    def add_cache_argument(subparser: argparse.ArgumentParser):
+        subparser.add_argument(
+            "--cache",
+            action="store_true",
+            help="Load the decoded log from the on-disk cache, or save it there",
+        )
+
+    summary_parser = subparsers.add_parser(
+        "summary", help="Print the drone, flight count and flight time of log files"
+    )
+    summary_parser.add_argument(
+        "paths", type=str, nargs="+", help="Directories, glob patterns or log files"
+    )
+    add_cache_argument(summary_parser)
+    summary_parser.set_defaults(func=summary)
+
+    flights_parser = subparsers.add_parser(
+        "flights", help="List the flights of a log file with their recNumb ranges"
+    )
+    flights_parser.add_argument("log", type=str, help="The log file to parse")
+    add_cache_argument(flights_parser)
+    flights_parser.set_defaults(func=flights)
+
+    stats_parser = subparsers.add_parser(
+        "stats", help="Print the min, max and mean of each channel of each flight"
+    )
+    stats_parser.add_argument("log", type=str, help="The log file to parse")
+    stats_parser.add_argument(
+        "-f",
+        "--flight",
+        type=int,
+        action="append",
+        default=None,
+        help="Only this flight, can be repeated (default: every flight)",
+    )
+    stats_parser.add_argument(
+        "-s",
+        "--section",
+        choices=FLIGHT_SECTIONS,
+        default="milli_detail",
+        help="The section the channels are read from (default: milli_detail)",
+    )
+    add_cache_argument(stats_parser)
+    stats_parser.set_defaults(func=stats, parser=stats_parser)
+
+    export_parser = subparsers.add_parser(
+        "export", help="Write the sections or the flights of a log file to files"
+    )
+    export_parser.add_argument("log", type=str, help="The log file to parse")
+    export_parser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        default=".",
+        help="The directory to write the files to (default: the current directory)",
+    )
+    export_parser.add_argument(
+        "--format",
+        choices=["csv", "parquet", "arrow"],
+        default="csv",
+        help="The format of the files, parquet and arrow need pyarrow (default: csv)",
+    )
+    export_parser.add_argument(
+        "--per-flight",
+        action="store_true",
+        help="Write the Rollup and Detail records of each flight to a flight=<i> "
+        "directory instead of a file per section",
+    )
+    export_parser.add_argument(
+        "--compression",
+        type=str,
+        default="zstd",
+        help="The compression codec of parquet and arrow files (default: zstd)",
+    )
+    add_cache_argument(export_parser)
+    export_parser.set_defaults(func=export)
+
+    batch_parser = subparsers.add_parser(
+        "batch", help="Decode the log files of directories or glob patterns"
+    )
+    batch_parser.add_argument(
+        "paths", type=str, nargs="+", help="Directories, glob patterns or log files"
+    )
+    batch_parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=None,
+        help="The number of worker processes (default: the number of CPUs)",
+    )
+    batch_parser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        default=None,
+        help="Write the CSV files of each log to a subdirectory of this directory",
+    )
+    batch_parser.set_defaults(func=batch)
+
+    follow_parser = subparsers.add_parser(
+        "follow", help="Decode the records appended to a log file as it is written"
+    )
+    follow_parser.add_argument("log", type=str, help="The log file to follow")
+    follow_parser.add_argument(
+        "-i",
+        "--interval",
+        type=float,
+        default=1.0,
+        help="The number of seconds between reads (default: 1)",
+    )
+    follow_parser.set_defaults(func=follow)
+
+    index_parser = subparsers.add_parser(
+        "index", help="Index the flights of log files and query the index"
+    )
+    index_parser.add_argument(
+        "paths",
+        type=str,
+        nargs="*",
+        help="Directories, glob patterns or log files to index if new or changed",
+    )
+    index_parser.add_argument(
+        "--db",
+        type=str,
+        default=None,
+        help="The index database (default: fleet.sqlite in the cache directory)",
+    )
+    index_parser.add_argument(
+        "--drone", type=str, default=None, help="List the flights of this drone ID"
+    )
+    index_parser.add_argument(
+        "--since",
+        type=datetime.datetime.fromisoformat,
+        default=None,
+        help="List the flights of logs dumped since this ISO date",
+    )
+    index_parser.add_argument(
+        "--where",
+        type=str,
+        default=None,
+        help='List the flights matching an SQL condition, e.g. "numbBattDrainChanges > 0"',
+    )
+    index_parser.set_defaults(func=index)
+
+    args = parser.parse_args(argv)
+    try:
+        if args.profile is None:
+            return args.func(args)
+
+        with Profiler() as profiler:
+            try:
+                return args.func(args)
+            finally:
+                profiler.save(args.profile)
+                print(profiler.report(), file=sys.stderr)
+    except BrokenPipeError:
+        # The reader of the output, such as head, exited before the end
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
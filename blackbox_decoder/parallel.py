@@ -0,0 +1,149 @@
+"""
+Parallel decoding of the large sections of a single log
+
+The packed records of a section are placed in shared memory and split into contiguous
+chunks of rows. Each worker process decodes its chunk and writes the typed columns
+straight into a second shared memory block, so only the names of the blocks and the row
+ranges are pickled between the processes.
+"""
+
+from concurrent.futures import Executor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from blackbox_decoder.decode import decode_packed
+from blackbox_decoder.table import LogTable, field_dtype
+
+# Sections with fewer rows are decoded in the calling process
+MIN_PARALLEL_ROWS = 100_000
+
+
+def split_chunks(rows: int, chunks: int) -> List[Tuple[int, int]]:
+    """
+    Splits a number of rows into contiguous ranges of about the same size
+
+    Args:
+        rows (int): The number of rows
+        chunks (int): The number of ranges
+
+    Returns:
+        List[Tuple[int, int]]: The start and stop of each non empty range
+    """
+    bounds = np.linspace(0, rows, chunks + 1).astype(int)
+    return [
+        (start, stop) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start
+    ]
+
+
+def column_offsets(packet: type, rows: int) -> Dict[str, Tuple[int, np.dtype]]:
+    """
+    The layout of the decoded columns of a section in a single buffer
+
+    Args:
+        packet (type): The packet class of the section
+        rows (int): The number of rows of the section
+
+    Returns:
+        Dict[str, Tuple[int, np.dtype]]: The byte offset and dtype of each column
+    """
+    layout = {}
+    offset = 0
+    for key, (fmt, size) in packet.get_size_struct().items():
+        dtype = field_dtype(fmt, size)
+        layout[key] = (offset, dtype)
+        offset += rows * dtype.itemsize
+    return layout
+
+
+def decode_chunk(
+    packet: type, packed_name: str, columns_name: str, rows: int, start: int, stop: int
+):
+    """
+    Decodes a range of rows of the shared packed records into the shared columns, this is
+    the task run by each worker process
+
+    Args:
+        packet (type): The packet class of the section
+        packed_name (str): The name of the shared memory block holding the packed records
+        columns_name (str): The name of the shared memory block receiving the columns
+        rows (int): The number of rows of the whole section
+        start (int): The first row of the chunk
+        stop (int): The row after the last row of the chunk
+    """
+    packed_shm = SharedMemory(name=packed_name)
+    columns_shm = SharedMemory(name=columns_name)
+    try:
+        packed = np.ndarray(
+            (rows, packet.packet_size()), dtype=np.uint8, buffer=packed_shm.buf
+        )
+        columns = decode_packed(packet, packed[start:stop], scale=False)
+        for key, (offset, dtype) in column_offsets(packet, rows).items():
+            column = np.ndarray(
+                (rows,), dtype=dtype, buffer=columns_shm.buf, offset=offset
+            )
+            column[start:stop] = columns[key]
+        # The views must be released before the blocks are closed
+        del packed, column
+    finally:
+        packed_shm.close()
+        columns_shm.close()
+
+
+def decode_parallel(
+    packet: type, packed: np.ndarray, executor: Executor, chunks: int
+) -> LogTable:
+    """
+    Decodes the packed records of a section in chunks across worker processes
+
+    Only packets without byte fields, such as Detail and Rollup, can be decoded this way.
+
+    Args:
+        packet (type): The packet class of the section
+        packed (np.ndarray): A (N, packet_size) array of uint8
+        executor (Executor): The pool of worker processes
+        chunks (int): The number of chunks to split the rows into
+
+    Returns:
+        LogTable: The decoded section, in the original order of the rows
+    """
+    rows = len(packed)
+    layout = column_offsets(packet, rows)
+    size = sum(rows * dtype.itemsize for _, dtype in layout.values())
+
+    packed_shm = SharedMemory(create=True, size=max(packed.nbytes, 1))
+    columns_shm = SharedMemory(create=True, size=max(size, 1))
+    try:
+        shared = np.ndarray(packed.shape, dtype=np.uint8, buffer=packed_shm.buf)
+        shared[:] = packed
+        del shared
+
+        futures = [
+            executor.submit(
+                decode_chunk,
+                packet,
+                packed_shm.name,
+                columns_shm.name,
+                rows,
+                start,
+                stop,
+            )
+            for start, stop in split_chunks(rows, chunks)
+        ]
+        for future in futures:
+            future.result()
+
+        columns = {
+            key: np.ndarray(
+                (rows,), dtype=dtype, buffer=columns_shm.buf, offset=offset
+            ).copy()
+            for key, (offset, dtype) in layout.items()
+        }
+    finally:
+        packed_shm.close()
+        packed_shm.unlink()
+        columns_shm.close()
+        columns_shm.unlink()
+
+    return LogTable(packet, columns)
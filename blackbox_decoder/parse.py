@@ -1,5 +1,16 @@
+import binascii
+import codecs
 import datetime
+import mmap
+import os
 import re
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+import numpy as np
+
+from blackbox_decoder.profiler import stage
+from blackbox_decoder.progress import Progress, report
 
 HEADER = [
     "General Info",
@@ -32,7 +43,638 @@ PATTERNS = {
 }
 
 
-def parse_log(log: str) -> dict:
+# Section dispatch table: the stripped header line to the pattern of its rows, the
+# PATTERNS without their capture groups as only the whole row is checked
+SECTIONS = {
+    header: re.compile(pattern.pattern.replace("(", "(?:"))
+    for header, pattern in PATTERNS.items()
+}
+
+# Byte patterns matching a whole block of consecutive rows of each section, built from
+# the PATTERNS without their capture groups and with whitespace kept within a line
+ROW_BLOCKS = {
+    header: re.compile(
+        rb"(?:[ \t]*"
+        + pattern.pattern[1:-1].replace("(", "(?:").replace(r"\s+", r"[ \t]+").encode()
+        + rb"[ \t]*(?:\r\n|\r|\n|\Z))+"
+    )
+    for header, pattern in PATTERNS.items()
+}
+# The record number and offset columns at the start of each row of a block
+ROW_PREFIX = re.compile(rb"^[ \t]*\d+[ \t]+0x[0-9a-fA-F]+[ \t]+", re.MULTILINE)
+LINE = re.compile(rb"[^\r\n]*(?:\r\n|\r|\n)?")
+
+# The number of lines read between progress reports of the text reader
+PROGRESS_LINES = 1 << 16
+
+# The number of lines of a section checked at once by split_rows
+ROW_BATCH = 4096
+
+# The value of each ASCII hex digit, 16 for the other bytes
+HEX_VALUES = np.full(256, 16, dtype=np.uint8)
+for i, digit in enumerate(b"0123456789abcdef"):
+    HEX_VALUES[digit] = HEX_VALUES[bytes([digit]).upper()[0]] = i
+# The whitespace stripped from the end of a row
+BLANK = np.zeros(256, dtype=bool)
+BLANK[list(b" \t\n\r\x0b\x0c")] = True
+
+
+class RowTemplate:
+    """
+    The columns of a row of a section as written by the powerboard
+
+    A row is its 3 digit record number, 3 spaces, the 0x prefixed 4 digit offset, 2 spaces
+    and the hex words of its packet separated by single spaces, any whitespace may follow.
+    The widths of the words are read from the PATTERNS of the section.
+
+    Args:
+        pattern (re.Pattern): The pattern of the rows in PATTERNS
+    """
+
+    def __init__(self, pattern: re.Pattern):
+        rec, offset, *words = (
+            int(n) for n in re.findall(r"\{(\d+)\}", pattern.pattern)
+        )
+        row = (
+            "d" * rec + "   0x" + "h" * offset + "  " + " ".join("h" * w for w in words)
+        )
+        self.width = len(row)
+        self.size = sum(words) // 2
+        kinds = np.frombuffer(row.encode(), dtype=np.uint8)
+        self.digits = np.flatnonzero(kinds == ord("d"))
+        # The offset and the packet are read as one run of hex digits
+        self.hex = np.flatnonzero(kinds == ord("h"))
+        self.literals = np.flatnonzero((kinds != ord("d")) & (kinds != ord("h")))
+        self.literal_values = kinds[self.literals]
+
+    def split(
+        self, lines: Sequence[str]
+    ) -> Tuple[np.ndarray, List[Optional[Tuple[int, int, bytes]]]]:
+        """
+        Checks which lines are rows written exactly in the columns of the template and
+        splits them into their record number, offset and payload
+
+        Args:
+            lines (Sequence[str]): The lines
+
+        Returns:
+            Tuple[np.ndarray, List[Optional[Tuple[int, int, bytes]]]]: Whether each line
+            is such a row, and the record number, offset and payload of each line, only
+            meaningful for the rows
+        """
+        lengths = np.fromiter(map(len, lines), dtype=np.int64, count=len(lines))
+        # Every other character is replaced by a single byte, keeping the positions
+        text = np.frombuffer("".join(lines).encode("ascii", "replace"), np.uint8)
+        if len(lines) == 0 or lengths.min() < self.width:
+            matched = lengths >= self.width
+            if not matched.any():
+                return matched, [None] * len(lines)
+        else:
+            matched = np.ones(len(lines), dtype=bool)
+
+        if (lengths == lengths[0]).all():
+            # Lines of the same length are the rows of a matrix of their bytes
+            rows = text.reshape(len(lines), lengths[0])
+            chars = rows[:, : self.width]
+            # Only whitespace may follow the last word
+            matched &= BLANK[rows[:, self.width :]].all(axis=1)
+        else:
+            ends = np.cumsum(lengths)
+            starts = ends - lengths
+            columns = np.minimum(starts[:, None] + np.arange(self.width), len(text) - 1)
+            chars = text[columns]
+            filled = np.concatenate(([0], np.cumsum(~BLANK[text])))
+            matched &= filled[ends] == filled[np.minimum(starts + self.width, ends)]
+
+        nibbles = HEX_VALUES[chars[:, self.hex]]
+        matched &= (
+            (chars[:, self.literals] == self.literal_values).all(axis=1)
+            & (chars[:, self.digits] - ord("0") < 10).all(axis=1)
+            & (nibbles < 16).all(axis=1)
+        )
+
+        packed = nibbles[:, 0::2] << 4 | nibbles[:, 1::2]
+        recs = (chars[:, self.digits] - ord("0")).astype(np.int64) @ [100, 10, 1]
+        offsets = packed[:, 0].astype(np.int64) << 8 | packed[:, 1]
+        payload = packed[:, 2:].tobytes()
+        size = self.size
+        payloads = [payload[i : i + size] for i in range(0, len(payload), size)]
+        return matched, list(zip(recs.tolist(), offsets.tolist(), payloads))
+
+
+ROW_TEMPLATES = {header: RowTemplate(pattern) for header, pattern in PATTERNS.items()}
+
+# States of the section parser
+SEARCH = 0  # Looking for a section header
+DESCRIPTION = 1  # Skipping the format description line following a header
+ROWS = 2  # Reading the rows of a section
+
+
+def parse_timestamp(line: str, timestamp: str) -> datetime.datetime:
+    """
+    Parses the timestamp of a [BEGIN] or [END] line
+
+    Args:
+        line (str): The line containing the timestamp
+        timestamp (str): The TIMESTAMP marker of the line
+
+    Returns:
+        datetime.datetime: The parsed timestamp
+    """
+    line = line.replace(timestamp, "").strip("\ufeff").strip()
+    return datetime.datetime.strptime(line, FORMAT)
+
+
+def find_header(line: str) -> Optional[str]:
+    """
+    Finds the section a header line starts
+
+    The line only has to contain the name of the section, text around it is ignored.
+
+    Args:
+        line (str): A line that is not a row
+
+    Returns:
+        Optional[str]: The HEADER of the section, None if the line is not a header
+    """
+    for header in HEADER:
+        if header in line:
+            return header
+    return None
+
+
+class LineScanner:
+    """
+    The section state machine over the lines of a log file
+
+    The state is kept between calls to scan so the lines of a log can be fed in pieces
+    while it is written. The rows of a section are read ROW_BATCH lines at a time and
+    checked and split together by split_rows.
+    """
+
+    def __init__(self):
+        self.state = SEARCH
+        self.section = ""
+
+    def scan_rows(
+        self, lines: Iterable[str]
+    ) -> Iterator[Tuple[str, List[str], List[Tuple[int, int, bytes]]]]:
+        """
+        Runs the state machine over lines of the log following the lines already scanned
+
+        Args:
+            lines (Iterable[str]): The lines of the log
+
+        Yields:
+            Tuple[str, List[str], List[Tuple[int, int, bytes]]]: The section, a batch of
+            its rows and their record number, offset and payload, or a timestamp, its
+            stripped line and no records
+        """
+        lines = iter(lines)
+        ahead: List[str] = []
+        while True:
+            if self.state == ROWS:
+                batch = ahead + list(islice(lines, max(ROW_BATCH - len(ahead), 1)))
+                if not batch:
+                    return
+                records = split_rows(batch, self.section)
+                if records:
+                    yield self.section, batch[: len(records)], records
+                ahead = batch[len(records) :]
+                if not ahead:
+                    continue
+                # The end of the section, the line may start the next one
+                self.state = SEARCH
+
+            if ahead:
+                line = ahead.pop(0).strip()
+            else:
+                line = next(lines, None)
+                if line is None:
+                    return
+                line = line.strip()
+            if self.state == DESCRIPTION:
+                self.state = ROWS
+                continue
+            header = find_header(line)
+            if header is not None:
+                self.section = header
+                self.state = DESCRIPTION
+            else:
+                for timestamp in TIMESTAMP:
+                    if timestamp in line:
+                        yield timestamp, [line], []
+
+    def scan(self, lines: Iterable[str]) -> Iterator[Tuple[str, str]]:
+        """
+        Runs the state machine over lines of the log following the lines already scanned
+
+        Args:
+            lines (Iterable[str]): The lines of the log
+
+        Yields:
+            Tuple[str, str]: The section or timestamp and the stripped line
+        """
+        for section, rows, _ in self.scan_rows(lines):
+            for row in rows:
+                yield section, row.strip()
+
+
+def scan_lines(file: TextIO) -> Iterator[Tuple[str, str]]:
+    """
+    Runs the section state machine over the lines of a log file
+
+    Yields a (section, line) tuple for every row matching the PATTERNS of its section
+    and a (TIMESTAMP, line) tuple for the [BEGIN] and [END] lines.
+
+    Args:
+        file (TextIO): The log file opened in text mode
+
+    Yields:
+        Tuple[str, str]: The section or timestamp and the stripped line
+    """
+    return LineScanner().scan(file)
+
+
+def track_lines(
+    file: TextIO, size: int, progress: Optional[Progress] = None
+) -> Iterator[str]:
+    """
+    Yields the lines of a log file and reports how much of it was read
+
+    Args:
+        file (TextIO): The log file opened in text mode
+        size (int): The size of the file in bytes
+        progress (Optional[Progress]): Receives the number of bytes read every PROGRESS_LINES lines
+
+    Yields:
+        str: The lines of the file
+    """
+    done = 0
+    for i, line in enumerate(file):
+        # Each UTF-16 code unit is 2 bytes
+        done += 2 * len(line)
+        if i % PROGRESS_LINES == 0:
+            report(progress, "parse", done, size)
+        yield line
+    report(progress, "parse", size, size)
+
+
+def split_row(line: str) -> Tuple[int, int, bytes]:
+    """
+    Splits a row into its record number, offset and payload
+
+    Args:
+        line (str): A stripped row yielded by scan_lines
+
+    Returns:
+        Tuple[int, int, bytes]: The record number, offset and payload of the row
+    """
+    rec, offset, payload = line.split(None, 2)
+    return int(rec), int(offset, 16), bytes.fromhex(payload)
+
+
+def check_row(line: str, section: str) -> Optional[Tuple[int, int, bytes]]:
+    """
+    Checks a line against the PATTERNS of a section and splits it
+
+    Args:
+        line (str): The line
+        section (str): The HEADER of the section
+
+    Returns:
+        Optional[Tuple[int, int, bytes]]: The record number, offset and payload of the row, None if the line is not a row of the section
+    """
+    line = line.strip()
+    if SECTIONS[section].match(line) is None:
+        return None
+    return split_row(line)
+
+
+def split_rows(lines: Sequence[str], section: str) -> List[Tuple[int, int, bytes]]:
+    """
+    Checks consecutive lines of a section at once and splits the rows
+
+    The lines written in the columns of the RowTemplate of the section, as the powerboard
+    writes them, are checked and split together on their bytes. The other lines are
+    checked one by one against the PATTERNS, so exactly the same rows are accepted.
+
+    Args:
+        lines (Sequence[str]): The lines following the rows already read
+        section (str): The HEADER of the section
+
+    Returns:
+        List[Tuple[int, int, bytes]]: The record number, offset and payload of the rows
+        up to the first line that is not a row of the section
+    """
+    matched, records = ROW_TEMPLATES[section].split(lines)
+    for i in np.flatnonzero(~matched).tolist():
+        record = check_row(lines[i], section)
+        if record is None:
+            return records[:i]
+        records[i] = record
+    return records
+
+
+def iter_records(
+    log: str, progress: Optional[Progress] = None
+) -> Iterator[Tuple[str, int, int, bytes]]:
+    """
+    Reads the records of a log file one at a time
+
+    Only a batch of ROW_BATCH lines is held in memory so the log can be decoded while it is read.
+
+    Args:
+        log (str): The path to the log file
+        progress (Optional[Progress]): Receives the progress of the read
+
+    Yields:
+        Tuple[str, int, int, bytes]: The section, record number, offset and payload of each record
+    """
+    size = os.path.getsize(log)
+    with open(log, "r", encoding="utf-16-le") as file:
+        lines = track_lines(file, size, progress)
+        for section, _, records in LineScanner().scan_rows(lines):
+            for record in records:
+                yield (section, *record)
+
+
+class LogTail:
+    """
+    The LogTail class reads the records appended to a log file that is still being written
+
+    The byte offset of the last complete line and the state of the section parser are kept
+    between reads, so each read only visits the new lines. A line is only read once its
+    line break has been written.
+
+    Args:
+        log (str): The path to the log file
+    """
+
+    def __init__(self, log: str):
+        self.log = log
+        self.position = 0
+        self.scanner = LineScanner()
+        self.beginning: Optional[datetime.datetime] = None
+        self.end: Optional[datetime.datetime] = None
+
+    def read(self) -> Iterator[Tuple[str, int, int, bytes]]:
+        """
+        Reads the records of the complete lines appended since the last read
+
+        The [BEGIN] and [END] timestamps are kept in the beginning and end attributes.
+
+        Yields:
+            Tuple[str, int, int, bytes]: The section, record number, offset and payload of each new record
+        """
+        with open(self.log, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            if size < self.position:
+                raise ValueError(f"{self.log} was truncated while it was followed")
+            file.seek(self.position)
+            data = file.read(size - self.position)
+
+        # Only whole UTF-16 code units up to the last line break are read
+        text = data[: len(data) & ~1].decode("utf-16-le", errors="ignore")
+        stop = text.rfind("\n") + 1
+        if stop == 0:
+            return
+        text = text[:stop]
+        self.position += len(text.encode("utf-16-le"))
+
+        for section, rows, records in self.scanner.scan_rows(text.splitlines()):
+            if section == TIMESTAMP[0]:
+                self.beginning = parse_timestamp(rows[0], TIMESTAMP[0])
+            elif section == TIMESTAMP[1]:
+                self.end = parse_timestamp(rows[0], TIMESTAMP[1])
+            else:
+                for record in records:
+                    yield (section, *record)
+
+    def flight_time(self) -> datetime.timedelta:
+        """
+        The time between the [BEGIN] and [END] timestamps read so far
+
+        Returns:
+            datetime.timedelta: The time between the timestamps, 0 until both were read
+        """
+        if self.beginning is None or self.end is None:
+            return datetime.timedelta(0)
+        return self.end - self.beginning
+
+
+def flight_time(
+    beginning: Optional[datetime.datetime], end: Optional[datetime.datetime]
+) -> datetime.timedelta:
+    # A log still being written has no [END] timestamp yet
+    if beginning is None or end is None:
+        return datetime.timedelta(0)
+    return end - beginning
+
+
+def read_timestamps(
+    log: str,
+) -> Tuple[Optional[datetime.datetime], Optional[datetime.datetime]]:
+    """
+    Reads the [BEGIN] and [END] timestamps without reading the whole log
+
+    Args:
+        log (str): The path to the log file
+
+    Returns:
+        Tuple[Optional[datetime.datetime], Optional[datetime.datetime]]: The beginning and end of the dump of the log, None for a missing timestamp such as the end of a log still being written
+    """
+    with open(log, "r", encoding="utf-16-le") as file:
+        beginning: Optional[datetime.datetime] = None
+        for line in file:
+            if TIMESTAMP[0] in line:
+                beginning = parse_timestamp(line, TIMESTAMP[0])
+                break
+
+    # The [END] timestamp is the last line of the log
+    size = os.path.getsize(log)
+    with open(log, "rb") as file:
+        file.seek(max(0, size - 512) & ~1)
+        tail = file.read().decode("utf-16-le", errors="ignore")
+    end: Optional[datetime.datetime] = None
+    if TIMESTAMP[1] in tail:
+        end_line = tail[tail.rindex(TIMESTAMP[1]) :].splitlines()[0]
+        end = parse_timestamp(end_line, TIMESTAMP[1])
+
+    return beginning, end
+
+
+def read_flight_time(log: str) -> datetime.timedelta:
+    """
+    Reads the time between the [BEGIN] and [END] timestamps without reading the whole log
+
+    Args:
+        log (str): The path to the log file
+
+    Returns:
+        datetime.timedelta: The time between the timestamps, 0 if either is missing
+    """
+    return flight_time(*read_timestamps(log))
+
+
+def read_ascii(log: str) -> Optional[bytes]:
+    """
+    Memory maps a UTF-16-LE log and narrows its code units to ASCII bytes
+
+    The low byte of every code unit is kept with a single strided copy instead of decoding
+    the file through the text layer. A log with any code unit above 0x7F, such as a "°"
+    in its description, is not narrowed and is left to the text reader.
+
+    Args:
+        log (str): The path to the log file
+
+    Returns:
+        Optional[bytes]: The ASCII text of the log or None if it contains other characters
+    """
+    with open(log, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return b""
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            start = len(codecs.BOM_UTF16_LE) if buffer[:2] == codecs.BOM_UTF16_LE else 0
+            stop = len(buffer) - (len(buffer) - start) % 2
+            high = buffer[start + 1 : stop : 2]
+            if high.count(0) != len(high):
+                return None
+            low = buffer[start:stop:2]
+            if not low.isascii():
+                return None
+            return low
+
+
+def scan_blocks(
+    text: bytes, progress: Optional[Progress] = None
+) -> Iterator[Tuple[str, bytes]]:
+    """
+    Runs the section state machine over the ASCII text of a log
+
+    Only the lines between sections are visited one by one, the rows of a section are
+    matched as a single block. Yields a (section, block) tuple for every block of rows
+    and a (TIMESTAMP, line) tuple for the [BEGIN] and [END] lines.
+
+    Args:
+        text (bytes): The ASCII text of the log as returned by read_ascii
+        progress (Optional[Progress]): Receives the position in the text after each block
+
+    Yields:
+        Tuple[str, bytes]: The section or timestamp and the block of rows or line
+    """
+    timestamps = [(timestamp.encode(), timestamp) for timestamp in TIMESTAMP]
+    pos = 0
+    while pos < len(text):
+        match = LINE.match(text, pos)
+        line = match.group().strip()
+        pos = match.end()
+        section = find_header(line.decode("ascii"))
+        if section is not None:
+            # Skip the format description line
+            pos = LINE.match(text, pos).end()
+            block = ROW_BLOCKS[section].match(text, pos)
+            if block:
+                yield section, block.group()
+                pos = block.end()
+            report(progress, "parse", pos, len(text))
+        else:
+            for marker, timestamp in timestamps:
+                if marker in line:
+                    yield timestamp, line
+    report(progress, "parse", len(text), len(text))
+
+
+def block_rows(block: bytes) -> List[str]:
+    """
+    Splits a block of rows into the stripped rows returned by parse_log
+
+    Args:
+        block (bytes): A block of rows yielded by scan_blocks
+
+    Returns:
+        List[str]: The rows of the block
+    """
+    return [row.strip() for row in block.decode("ascii").splitlines()]
+
+
+def block_payload(block: bytes) -> bytes:
+    """
+    Extracts the packet bytes of every row of a block without decoding it to text
+
+    Args:
+        block (bytes): A block of rows yielded by scan_blocks
+
+    Returns:
+        bytes: The concatenated packets of the rows
+    """
+    words = ROW_PREFIX.sub(b"", block).translate(None, b" \t\r\n")
+    return binascii.unhexlify(words)
+
+
+def map_sections(log: str, progress: Optional[Progress] = None) -> Optional[dict]:
+    """
+    Reads the blocks of rows of each section through a memory map
+
+    Args:
+        log (str): The path to the log file
+        progress (Optional[Progress]): Receives the progress of the read
+
+    Returns:
+        Optional[dict]: The blocks of each section and the flight time, in the layout of
+        parse_log, or None if the log is not plain ASCII
+    """
+    with stage("read_utf16", bytes=os.path.getsize(log)):
+        text = read_ascii(log)
+    if text is None:
+        return None
+
+    data: Dict[str, list] = {header: [] for header in HEADER}
+    beginning: Optional[datetime.datetime] = None
+    end: Optional[datetime.datetime] = None
+    with stage("scan", bytes=len(text)):
+        for section, block in scan_blocks(text, progress):
+            if section == TIMESTAMP[0]:
+                beginning = parse_timestamp(block.decode("ascii"), TIMESTAMP[0])
+            elif section == TIMESTAMP[1]:
+                end = parse_timestamp(block.decode("ascii"), TIMESTAMP[1])
+            else:
+                data[section].append(block)
+    data["Flight Time"] = flight_time(beginning, end)
+    return data
+
+
+def parse_log(
+    log: str, memory_map: bool = True, progress: Optional[Progress] = None
+) -> dict:
+    """
+    Parses the rows of each section and the flight time of a log file
+
+    Args:
+        log (str): The path to the log file
+        memory_map (bool): Whether to use the memory mapped reader when the log is plain ASCII
+        progress (Optional[Progress]): Receives the progress of the parse, which is cancelled by Progress.cancel()
+
+    Returns:
+        dict: The stripped rows of each section and the flight time
+    """
+    with stage("parse_log", bytes=os.path.getsize(log)) as span:
+        data = read_rows(log, memory_map, progress)
+        span.rows = sum(len(data[header]) for header in HEADER)
+    return data
+
+
+def read_rows(log: str, memory_map: bool, progress: Optional[Progress]) -> dict:
+    # The rows of parse_log, read through the memory map when possible
+    if memory_map:
+        data = map_sections(log, progress)
+        if data is not None:
+            for header in HEADER:
+                data[header] = [
+                    row for block in data[header] for row in block_rows(block)
+                ]
+            return data
+
     data = {
         "General Info": [],
         "Millisecond detail": [],
@@ -41,53 +683,26 @@ def parse_log(log: str) -> dict:
         "Flight Events": [],
         "Flight Time": datetime.timedelta(0),
     }
-    beginning: datetime.datetime
-    end: datetime.datetime
+    beginning: Optional[datetime.datetime] = None
+    end: Optional[datetime.datetime] = None
     with open(log, "r", encoding="utf-16-le") as file:
-        # First Read the file to find the beginning timestamp
         """
         1. Read the file line by line:
         2. Check for the first timestamp and store the timestamp that follows
         3. For each header in the HEADER list, read until the header is found
         3.1 Skip the format desc line and read the data until the the REGEX pattern is found
         3.2 Store the data in a list
-        4. Repeat the process for each header
+        4. Store the last timestamp
         """
+        lines = track_lines(file, os.path.getsize(log), progress)
+        for section, line in scan_lines(lines):
+            if section == TIMESTAMP[0]:
+                beginning = parse_timestamp(line, TIMESTAMP[0])
+            elif section == TIMESTAMP[1]:
+                end = parse_timestamp(line, TIMESTAMP[1])
+            else:
+                data[section].append(line)
 
-        # 1.
-        for line in file:
-            if TIMESTAMP[0] in line:
-                # Strip the TIMESTAMP[0] from the line
-                line = line.replace(TIMESTAMP[0], "").strip("\ufeff").strip()
-                beginning = datetime.datetime.strptime(line, "%m/%d/%Y %H:%M:%S %p")
-                break
-
-        for line in file:
-            for header in HEADER:
-                if header in line:
-                    # Skip the format desc line
-                    next(file)
-                    # Read the data until the next header is found
-                    for line in file:
-                        if TIMESTAMP[1] in line:
-                            # Strip the TIMESTAMP[1] from the line
-                            line = (
-                                line.replace(TIMESTAMP[1], "").strip("\ufeff").strip()
-                            )
-                            end = datetime.datetime.strptime(
-                                line, "%m/%d/%Y %H:%M:%S %p"
-                            )
-                            break
-                        # Check if the line matches the pattern
-                        if PATTERNS[header].match(line.strip()):
-                            data[header].append(line.strip())
-                        else:
-                            break
-        if TIMESTAMP[1] in line:
-            # Strip the TIMESTAMP[1] from the line
-            line = line.replace(TIMESTAMP[1], "").strip("\ufeff").strip()
-            end = datetime.datetime.strptime(line, "%m/%d/%Y %H:%M:%S %p")
-
-        data["Flight Time"] = end - beginning
+        data["Flight Time"] = flight_time(beginning, end)
 
         return data
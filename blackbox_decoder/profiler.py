@@ -0,0 +1,265 @@
+"""
+Timing of the stages of the decode pipeline
+
+The decoding functions report each of their stages, such as reading the log or decoding
+the packets of a section, with the rows and bytes it handled. The reports go to the
+listeners registered with add_listener, most often a Profiler collecting them:
+
+    with Profiler() as profiler:
+        record = FlightRecord("flight.log")
+    profiler.save("flight.trace.json")
+
+A stage costs a single check of the listeners when nobody listens. Setting the
+BLACKBOX_PROFILE variable to a path profiles the whole process and saves the profile to
+it on exit, "{pid}" in the path is replaced by the process ID so the worker processes of
+a batch each write their own.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# The listeners receiving every finished stage
+LISTENERS: List[Callable[["Span"], None]] = []
+
+# The nesting of the stages running in each thread
+LOCAL = threading.local()
+
+
+class Span:
+    """
+    The Span class is a single run of a stage
+
+    Args:
+        name (str): The name of the stage, such as "decode/Detail"
+        rows (int): The number of rows handled
+        bytes (int): The number of bytes handled
+    """
+
+    __slots__ = ("name", "rows", "bytes", "start", "duration", "depth", "thread")
+
+    def __init__(self, name: str, rows: int = 0, bytes: int = 0):
+        self.name = name
+        self.rows = rows
+        self.bytes = bytes
+        self.start = 0.0
+        self.duration = 0.0
+        self.depth = 0
+        self.thread = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: getattr(self, key) for key in self.__slots__}
+
+
+def add_listener(listener: Callable[[Span], None]):
+    """
+    Registers a function called with every finished stage, from the thread that ran it
+
+    Args:
+        listener (Callable[[Span], None]): The function
+
+    Returns:
+        None
+    """
+    LISTENERS.append(listener)
+
+
+def remove_listener(listener: Callable[[Span], None]):
+    LISTENERS.remove(listener)
+
+
+@contextmanager
+def stage(name: str, rows: int = 0, bytes: int = 0) -> Iterator[Span]:
+    """
+    Times a stage and reports it to the listeners
+
+    The rows and bytes can be set on the yielded Span once the stage knows them.
+
+    Args:
+        name (str): The name of the stage
+        rows (int): The number of rows handled
+        bytes (int): The number of bytes handled
+
+    Yields:
+        Span: The run of the stage
+    """
+    span = Span(name, rows, bytes)
+    if not LISTENERS:
+        yield span
+        return
+
+    span.depth = getattr(LOCAL, "depth", 0)
+    span.thread = threading.get_ident()
+    LOCAL.depth = span.depth + 1
+    span.start = time.perf_counter()
+    try:
+        yield span
+    finally:
+        span.duration = time.perf_counter() - span.start
+        LOCAL.depth = span.depth
+        for listener in list(LISTENERS):
+            listener(span)
+
+
+class Profiler:
+    """
+    The Profiler class collects the stages run while it is active
+
+    Args:
+        name (str): The name of the profiled process shown in the Chrome trace
+    """
+
+    def __init__(self, name: str = "blackbox_decoder"):
+        self.name = name
+        self.spans: List[Span] = []
+        self.lock = threading.Lock()
+        self.origin = time.perf_counter()
+
+    def record(self, span: Span):
+        with self.lock:
+            self.spans.append(span)
+
+    def start(self):
+        """
+        Starts collecting the stages
+        """
+        self.origin = time.perf_counter()
+        add_listener(self.record)
+
+    def stop(self):
+        """
+        Stops collecting the stages, the ones collected are kept
+        """
+        if self.record in LISTENERS:
+            remove_listener(self.record)
+
+    def __enter__(self) -> "Profiler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        The totals of each stage over its runs
+
+        Returns:
+            Dict[str, Dict[str, float]]: The calls, seconds, rows, bytes and rows per second of each stage, in the order the stages first finished
+        """
+        totals: Dict[str, Dict[str, float]] = {}
+        for span in self.spans:
+            total = totals.setdefault(
+                span.name, {"calls": 0, "seconds": 0.0, "rows": 0, "bytes": 0}
+            )
+            total["calls"] += 1
+            total["seconds"] += span.duration
+            total["rows"] += span.rows
+            total["bytes"] += span.bytes
+        for total in totals.values():
+            total["rows_per_sec"] = (
+                total["rows"] / total["seconds"] if total["seconds"] > 0 else 0.0
+            )
+        return totals
+
+    def to_json(self) -> Dict[str, Any]:
+        """
+        The profile as plain JSON, the totals of each stage and every run of a stage
+
+        Returns:
+            Dict[str, Any]: The "stages" totals and the "spans", their start in seconds since the profiler started
+        """
+        spans = []
+        for span in sorted(self.spans, key=lambda span: span.start):
+            values = span.to_dict()
+            values["start"] -= self.origin
+            spans.append(values)
+        return {"stages": self.summary(), "spans": spans}
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """
+        The profile in the Chrome trace event format, opened by chrome://tracing or Perfetto
+
+        Returns:
+            Dict[str, Any]: The complete events of every stage
+        """
+        pid = os.getpid()
+        events: List[Dict[str, Any]] = [
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": pid,
+                "args": {"name": self.name},
+            }
+        ]
+        for span in sorted(self.spans, key=lambda span: span.start):
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": span.name.split("/")[0],
+                    "ph": "X",
+                    "ts": (span.start - self.origin) * 1e6,
+                    "dur": span.duration * 1e6,
+                    "pid": pid,
+                    "tid": span.thread,
+                    "args": {"rows": span.rows, "bytes": span.bytes},
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save(self, path: str) -> str:
+        """
+        Saves the profile, in the Chrome trace format if the path ends with .trace.json
+        and as the JSON of to_json otherwise
+
+        Args:
+            path (str): The path to the file
+
+        Returns:
+            str: The path
+        """
+        profile = (
+            self.to_chrome_trace() if path.endswith(".trace.json") else self.to_json()
+        )
+        with open(path, "w") as file:
+            json.dump(profile, file, indent=1)
+        return path
+
+    def report(self) -> str:
+        """
+        The totals of each stage as a table
+
+        Returns:
+            str: The lines of the table
+        """
+        lines = [f"{'stage':<24}{'calls':>6}{'seconds':>10}{'rows':>12}{'MB':>10}"]
+        for name, total in self.summary().items():
+            lines.append(
+                f"{name:<24}{total['calls']:>6}{total['seconds']:>10.4f}"
+                f"{total['rows']:>12}{total['bytes'] / 2**20:>10.1f}"
+            )
+        return "\n".join(lines)
+
+
+def profile_from_env() -> Optional[Profiler]:
+    """
+    Profiles the process if the BLACKBOX_PROFILE variable is set, saving the profile on exit
+
+    Returns:
+        Optional[Profiler]: The profiler or None if the variable is not set
+    """
+    path = os.environ.get("BLACKBOX_PROFILE")
+    if not path:
+        return None
+    profiler = Profiler()
+    profiler.start()
+    atexit.register(lambda: profiler.save(path.replace("{pid}", str(os.getpid()))))
+    return profiler
+
+
+# The profiler of the whole process, enabled by the environment
+PROCESS_PROFILER = profile_from_env()
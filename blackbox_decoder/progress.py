@@ -0,0 +1,74 @@
+"""
+Progress reporting and cancellation of a decode running in another thread
+
+The decoding functions take an optional Progress. Each stage reports how far it got and
+raises Cancelled at its next report once cancel() was called from another thread, such
+as the GUI thread.
+"""
+
+import threading
+from typing import Callable, Optional
+
+
+class Cancelled(Exception):
+    """
+    Raised by the decoding functions when their Progress was cancelled
+    """
+
+
+class Progress:
+    """
+    The Progress class receives the progress of a decode and cancels it
+
+    Args:
+        callback (Optional[Callable[[str, float], None]]): Called with the name of the
+        stage, such as "parse", and the fraction of the stage done
+    """
+
+    def __init__(self, callback: Optional[Callable[[str, float], None]] = None):
+        self.callback = callback
+        self.event = threading.Event()
+
+    def cancel(self):
+        """
+        Cancels the decode at its next progress report, safe to call from any thread
+        """
+        self.event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.event.is_set()
+
+    def update(self, stage: str, done: int, total: int):
+        """
+        Reports the progress of a stage
+
+        Args:
+            stage (str): The name of the stage
+            done (int): The amount of work done
+            total (int): The total amount of work of the stage
+
+        Raises:
+            Cancelled: If the decode was cancelled
+        """
+        if self.event.is_set():
+            raise Cancelled(stage)
+        if self.callback is not None:
+            self.callback(stage, done / total if total else 1.0)
+
+
+def report(progress: Optional[Progress], stage: str, done: int, total: int):
+    """
+    Reports the progress of a stage if a Progress was given
+
+    Args:
+        progress (Optional[Progress]): The progress of the decode
+        stage (str): The name of the stage
+        done (int): The amount of work done
+        total (int): The total amount of work of the stage
+
+    Raises:
+        Cancelled: If the decode was cancelled
+    """
+    if progress is not None:
+        progress.update(stage, done, total)
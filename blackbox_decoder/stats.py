@@ -0,0 +1,283 @@
+"""
+Per flight statistics and flag transition index
+
+The statistics of every flight of a section are computed in a single pass over the
+columns of the section sorted by recNumb: the minimum, maximum and mean of each analog
+channel are reduced over the row range of each flight, and the rows where each flag
+changes are found once for the whole section. The transitions of a flight are views of
+those sorted rows, so finding when a flag changed is a binary search.
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+# The 1 bit flags of the Detail and Rollup packets
+FLAGS = [
+    "tethReady",
+    "tethActive",
+    "tethGood",
+    "tethOn",
+    "battOn",
+    "battKill",
+    "battDrain",
+    "battOutKill",
+]
+
+# The fields of a packet that are neither flags nor analog channels
+NON_ANALOG = {"recNumb", "entryTimeMsecs", "type"}
+
+
+def analog_fields(packet: type) -> List[str]:
+    """
+    The analog channels of a packet, such as its voltages, currents and temperatures
+
+    Args:
+        packet (type): The packet class (Detail or Rollup)
+
+    Returns:
+        List[str]: The names of the fields
+    """
+    return [
+        key
+        for key, (fmt, size) in packet.get_size_struct().items()
+        if size > 1
+        and key not in NON_ANALOG
+        and not key.startswith("filler")
+        and not key.endswith("Changes")
+    ]
+
+
+class ChannelStats(NamedTuple):
+    """
+    The statistics of an analog channel over a flight, None when the flight has no rows
+    """
+
+    min: Optional[float]
+    max: Optional[float]
+    mean: Optional[float]
+
+
+class FlagTransitions:
+    """
+    The FlagTransitions class holds the changes of a flag during a flight
+
+    The arrays are sorted by recNumb and a 1 bit flag alternates between its values, so
+    every lookup is a binary search.
+
+    Args:
+        initial (Optional[int]): The value of the flag on the first row of the flight, None if the flight has no rows
+        recs (np.ndarray): The recNumb of each row where the flag changed
+        msecs (np.ndarray): The entryTimeMsecs of each row where the flag changed
+        values (np.ndarray): The value of the flag from each change on
+    """
+
+    def __init__(
+        self,
+        initial: Optional[int],
+        recs: np.ndarray,
+        msecs: np.ndarray,
+        values: np.ndarray,
+    ):
+        self.initial = initial
+        self.recs = recs
+        self.msecs = msecs
+        self.values = values
+
+    def __len__(self):
+        return len(self.recs)
+
+    def value_at(self, rec: int) -> Optional[int]:
+        """
+        The value of the flag at a record number
+
+        Args:
+            rec (int): The recNumb
+
+        Returns:
+            Optional[int]: The value, the initial one before the first row of the flight
+        """
+        i = int(np.searchsorted(self.recs, rec, side="right"))
+        return self.initial if i == 0 else int(self.values[i - 1])
+
+    def next_change(
+        self, rec: int = 0, value: Optional[int] = None
+    ) -> Optional[Tuple[int, int]]:
+        """
+        The first change of the flag at or after a record number
+
+        Args:
+            rec (int): The recNumb to search from
+            value (Optional[int]): Only a change to this value, 0 for a drop and 1 for a rise
+
+        Returns:
+            Optional[Tuple[int, int]]: The recNumb and entryTimeMsecs of the change, None if the flag does not change anymore
+        """
+        i = int(np.searchsorted(self.recs, rec, side="left"))
+        if value is not None and i < len(self) and self.values[i] != value:
+            i += 1
+        if i >= len(self):
+            return None
+        return int(self.recs[i]), int(self.msecs[i])
+
+    def between(self, start: int, end: int) -> np.ndarray:
+        """
+        The changes within a range of record numbers
+
+        Args:
+            start (int): The first recNumb
+            end (int): The recNumb after the last one
+
+        Returns:
+            np.ndarray: The positions of the changes in recs, msecs and values
+        """
+        lo, hi = np.searchsorted(self.recs, [start, end], side="left")
+        return np.arange(lo, hi)
+
+    def drops(self) -> np.ndarray:
+        """
+        The recNumbs where the flag dropped to 0
+        """
+        return self.recs[self.values == 0]
+
+    def rises(self) -> np.ndarray:
+        """
+        The recNumbs where the flag rose to 1
+        """
+        return self.recs[self.values == 1]
+
+
+class SectionStats(NamedTuple):
+    """
+    The statistics of the records of a section during a flight
+    """
+
+    rows: int
+    channels: Dict[str, ChannelStats]
+    flags: Dict[str, FlagTransitions]
+
+
+def range_reduce(ufunc: np.ufunc, column: np.ndarray, ranges: np.ndarray) -> np.ndarray:
+    """
+    Reduces a column over each of a set of non empty row ranges at once
+
+    Args:
+        ufunc (np.ufunc): The reduction, such as np.minimum
+        column (np.ndarray): The column
+        ranges (np.ndarray): A (N, 2) array of the start and end of each range
+
+    Returns:
+        np.ndarray: The reduction of each range
+    """
+    # A trailing element keeps the end of the last range a valid index
+    padded = np.append(column, column[:1])
+    return ufunc.reduceat(padded, ranges.ravel())[::2]
+
+
+def section_stats(
+    table, order: np.ndarray, ranges: Sequence[Tuple[int, int]]
+) -> List[SectionStats]:
+    """
+    Computes the statistics of each flight of a section in a single pass
+
+    Args:
+        table (LogTable): The records of the section
+        order (np.ndarray): The row indices of the section sorted by recNumb
+        ranges (Sequence[Tuple[int, int]]): The range of sorted rows of each flight
+
+    Returns:
+        List[SectionStats]: The statistics of each flight, in the order of the ranges
+    """
+    bounds = np.array(ranges, dtype=np.int64).reshape(-1, 2)
+    rows = bounds[:, 1] - bounds[:, 0]
+    filled = rows > 0
+    count = rows[filled]
+    scaled = set(table.packet.scaled_fields)
+
+    channels: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+    for key in analog_fields(table.packet):
+        column = table.raw_column(key)[order]
+        if len(column) == 0 or not filled.any():
+            channels[key] = (np.array([]),) * 3
+            continue
+        scale = 10 if key in scaled else 1
+        channels[key] = (
+            range_reduce(np.minimum, column, bounds[filled]) / scale,
+            range_reduce(np.maximum, column, bounds[filled]) / scale,
+            range_reduce(np.add, column.astype(np.float64), bounds[filled])
+            / count
+            / scale,
+        )
+
+    recs = table.raw_column("recNumb")[order]
+    msecs = table.raw_column("entryTimeMsecs")[order]
+    flags: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = {}
+    for flag in FLAGS:
+        column = table.raw_column(flag)[order]
+        changes = np.flatnonzero(column[1:] != column[:-1]) + 1
+        # The changes strictly inside each flight, a change on its first row is not one
+        lo = np.searchsorted(changes, bounds[:, 0], side="right")
+        hi = np.searchsorted(changes, bounds[:, 1], side="left")
+        flags[flag] = (column, changes, lo, np.maximum(lo, hi))
+
+    stats: List[SectionStats] = []
+    position = np.cumsum(filled) - 1
+    for i, (start, _) in enumerate(bounds):
+        if filled[i]:
+            j = position[i]
+            flight_channels = {
+                key: ChannelStats(float(low[j]), float(high[j]), float(mean[j]))
+                for key, (low, high, mean) in channels.items()
+            }
+        else:
+            flight_channels = {key: ChannelStats(None, None, None) for key in channels}
+
+        flight_flags = {}
+        for flag, (column, changes, lo, hi) in flags.items():
+            rows_changed = changes[lo[i] : hi[i]]
+            flight_flags[flag] = FlagTransitions(
+                int(column[start]) if filled[i] else None,
+                recs[rows_changed],
+                msecs[rows_changed],
+                column[rows_changed],
+            )
+        stats.append(SectionStats(int(rows[i]), flight_channels, flight_flags))
+    return stats
+
+
+class FlightStats:
+    """
+    The FlightStats class holds the statistics of every section of a flight
+
+    Args:
+        sections (Dict[str, SectionStats]): The statistics of each section such as "milli_detail"
+    """
+
+    def __init__(self, sections: Dict[str, SectionStats]):
+        self.sections = sections
+
+    def channel(self, key: str, section: str = "milli_detail") -> ChannelStats:
+        """
+        The minimum, maximum and mean of an analog channel
+
+        Args:
+            key (str): The name of the field such as "tethCurrentX10"
+            section (str): The name of the section in the Log
+
+        Returns:
+            ChannelStats: The statistics of the channel
+        """
+        return self.sections[section].channels[key]
+
+    def flag(self, key: str, section: str = "milli_detail") -> FlagTransitions:
+        """
+        The transitions of a flag
+
+        Args:
+            key (str): The name of the flag such as "tethGood"
+            section (str): The name of the section in the Log
+
+        Returns:
+            FlagTransitions: The changes of the flag
+        """
+        return self.sections[section].flags[key]
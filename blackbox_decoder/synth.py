@@ -0,0 +1,285 @@
+"""
+Synthetic log files for benchmarks and tests
+
+A synthetic log has the layout of a hex dump of the powerboard: the [BEGIN] and [END]
+timestamps and the rows of every section in the PATTERNS row format, written as
+UTF-16-LE. The packets are built column by column with the compiled layouts of the
+packet classes and the rows are formatted as NumPy byte arrays, so logs of tens of
+millions of Detail rows are written in chunks without building a string per row.
+"""
+
+import datetime
+from typing import BinaryIO, Dict, Iterator
+
+import numpy as np
+
+from blackbox_decoder.log import Detail, FlightInfo, GeneralInfo, Rollup
+from blackbox_decoder.parse import FORMAT, HEADER, TIMESTAMP
+
+# The first record number of a synthetic log
+FIRST_REC = 1_000_000
+
+# The number of Detail rows between Second and Minute Rollups
+SECOND_ROWS = 1000
+MINUTE_ROWS = 60 * SECOND_ROWS
+
+# The number of Detail rows written at once
+CHUNK_ROWS = 1 << 18
+
+# The period in rows of the changes of each flag
+FLAG_PERIODS = {
+    "tethReady": 7919,
+    "tethActive": 15013,
+    "tethGood": 3011,
+    "tethOn": 50021,
+    "battOn": 104729,
+    "battKill": 300007,
+    "battDrain": 200003,
+    "battOutKill": 500009,
+}
+
+# The two hex digits of every byte
+HEX = np.array([list(f"{i:02x}".encode()) for i in range(256)], dtype=np.uint8)
+NEWLINE = b"\r\n"
+
+
+def format_rows(packed: np.ndarray, first_row: int, first_offset: int) -> bytes:
+    """
+    Formats packets into the ASCII rows of a section
+
+    Each row holds the record number modulo 1000, the offset of the packet and its bytes
+    in groups of 4, the first group holding the remainder of an odd sized packet.
+
+    Args:
+        packed (np.ndarray): A (N, packet_size) array of uint8
+        first_row (int): The position of the first packet in its section
+        first_offset (int): The offset of the first packet
+
+    Returns:
+        bytes: The rows, each ending with CRLF
+    """
+    rows, size = packed.shape
+    groups = ([size % 4] if size % 4 else []) + [4] * (size // 4)
+    prefix = 14  # "000   0x0000  "
+    width = prefix + sum(2 * g + 1 for g in groups) + len(NEWLINE)
+
+    lines = np.full((rows, width), ord(" "), dtype=np.uint8)
+    numbers = (first_row + np.arange(rows)) % 1000
+    for i, digit in enumerate((numbers // 100, numbers // 10 % 10, numbers % 10)):
+        lines[:, i] = ord("0") + digit
+    offsets = (first_offset + size * np.arange(rows)) % 0x10000
+    lines[:, 6:8] = np.frombuffer(b"0x", np.uint8)
+    lines[:, 8:10] = HEX[offsets >> 8]
+    lines[:, 10:12] = HEX[offsets & 0xFF]
+
+    hex_bytes = HEX[packed].reshape(rows, 2 * size)
+    column, byte = prefix, 0
+    for group in groups:
+        lines[:, column : column + 2 * group] = hex_bytes[
+            :, 2 * byte : 2 * (byte + group)
+        ]
+        column += 2 * group + 1
+        byte += group
+    lines[:, -len(NEWLINE) :] = np.frombuffer(NEWLINE, np.uint8)
+    return lines.tobytes()
+
+
+def to_utf16(ascii_text: bytes) -> bytes:
+    # Every ASCII character is the low byte of a UTF-16-LE code unit
+    units = np.zeros(2 * len(ascii_text), dtype=np.uint8)
+    units[::2] = np.frombuffer(ascii_text, np.uint8)
+    return units.tobytes()
+
+
+def flight_starts(rows: int, flights: int) -> np.ndarray:
+    """
+    The first Detail row of each flight, the flights are of equal length
+    """
+    return (rows * np.arange(flights)) // flights
+
+
+def detail_columns(index: np.ndarray, starts: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    The raw values of the Detail rows at some positions of a synthetic log
+
+    Args:
+        index (np.ndarray): The positions of the rows among the Detail rows
+        starts (np.ndarray): The first row of each flight
+
+    Returns:
+        Dict[str, np.ndarray]: The raw column of each field
+    """
+    flight_start = starts[np.searchsorted(starts, index, side="right") - 1]
+    phase = index / 5000.0
+    columns = {
+        "recNumb": FIRST_REC + index,
+        "entryTimeMsecs": index - flight_start,
+        "tethCurrentX10": (150 + 100 * np.sin(phase)).astype(np.int64),
+        "tethVoltX10": (480 + 20 * np.sin(phase / 3)).astype(np.int64),
+        "battVoltX10": (250 + 10 * np.cos(phase / 7)).astype(np.int64),
+        "outVoltX10": (470 + 15 * np.sin(phase / 2)).astype(np.int64),
+    }
+    for flag, period in FLAG_PERIODS.items():
+        columns[flag] = (index // period) % 2
+    return columns
+
+
+def rollup_columns(index: np.ndarray, starts: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    The raw values of Rollup rows summarizing the Detail rows at some positions
+
+    Args:
+        index (np.ndarray): The positions of the Detail rows the Rollups are written at
+        starts (np.ndarray): The first row of each flight
+
+    Returns:
+        Dict[str, np.ndarray]: The raw column of each field
+    """
+    detail = detail_columns(index, starts)
+    columns = {
+        "recNumb": detail["recNumb"],
+        "entryTimeMsecs": detail["entryTimeMsecs"],
+        "maxTemp": np.full(len(index), 45),
+    }
+    for channel in ("tethCurrent", "tethVolt", "battVolt", "outVolt"):
+        columns[f"{channel}X10Avg"] = detail[f"{channel}X10"]
+        columns[f"{channel}X10Peak"] = detail[f"{channel}X10"] + 5
+    for flag in FLAG_PERIODS:
+        columns[flag] = detail[flag]
+    return columns
+
+
+def rollup_rows(rows: int, starts: np.ndarray, every: int) -> np.ndarray:
+    # A Rollup at the start of each flight and every given number of Detail rows
+    return np.union1d(np.arange(0, rows, every), starts)
+
+
+class SectionWriter:
+    """
+    Writes the rows of a section and keeps track of the offset of the next packet
+
+    Args:
+        file (BinaryIO): The log file opened in binary mode
+        offset (int): The offset of the first packet
+    """
+
+    def __init__(self, file: BinaryIO, offset: int = 0):
+        self.file = file
+        self.offset = offset
+
+    def write_text(self, text: str):
+        self.file.write(to_utf16(text.encode("ascii")))
+
+    def write_section(self, header: str, packet: type, chunks: Iterator[np.ndarray]):
+        """
+        Writes the header, description line and rows of a section
+
+        Args:
+            header (str): The header of the section
+            packet (type): The packet class of the section
+            chunks (Iterator[np.ndarray]): The packed records of the section, in chunks
+        """
+        size = packet.packet_size()
+        self.write_text(f"{header}\r\nrec#  Offset  {size}....Byte....0\r\n")
+        row = 0
+        for packed in chunks:
+            self.file.write(to_utf16(format_rows(packed, row, self.offset)))
+            row += len(packed)
+            self.offset += size * len(packed)
+        self.write_text("\r\n")
+
+
+def write_log(
+    path: str,
+    detail_rows: int = 10_000,
+    flights: int = 1,
+    drone: str = "BV-SYNTH",
+    begin: datetime.datetime = datetime.datetime(2024, 7, 13, 10, 0, 0),
+    chunk_rows: int = CHUNK_ROWS,
+) -> Dict[str, int]:
+    """
+    Writes a synthetic log file
+
+    The flights split the Detail rows evenly, each with a Second Rollup every
+    SECOND_ROWS rows and a Minute Rollup every MINUTE_ROWS rows and at its start.
+
+    Args:
+        path (str): The path to the log file
+        detail_rows (int): The number of Millisecond detail rows
+        flights (int): The number of flights, at most detail_rows
+        drone (str): The ID of the drone in the General Info packet
+        begin (datetime.datetime): The [BEGIN] timestamp, the [END] timestamp follows it by the length of the log
+        chunk_rows (int): The number of Detail rows formatted at once
+
+    Returns:
+        Dict[str, int]: The number of rows of each section keyed by its HEADER
+    """
+    if not 1 <= flights <= detail_rows:
+        raise ValueError(
+            f"Cannot split {detail_rows} Detail rows into {flights} flights"
+        )
+    starts = flight_starts(detail_rows, flights)
+    seconds = rollup_rows(detail_rows, starts, SECOND_ROWS)
+    minutes = rollup_rows(detail_rows, starts, MINUTE_ROWS)
+
+    def details() -> Iterator[np.ndarray]:
+        for lo in range(0, detail_rows, chunk_rows):
+            index = np.arange(lo, min(lo + chunk_rows, detail_rows))
+            yield Detail.layout.encode_packed(detail_columns(index, starts))
+
+    events: Dict[str, object] = {
+        "begRecNumb": FIRST_REC + starts,
+        "numbSecActive": np.diff(starts, append=detail_rows) // 1000,
+        "numbTethOnChanges": np.full(flights, 2),
+        "numbBattDrainChanges": np.arange(flights) % 3,
+        "maxTemp": np.full(flights, 60),
+        "minTemp": np.full(flights, 20),
+        "data": ["Synthet"] * flights,
+    }
+    flight_events = FlightInfo.layout.encode_packed(events)
+    # The next flight event is still erased
+    erased = np.full((1, FlightInfo.packet_size()), 0xFF, dtype=np.uint8)
+
+    gen_info = GeneralInfo.layout.encode_values(
+        {
+            "ID": drone,
+            "version": 1,
+            "last_rec_number": FIRST_REC + detail_rows,
+            "powerups": flights,
+        }
+    )
+    end = begin + datetime.timedelta(milliseconds=detail_rows)
+
+    with open(path, "wb") as file:
+        writer = SectionWriter(file)
+        file.write("\ufeff".encode("utf-16-le"))
+        writer.write_text(
+            f"{TIMESTAMP[0]} {begin.strftime(FORMAT)}\r\nHex Dump of Logs:\r\n"
+        )
+        writer.write_section(
+            HEADER[0],
+            GeneralInfo,
+            iter([np.frombuffer(gen_info, np.uint8).reshape(1, -1)]),
+        )
+        writer.offset = 0x20
+        writer.write_section(HEADER[1], Detail, details())
+        writer.write_section(
+            HEADER[2],
+            Rollup,
+            iter([Rollup.layout.encode_packed(rollup_columns(minutes, starts))]),
+        )
+        writer.write_section(
+            HEADER[3],
+            Rollup,
+            iter([Rollup.layout.encode_packed(rollup_columns(seconds, starts))]),
+        )
+        writer.write_section(HEADER[4], FlightInfo, iter([flight_events, erased]))
+        writer.write_text(f"{TIMESTAMP[1]} {end.strftime(FORMAT)}\r\n")
+
+    return {
+        HEADER[0]: 1,
+        HEADER[1]: detail_rows,
+        HEADER[2]: len(minutes),
+        HEADER[3]: len(seconds),
+        HEADER[4]: flights + 1,
+    }
@@ -0,0 +1,385 @@
+"""
+Column oriented storage of the decoded log sections
+
+A LogTable holds one typed NumPy array per field of a packet instead of one object per
+record. Each array uses the smallest dtype that fits the bit width of its field and the
+X10 fields are kept as raw integers, they are only divided by 10 when read.
+"""
+
+from typing import Dict, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+from blackbox_decoder.decode import decode_field, pack_rows, packed_view
+
+
+def field_dtype(fmt: str, size: int) -> np.dtype:
+    """
+    The smallest dtype that fits a field of the size struct
+
+    Args:
+        fmt (str): The BitStream format of the field such as "uint:12"
+        size (int): The size of the field in bits
+
+    Returns:
+        np.dtype: The dtype used to store the field
+    """
+    kind = fmt.split(":")[0]
+    if kind == "bytes":
+        return np.dtype(object)
+    for bits in (8, 16, 32, 64):
+        if size <= bits:
+            break
+    return np.dtype(f"{kind}{bits}")
+
+
+class LogRecord:
+    """
+    A view of a single record of a LogTable
+
+    The record behaves like the per record classes: record["recNumb"] returns the
+    decoded value and iterating over it yields the values of every field.
+    """
+
+    __slots__ = ("table", "index")
+
+    def __init__(self, table: "LogTable", index: int):
+        self.table = table
+        self.index = index
+
+    def __str__(self):
+        s = ""
+        for key, value in self.structure.items():
+            s += f"{key}: {value}\n"
+
+        return s
+
+    def __repr__(self):
+        return str(self)
+
+    def __iter__(self):
+        return (self.table.value(key, self.index) for key in self.table.keys())
+
+    def __getitem__(self, key: str):
+        return self.table.value(key, self.index)
+
+    @property
+    def packet(self) -> type:
+        return self.table.packet
+
+    @property
+    def structure(self) -> dict:
+        return dict(zip(self.table.keys(), self))
+
+
+class LogTable:
+    """
+    The LogTable class stores the records of one section of the log as columns
+
+    A table created from packed records with lazy=True keeps the packed bytes and only
+    decodes a column the first time it is read.
+
+    Args:
+        packet (type): The packet class of the section (Detail, Rollup or FlightInfo)
+        columns (Optional[Dict[str, np.ndarray]]): The raw column of each decoded field
+        packed (Optional[np.ndarray]): The (N, packet_size) packed records of the fields that are not decoded yet
+    """
+
+    def __init__(
+        self,
+        packet: type,
+        columns: Optional[Dict[str, np.ndarray]] = None,
+        packed: Optional[np.ndarray] = None,
+    ):
+        self.packet = packet
+        self.decoded = columns if columns is not None else {}
+        self.packed = packed
+        self.scaled_fields = set(packet.scaled_fields)
+        self.dtypes = {
+            key: field_dtype(fmt, size)
+            for key, (fmt, size) in packet.get_size_struct().items()
+        }
+
+    @classmethod
+    def from_rows(cls, packet: type, rows: Sequence[str]) -> "LogTable":
+        """
+        Decodes the rows of a section into a LogTable
+
+        Args:
+            packet (type): The packet class of the section
+            rows (Sequence[str]): The rows of the section as returned by parse_log
+
+        Returns:
+            LogTable: The decoded section
+        """
+        return cls.from_packed(packet, pack_rows(rows, packet.packet_size()))
+
+    @classmethod
+    def from_packed(
+        cls, packet: type, packed: np.ndarray, lazy: bool = False
+    ) -> "LogTable":
+        """
+        Decodes an array of packed records into a LogTable
+
+        Args:
+            packet (type): The packet class of the section
+            packed (np.ndarray): A (N, packet_size) array of uint8
+            lazy (bool): Whether to defer decoding each column until it is read
+
+        Returns:
+            LogTable: The decoded section
+        """
+        table = cls(packet, packed=packed)
+        if not lazy:
+            table.decode()
+        return table
+
+    @classmethod
+    def from_buffer(
+        cls, packet: type, buffer, offset: int = 0, lazy: bool = False
+    ) -> "LogTable":
+        """
+        Decodes the packets of a raw buffer, such as a binary flash dump, into a LogTable
+
+        The packets are read in place without converting them to text. A lazy table keeps
+        a view of the buffer, which must stay open until the table is decoded.
+
+        Args:
+            packet (type): The packet class of the section
+            buffer: Any object supporting the buffer protocol holding whole packets
+            offset (int): The byte position of the first packet in the buffer
+            lazy (bool): Whether to defer decoding each column until it is read
+
+        Returns:
+            LogTable: The decoded section
+        """
+        return cls.from_packed(
+            packet, packed_view(buffer, packet.packet_size(), offset), lazy
+        )
+
+    def decode(self) -> Dict[str, np.ndarray]:
+        """
+        Decodes every field that is not decoded yet
+
+        Args:
+            None
+
+        Returns:
+            Dict[str, np.ndarray]: The raw column of every field
+        """
+        for key in self.dtypes:
+            self.raw_column(key)
+        # Every field is decoded, the packed records are not needed anymore
+        self.packed = None
+        return self.decoded
+
+    @property
+    def columns(self) -> Dict[str, np.ndarray]:
+        """
+        The raw column of every field, the fields of a lazy table are decoded first
+        """
+        return self.decode()
+
+    def raw_column(self, key: str) -> np.ndarray:
+        """
+        Returns the raw values of a field, decoding it on first access
+
+        Args:
+            key (str): The name of the field
+
+        Returns:
+            np.ndarray: The column of the field, the X10 fields are not divided by 10
+        """
+        if key not in self.decoded:
+            column = decode_field(self.packet, self.packed, key, scale=False)
+            self.decoded[key] = column.astype(self.dtypes[key])
+        return self.decoded[key]
+
+    def take(self, indices: np.ndarray) -> "LogTable":
+        """
+        Returns a new table holding the records at the given indices
+
+        Only the selected records are decoded when the table is lazy.
+
+        Args:
+            indices (np.ndarray): The indices of the records
+
+        Returns:
+            LogTable: The decoded records in the order of the indices
+        """
+        if self.packed is not None:
+            return LogTable.from_packed(self.packet, self.packed[indices])
+        return LogTable(
+            self.packet,
+            {key: column[indices] for key, column in self.decoded.items()},
+        )
+
+    @classmethod
+    def concat(cls, tables: Sequence["LogTable"]) -> "LogTable":
+        """
+        Concatenates the records of tables of the same packet
+
+        Args:
+            tables (Sequence[LogTable]): The tables to concatenate
+
+        Returns:
+            LogTable: The records of every table in order
+        """
+        packet = tables[0].packet
+        return cls(
+            packet,
+            {
+                key: np.concatenate([table.raw_column(key) for table in tables])
+                for key in tables[0].keys()
+            },
+        )
+
+    def frame_columns(self) -> Dict[str, np.ndarray]:
+        """
+        Returns the columns typed for a DataFrame: the 1 bit flags as bool and the X10
+        fields divided by 10 as float32
+
+        Args:
+            None
+
+        Returns:
+            Dict[str, np.ndarray]: The column of every field
+        """
+        columns = {}
+        for key, (fmt, size) in self.packet.get_size_struct().items():
+            column = self.raw_column(key)
+            if key in self.scaled_fields:
+                column = (column / 10).astype(np.float32)
+            elif size == 1:
+                column = column.astype(bool)
+            columns[key] = column
+        return columns
+
+    def to_arrays(self, prefix: str) -> Dict[str, np.ndarray]:
+        """
+        Returns the state of the table as plain arrays that can be saved without pickling
+
+        The decoded columns are saved as they are and a lazy table also saves its packed records.
+
+        Args:
+            prefix (str): The prefix of the array names
+
+        Returns:
+            Dict[str, np.ndarray]: The arrays of the table
+        """
+        arrays = {}
+        for key, column in self.decoded.items():
+            if column.dtype == object:
+                column = column.astype(str)
+            arrays[f"{prefix}/{key}"] = column
+        if self.packed is not None:
+            arrays[f"{prefix}/packed"] = self.packed
+        return arrays
+
+    @classmethod
+    def from_arrays(
+        cls, packet: type, prefix: str, arrays: Dict[str, np.ndarray]
+    ) -> "LogTable":
+        """
+        Restores a table saved by to_arrays
+
+        Args:
+            packet (type): The packet class of the section
+            prefix (str): The prefix of the array names
+            arrays (Dict[str, np.ndarray]): The saved arrays
+
+        Returns:
+            LogTable: The restored table
+
+        Raises:
+            ValueError: If the arrays do not hold every field of the packet or their lengths
+            differ
+        """
+        table = cls(packet, packed=arrays.get(f"{prefix}/packed"))
+        for key, dtype in table.dtypes.items():
+            name = f"{prefix}/{key}"
+            if name in arrays:
+                table.decoded[key] = arrays[name].astype(dtype, copy=False)
+
+        # The fields that were not saved decoded are only found in the packed records
+        missing = [key for key in table.dtypes if key not in table.decoded]
+        if table.packed is None and missing:
+            raise ValueError(f"No saved column {prefix}/{missing[0]} or packed records")
+        lengths = {len(column) for column in table.decoded.values()}
+        if table.packed is not None:
+            if table.packed.ndim != 2 or table.packed.shape[1] != packet.packet_size():
+                raise ValueError(
+                    f"The saved {prefix}/packed records have the wrong shape"
+                )
+            lengths.add(len(table.packed))
+        if len(lengths) > 1:
+            raise ValueError(f"The saved columns of {prefix} differ in length")
+        return table
+
+    def __len__(self):
+        if self.packed is not None:
+            return len(self.packed)
+        return len(next(iter(self.decoded.values())))
+
+    def __iter__(self) -> Iterator[LogRecord]:
+        return (LogRecord(self, i) for i in range(len(self)))
+
+    def __getitem__(self, key: Union[int, str]) -> Union[LogRecord, np.ndarray]:
+        """
+        Returns the record at an index or the decoded column of a field
+
+        Args:
+            key (Union[int, str]): The index of a record or the name of a field
+
+        Returns:
+            Union[LogRecord, np.ndarray]: The record or the column
+        """
+        if isinstance(key, str):
+            return self.column(key)
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError("LogTable index out of range")
+        return LogRecord(self, key)
+
+    def keys(self) -> List[str]:
+        return list(self.dtypes.keys())
+
+    def column(self, key: str) -> np.ndarray:
+        """
+        Returns the decoded values of a field, the X10 fields are divided by 10
+
+        Args:
+            key (str): The name of the field
+
+        Returns:
+            np.ndarray: The column of the field
+        """
+        if key in self.scaled_fields:
+            return self.raw_column(key) / 10
+        return self.raw_column(key)
+
+    def value(self, key: str, index: int):
+        """
+        Returns the decoded value of a field for a single record as a Python object
+
+        Args:
+            key (str): The name of the field
+            index (int): The index of the record
+
+        Returns:
+            The value of the field, the same as the per record classes
+        """
+        value = self.raw_column(key)[index]
+        if isinstance(value, np.generic):
+            value = value.item()
+        if key in self.scaled_fields:
+            value /= 10
+        return value
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The number of bytes used by the columns
+        """
+        return sum(column.nbytes for column in self.columns.values())
@@ -0,0 +1,51 @@
+import threading
+import time
+
+import pytest
+
+QtCore = pytest.importorskip("PyQt6.QtCore")
+
+from blackbox_decoder.app import DecodeWorker
+from blackbox_decoder.progress import Cancelled
+
+
+class Dialog(QtCore.QObject):
+    # Stands for the canceled signal of the QProgressDialog of the GUI thread
+    canceled = QtCore.pyqtSignal()
+
+
+def test_cancel_decode_worker():
+    """
+    Cancelling from the GUI thread should stop a task running on the worker thread
+    """
+    app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+    started = threading.Event()
+    stopped = threading.Event()
+
+    def task(progress):
+        started.set()
+        try:
+            while True:
+                progress.update("parse", 0, 1)
+                time.sleep(0.01)
+        except Cancelled:
+            stopped.set()
+            raise
+
+    dialog = Dialog()
+    thread = QtCore.QThread()
+    worker = DecodeWorker(task)
+    worker.moveToThread(thread)
+    thread.started.connect(worker.run)
+    dialog.canceled.connect(worker.tracker.cancel)
+    thread.start()
+    try:
+        assert started.wait(5)
+        dialog.canceled.emit()
+        # The task stops while run() still blocks the worker thread
+        assert stopped.wait(5)
+    finally:
+        worker.tracker.cancel()
+        thread.quit()
+        thread.wait()
+    assert app is not None
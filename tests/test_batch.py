@@ -0,0 +1,64 @@
+from blackbox_decoder import batch
+from blackbox_decoder.batch import decode_batch, find_logs
+from datetime import timedelta
+import os
+import shutil
+
+
+def test_decode_batch(tmp_path):
+    """
+    Test that a batch decodes every log and reports a corrupt log without stopping
+    """
+    corrupt = tmp_path / "corrupt.log"
+    corrupt.write_bytes(b"\x00\x01\x02")
+
+    paths = find_logs("tests") + find_logs(str(tmp_path))
+    assert paths == ["tests/test.log", str(corrupt)]
+
+    results = {
+        result.path: result
+        for result in decode_batch(paths, workers=2, output_dir=str(tmp_path / "out"))
+    }
+    assert len(results) == 2
+
+    result = results["tests/test.log"]
+    assert result.error is None
+    assert result.drone_name == "BV-ALEDPM"
+    assert result.flight_count == 46
+    assert result.flight_time == timedelta(seconds=129)
+    assert len(result.outputs) == 5
+    assert all(os.path.isfile(path) for path in result.outputs)
+
+    assert results[str(corrupt)].error is not None
+
+
+def crash_or_decode(path, output_dir=None):
+    # The worker process dies without a result, as on a segfault or being killed
+    if os.path.basename(path) == "crash.log":
+        os._exit(1)
+    return DECODE_FILE(path, output_dir)
+
+
+DECODE_FILE = batch.decode_file
+
+
+def test_decode_batch_crash(tmp_path, monkeypatch):
+    """
+    Test that a worker process dying only fails the log it was decoding
+    """
+    paths = []
+    for name in ["a", "b", "crash", "c", "d", "e"]:
+        path = str(tmp_path / f"{name}.log")
+        shutil.copy("tests/test.log", path)
+        paths.append(path)
+    # The workers are forked and see the patched task
+    monkeypatch.setattr(batch, "decode_file", crash_or_decode)
+
+    results = {result.path: result for result in decode_batch(paths, workers=2)}
+    assert sorted(results) == sorted(paths)
+    failed = [path for path, result in results.items() if result.error is not None]
+    assert failed == [str(tmp_path / "crash.log")]
+    assert "BrokenProcessPool" in results[failed[0]].error
+    assert all(
+        result.flight_count == 46 for result in results.values() if not result.error
+    )
@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+from blackbox_decoder.bench import compare, main
+
+
+def test_bench(tmp_path, capsys):
+    """
+    Every stage should be timed on a synthetic log and compared to a saved baseline
+    """
+    results = str(tmp_path / "results.json")
+    args = ["--detail-rows", "3000", "--flights", "2", "--repeat", "1"]
+    assert main([*args, "--save", results]) == 0
+
+    with open(results) as file:
+        baseline = json.load(file)
+    assert baseline["params"]["detail_rows"] == 3000
+    assert set(baseline["stages"]) == {
+        "parse",
+        "read",
+        "decode/Detail",
+        "decode/Rollup",
+        "decode/FlightInfo",
+        "splice",
+        "to_dataframe",
+        "write_csv",
+    }
+    assert baseline["stages"]["decode/Detail"]["rows"] == 3000
+    assert all(stage["seconds"] > 0 for stage in baseline["stages"].values())
+
+    assert main([*args, "--baseline", results, "--threshold", "100"]) == 0
+    assert "baseline" in capsys.readouterr().out
+
+    slower = json.loads(json.dumps(baseline))
+    slower["stages"]["write_csv"]["seconds"] += 1
+    assert compare(slower, baseline) == ["write_csv"]
+    with pytest.raises(ValueError):
+        compare({**slower, "params": {"detail_rows": 1}}, baseline)
@@ -0,0 +1,43 @@
+import pytest
+
+from blackbox_decoder.blit import BlitManager, FlightCursor
+
+
+def test_flight_cursor():
+    """
+    The cursor should only be drawn on the axes sharing the x axis of the one under the mouse
+    """
+    plt = pytest.importorskip("matplotlib.pyplot")
+    fig, axes = plt.subplots(2, 2, sharex="row")
+    for ax in axes.flat:
+        ax.plot([0, 10], [0, 1])
+    cursor = FlightCursor(fig.canvas, list(axes.flat))
+    fig.canvas.draw()
+    assert cursor.blit.background is not None
+
+    cursor.move(axes[1, 0], 5.0)
+    visible = [line.get_visible() for line in cursor.lines.values()]
+    assert visible == [False, False, True, True]
+    assert list(cursor.lines[axes[1, 1]].get_xdata()) == [5.0, 5.0]
+    # The cursor does not change the limits of the axes
+    assert axes[1, 1].get_xlim() == axes[0, 0].get_xlim()
+
+    cursor.move(None, None)
+    assert not any(line.get_visible() for line in cursor.lines.values())
+    plt.close(fig)
+
+
+def test_blit_manager():
+    """
+    Animated artists are drawn by the BlitManager only
+    """
+    plt = pytest.importorskip("matplotlib.pyplot")
+    fig, ax = plt.subplots()
+    (line,) = ax.plot([0, 1], [0, 1])
+    blit = BlitManager(fig.canvas, [line])
+    assert line.get_animated()
+    blit.update()
+    assert blit.background is not None
+    line.set_ydata([1, 0])
+    blit.update()
+    plt.close(fig)
@@ -0,0 +1,95 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from blackbox_decoder.cache import LogCache
+from blackbox_decoder.log import FLIGHT_SECTIONS, LAYOUT_VERSION, FlightRecord
+
+
+def test_cached_record(tmp_path):
+    """
+    A FlightRecord loaded from the cache should hold the same log and flights as a decoded one
+    """
+    cache = LogCache(str(tmp_path))
+    cold = FlightRecord("tests/test.log", lazy=True, disk_cache=cache)
+    warm = FlightRecord("tests/test.log", lazy=True, disk_cache=cache)
+
+    assert warm.log.gen_info.structure == cold.log.gen_info.structure
+    assert warm.get_flight_time() == cold.get_flight_time()
+    assert warm.get_drone_name() == cold.get_drone_name()
+    assert len(warm) == len(cold)
+    for a, b in zip(warm.flights, cold.flights):
+        assert (a.start, a.end, a.ranges) == (b.start, b.end, b.ranges)
+        for section in FLIGHT_SECTIONS:
+            for key in a.table(section).keys():
+                np.testing.assert_array_equal(
+                    a.table(section).column(key), b.table(section).column(key)
+                )
+    for a, b in zip(warm.to_dataframe(0), cold.to_dataframe(0)):
+        pd.testing.assert_frame_equal(a, b)
+
+
+def test_eviction(tmp_path):
+    """
+    The least recently used entries should be removed once the cache outgrows its size
+    """
+    cache = LogCache(str(tmp_path), max_size=0)
+    FlightRecord("tests/test.log", disk_cache=cache)
+    entries = [name for _, _, files in os.walk(tmp_path) for name in files]
+    assert not any(name.endswith(".npz") for name in entries)
+    assert cache.read_index() == {}
+
+
+def test_corrupt_entry(tmp_path):
+    """
+    A truncated entry should be removed and the log decoded and cached again
+    """
+    cache = LogCache(str(tmp_path))
+    FlightRecord("tests/test.log", disk_cache=cache)
+    entry = cache.entry_path("tests/test.log", LAYOUT_VERSION)
+    with open(entry, "r+b") as file:
+        file.truncate(os.path.getsize(entry) // 2)
+
+    assert cache.load("tests/test.log", LAYOUT_VERSION) is None
+    assert not os.path.exists(entry)
+
+    with open(entry, "wb") as file:
+        file.write(b"not a zip file")
+    record = FlightRecord("tests/test.log", disk_cache=cache)
+    assert len(record) == 46
+    assert cache.load("tests/test.log", LAYOUT_VERSION) is not None
+
+
+def test_incomplete_entry(tmp_path):
+    """
+    An entry missing some arrays should be decoded again instead of failing
+    """
+    cache = LogCache(str(tmp_path))
+    cache.store("tests/test.log", LAYOUT_VERSION, {"unrelated": np.zeros(3)})
+    record = FlightRecord("tests/test.log", disk_cache=cache)
+    assert len(record) == 46
+    assert "splice/bounds" in cache.load("tests/test.log", LAYOUT_VERSION)
+
+
+@pytest.mark.parametrize(
+    "lazy, name", [(False, "milli_detail/outVoltX10"), (True, "milli_detail/packed")]
+)
+def test_entry_missing_column(tmp_path, lazy, name):
+    """
+    An entry missing a single column of a section should be decoded again and replaced
+    """
+    cache = LogCache(str(tmp_path))
+    FlightRecord("tests/test.log", lazy=lazy, disk_cache=cache)
+    arrays = cache.load("tests/test.log", LAYOUT_VERSION)
+    del arrays[name]
+    cache.store("tests/test.log", LAYOUT_VERSION, arrays)
+
+    record = FlightRecord("tests/test.log", lazy=lazy, disk_cache=cache)
+    expected = FlightRecord("tests/test.log")
+    assert len(record) == 46
+    assert np.array_equal(
+        record.log.milli_detail["outVoltX10"], expected.log.milli_detail["outVoltX10"]
+    )
+    assert name in cache.load("tests/test.log", LAYOUT_VERSION)
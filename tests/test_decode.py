@@ -0,0 +1,250 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from blackbox_decoder.decode import (
+    decode_packed,
+    decode_record,
+    decode_section,
+    packed_view,
+)
+from blackbox_decoder.log import BaseLog, Detail, Rollup, FlightInfo, Log
+from blackbox_decoder.parse import map_sections, parse_log, block_payload
+
+data = parse_log("tests/test.log")
+
+SECTIONS = [
+    (Detail, "Millisecond detail"),
+    (Rollup, "Minute Rollup"),
+    (Rollup, "Second Rollup"),
+    (FlightInfo, "Flight Events"),
+]
+
+
+def reference_decode(packet: type, payload: bytes) -> dict:
+    """
+    Decodes a packet bit by bit with Python integers, the way the original BitStream
+    decoder read it, as a reference independent of the compiled layouts
+
+    The fields are read in reverse order from the most significant bit, the Detail packet
+    from its first bit and the others after the bits that do not fit a field.
+    """
+    fields = list(packet.get_size_struct().items())
+    total = 8 * len(payload)
+    bits = sum(size for _, (_, size) in fields)
+    pos = 0 if packet is Detail else total % bits
+    value = int.from_bytes(payload, "big")
+    structure = {}
+    for key, (fmt, size) in reversed(fields):
+        raw = (value >> (total - pos - size)) & ((1 << size) - 1)
+        pos += size
+        kind = fmt.split(":")[0]
+        if kind == "int" and raw >> (size - 1):
+            raw -= 1 << size
+        if kind == "bytes":
+            try:
+                raw = raw.to_bytes(size // 8, "big").decode("utf-8")[::-1]
+            except UnicodeDecodeError:
+                raw = "ERROR"
+        elif key in packet.scaled_fields:
+            raw /= 10
+        structure[key] = raw
+    return dict(reversed(list(structure.items())))
+
+
+def row_payload(row: str) -> bytes:
+    return bytes.fromhex("".join(row.split()[2:]))
+
+
+# Records decoded by the original BitStream decoder
+GOLDEN = [
+    (
+        Detail,
+        "Millisecond detail",
+        250,
+        {
+            "recNumb": 1074282532,
+            "entryTimeMsecs": 5474,
+            "tethActive": 1,
+            "tethCurrentX10": 0.0,
+            "outVoltX10": 153.6,
+            "battOutKill": 1,
+        },
+    ),
+    (
+        Rollup,
+        "Second Rollup",
+        100,
+        {
+            "recNumb": 4325419,
+            "entryTimeMsecs": 21403,
+            "battOn": 1,
+            "tethCurrentX10Peak": 0.2,
+            "battOutKill": 1,
+            "maxTemp": -64,
+            "filler3": 14,
+        },
+    ),
+    (
+        FlightInfo,
+        "Flight Events",
+        0,
+        {"begRecNumb": 0, "maxTemp": -999, "minTemp": 999, "data": "Startin"},
+    ),
+]
+
+
+def test_reference_decode():
+    """
+    Test the reference decoder against records decoded by the original decoder
+    """
+    for packet, section, i, expected in GOLDEN:
+        structure = reference_decode(packet, row_payload(data[section][i]))
+        assert list(structure.keys()) == list(packet.get_size_struct().keys())
+        for key, value in expected.items():
+            assert structure[key] == value, (section, i, key)
+
+
+def test_decode_section():
+    """
+    Test that the vectorized decoder matches the reference decoder for every row
+    """
+    for packet, section in SECTIONS:
+        rows = data[section]
+        columns = decode_section(packet, rows)
+        assert list(columns.keys()) == list(packet.get_size_struct().keys())
+        for i, row in enumerate(rows):
+            for key, value in reference_decode(packet, row_payload(row)).items():
+                assert columns[key][i] == value, (section, i, key)
+
+
+def test_decode_section_scaling():
+    """
+    Test the X10 scaling and signed fields of the first records
+    """
+    detail = decode_section(Detail, data["Millisecond detail"][:1])
+    assert detail["tethCurrentX10"][0] == 51.1
+    assert detail["outVoltX10"][0] == 153.6
+
+    rollup = decode_section(Rollup, data["Minute Rollup"][:1])
+    assert rollup["tethCurrentX10Avg"][0] == -13.1
+    assert rollup["maxTemp"][0] == -1
+
+
+def test_decode_record():
+    """
+    Test that a record decoded from its bytes matches the reference decoder
+    """
+    for packet, section in SECTIONS:
+        for row in data[section][:50]:
+            payload = row_payload(row)
+            assert decode_record(packet, memoryview(payload)) == reference_decode(
+                packet, payload
+            )
+
+    with pytest.raises(ValueError):
+        decode_record(Detail, bytes(15))
+
+
+def test_packed_view():
+    """
+    Test that a buffer of packets is viewed in place
+    """
+    buffer = bytearray(range(64))
+    packed = packed_view(buffer, 16, offset=32)
+    assert packed.shape == (2, 16)
+    buffer[32] = 255
+    assert packed[0, 0] == 255
+
+    with pytest.raises(ValueError):
+        packed_view(buffer, 16, offset=8)
+
+
+def test_from_buffers():
+    """
+    Test that a log decoded from the raw bytes of its sections matches the text log
+    """
+    log = Log("tests/test.log")
+    sections = map_sections("tests/test.log")
+    buffers = {
+        section: b"".join(block_payload(block) for block in sections[section])
+        for _, section in SECTIONS
+    }
+    gen_info = block_payload(sections["General Info"][0])
+
+    binary = Log.from_buffers(gen_info, buffers, sections["Flight Time"], lazy=True)
+    assert binary.gen_info.structure == log.gen_info.structure
+    assert binary.flight_time == datetime.timedelta(seconds=129)
+    for section in ["milli_detail", "minute_rollup", "second_rollup", "flight_events"]:
+        for key in getattr(log, section).keys():
+            np.testing.assert_array_equal(
+                getattr(binary, section).column(key), getattr(log, section).column(key)
+            )
+
+
+class Sample(BaseLog):
+    scaled_fields = ["cross"]
+
+    @classmethod
+    def get_size_struct(cls):
+        return {
+            "head": ("uint:8", 8),
+            "cross": ("int:20", 20),
+            "tail": ("uint:50", 50),
+        }
+
+
+def test_packet_layout():
+    """
+    Test a packet type declared only by its fields, with a field crossing two words
+    """
+    layout = Sample.layout
+    assert Sample.packet_size() == 10
+    assert layout.fields["tail"].pos == 2
+    assert layout.fields["cross"].left == 8
+
+    rng = np.random.default_rng(0)
+    values = [
+        (int(h), int(c), int(t))
+        for h, c, t in zip(
+            rng.integers(0, 1 << 8, 100),
+            rng.integers(-(1 << 19), 1 << 19, 100),
+            rng.integers(0, 1 << 50, 100),
+        )
+    ]
+    payload = b"".join(
+        ((t << 28 | (c & 0xFFFFF) << 8 | h)).to_bytes(10, "big") for h, c, t in values
+    )
+    columns = decode_packed(Sample, packed_view(payload, 10), scale=False)
+    for i, (h, c, t) in enumerate(values):
+        record = decode_record(Sample, payload[10 * i : 10 * i + 10])
+        assert record == {"head": h, "cross": c / 10, "tail": t}
+        assert (columns["head"][i], columns["cross"][i], columns["tail"][i]) == (
+            h,
+            c,
+            t,
+        )
+
+
+def test_encode_packed():
+    """
+    Test that packing the decoded columns of a section gives back its fields
+
+    The bits of a packet outside of its fields are not kept, so the packets are compared
+    once decoded again.
+    """
+    sections = map_sections("tests/test.log")
+    for packet, section in SECTIONS[:3]:
+        payload = b"".join(block_payload(block) for block in sections[section])
+        packed = packed_view(payload, packet.packet_size())
+        columns = decode_packed(packet, packed, scale=False)
+        encoded = packet.layout.encode_packed(columns)
+        assert encoded.shape == packed.shape
+        for key, column in decode_packed(packet, encoded, scale=False).items():
+            assert np.array_equal(column, columns[key]), (section, key)
+
+    # The X10 fields of a single record are scaled back to their raw value
+    record = Rollup.from_bytes(0, 0, packed[0].tobytes())
+    encoded = Rollup.layout.encode_values(record.structure)
+    assert Rollup.from_bytes(0, 0, encoded).structure == record.structure
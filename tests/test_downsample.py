@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+from blackbox_decoder.downsample import (
+    DownsampledAxes,
+    minmax,
+    reduce_series,
+    steps,
+    visible_range,
+)
+
+
+def test_minmax():
+    """
+    The envelope of every bucket should be kept, including single sample spikes
+    """
+    x = np.arange(1_000_000)
+    y = np.sin(x / 1000).astype(np.float32)
+    y[123_457] = 5
+    y[876_543] = -5
+    dx, dy = minmax(x, y, 1000)
+
+    assert len(dx) <= 2 * 1000 + 2
+    assert np.all(np.diff(dx) > 0)
+    assert dy.max() == 5 and dy.min() == -5
+    assert 123_457 in dx and 876_543 in dx
+    # Small series are not reduced
+    assert len(minmax(x[:100], y[:100], 1000)[0]) == 100
+
+
+def test_steps():
+    """
+    A flag should keep exactly its transitions
+    """
+    x = np.arange(1_000_000)
+    y = np.zeros(len(x), dtype=np.uint8)
+    y[1000:2000] = 1
+    y[500_000] = 1
+    dx, dy = steps(x, y, 500)
+
+    assert list(dx) == [0, 1000, 2000, 500_000, 500_001, 999_999]
+    assert list(dy) == [0, 1, 0, 1, 0, 0]
+
+
+def test_visible_range():
+    x = np.arange(0, 100, 10)
+    assert visible_range(x, 25, 55) == (2, 7)
+    assert visible_range(x, -50, 500) == (0, 10)
+
+
+def test_zoom():
+    """
+    Zooming in should bring back every sample of the visible range
+    """
+    plt = pytest.importorskip("matplotlib.pyplot")
+    fig, ax = plt.subplots(figsize=(4, 3), dpi=100)
+    plot = DownsampledAxes(ax)
+    x = np.arange(200_000)
+    plot.plot(x, np.cos(x / 50), label="volt")
+    plot.plot(x, (x // 1000) % 2 == 0, label="flag", step=True)
+
+    points = plot.points()
+    assert points["volt"] < 2_000
+    assert points["flag"] == 201
+
+    ax.set_xlim(1000, 1100)
+    points = plot.points()
+    assert points["volt"] == 103
+    assert points["flag"] == 103
+    plt.close(fig)
+
+
+def test_swap_series():
+    """
+    Plotting a label again should swap the data of its line and rescale() should fit the new series
+    """
+    plt = pytest.importorskip("matplotlib.pyplot")
+    fig, ax = plt.subplots(figsize=(4, 3), dpi=100)
+    plot = DownsampledAxes(ax)
+    x = np.arange(200_000)
+    plot.plot(x, np.cos(x / 50), label="volt")
+    line = plot.series["volt"].line
+
+    x = np.arange(1000, 51_000)
+    y = 10 + np.sin(x / 50)
+    overview = reduce_series(x, y, plot.buckets())
+    plot.plot(x, y, label="volt", overview=overview)
+    plot.rescale()
+
+    assert plot.series["volt"].line is line
+    assert len(ax.lines) == 1
+    assert np.array_equal(line.get_xdata(), overview[0])
+    assert ax.get_xlim() == (1000, 50_999)
+    low, high = ax.get_ylim()
+    assert low < 9 < 11 < high
+
+    plot.clear()
+    assert plot.points() == {"volt": 0}
+    plt.close(fig)
@@ -0,0 +1,54 @@
+from blackbox_decoder.log import Log, FlightRecord
+from blackbox_decoder.export import write_flights, write_log
+
+import numpy as np
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def test_write_parquet(tmp_path):
+    """
+    Test that each section is written with typed columns in row groups
+    """
+    log = Log("tests/test.log", lazy=True)
+    paths = write_log(log, str(tmp_path), row_group_size=128)
+    assert [path.split("/")[-1] for path in paths] == [
+        "GenInfo.parquet",
+        "Detail.parquet",
+        "MinuteRollup.parquet",
+        "SecondRollup.parquet",
+        "FlightInfo.parquet",
+    ]
+
+    gen_info = pq.read_table(paths[0]).to_pylist()[0]
+    assert gen_info["ID"] == "BV-ALEDPM"
+
+    detail = pq.ParquetFile(paths[1])
+    assert detail.metadata.num_rows == 500
+    assert detail.metadata.num_row_groups == 4
+    table = detail.read()
+    assert table.schema.field("tethOn").type == pa.bool_()
+    assert table.schema.field("tethCurrentX10").type == pa.float32()
+    assert np.array_equal(
+        table["recNumb"].to_numpy(), Log("tests/test.log").milli_detail["recNumb"]
+    )
+
+    flight_info = pq.read_table(paths[4])
+    assert flight_info["data"][0].as_py() == "Startin"
+
+
+def test_write_arrow_flights(tmp_path):
+    """
+    Test that each flight is written to its own partition
+    """
+    record = FlightRecord("tests/test.log", lazy=True)
+    paths = write_flights(record, str(tmp_path), format="arrow")
+    assert str(tmp_path / "flight=0" / "Rollup.arrow") in paths
+
+    with pa.ipc.open_file(str(tmp_path / "flight=0" / "Detail.arrow")) as reader:
+        table = reader.read_all()
+    df = record.to_dataframe(0)[1]
+    assert table.num_rows == len(df)
+    assert np.array_equal(table["recNumb"].to_numpy(), df["recNumb"].to_numpy())
@@ -2,6 +2,7 @@ from blackbox_decoder.log import FlightRecord
 from datetime import timedelta
 from typing import List
 
+import numpy as np
 import pandas as pd
 
 record = FlightRecord("tests/test.log")
@@ -39,3 +40,55 @@ def test_chrono_order():
             df = list_of_dataframes[1]
             # assert df["entryTimeMsecs"].is_monotonic_increasing
             assert df["recNumb"].is_monotonic_increasing
+
+
+def test_splice():
+    """
+    Test that every flight holds the records between its begRecNumb and the next one
+    """
+    log = record.log
+    for flight in record.flights:
+        for section in ["milli_detail", "minute_rollup", "second_rollup"]:
+            recs = getattr(log, section).columns["recNumb"]
+            expected = (recs >= flight.start) & (recs < flight.end)
+            assert sorted(flight.indices(section)) == list(expected.nonzero()[0])
+
+        recs = [x["recNumb"] for x in flight]
+        assert recs == sorted(recs)
+
+
+def test_lazy():
+    """
+    Test that a lazy FlightRecord only decodes a flight when it is read
+    """
+    lazy = FlightRecord("tests/test.log", lazy=True, cache_size=2)
+    assert len(lazy) == len(record)
+    assert lazy.get_flight_time() == record.get_flight_time()
+    assert lazy.get_drone_name() == record.get_drone_name()
+    assert list(lazy.log.milli_detail.decoded) == ["recNumb"]
+
+    for i in range(3):
+        for df, expected in zip(lazy.to_dataframe(i), record.to_dataframe(i)):
+            assert df.equals(expected)
+    assert len(lazy.cache) == 2 * 3
+    assert list(lazy.log.milli_detail.decoded) == ["recNumb"]
+
+
+def test_dataframe_dtypes():
+    """
+    Test the dtypes of the DataFrames and that a changed frame does not reach later calls
+    """
+    rollup, detail = record.to_dataframe(0)
+    assert rollup["tethOn"].dtype == bool
+    assert rollup["tethCurrentX10Avg"].dtype == np.float32
+    assert detail["battDrain"].dtype == bool
+    assert detail["outVoltX10"].dtype == np.float32
+    assert detail["recNumb"].dtype == np.uint32
+
+    expected = [rollup.copy(), detail.copy()]
+    rollup["tethCurrentX10Avg"] = rollup["tethCurrentX10Avg"] / 10
+    detail.drop(columns="battDrain", inplace=True)
+    cached = record.to_dataframe(0)
+    assert cached[0] is not rollup
+    assert cached[0].equals(expected[0])
+    assert cached[1].equals(expected[1])
@@ -0,0 +1,92 @@
+import numpy as np
+
+from blackbox_decoder.follow import LogFollower, SectionBuffer
+from blackbox_decoder.log import FLIGHT_SECTIONS, FlightRecord
+from blackbox_decoder.parse import parse_log
+
+record = FlightRecord("tests/test.log")
+
+
+def test_follow(tmp_path):
+    """
+    Following a log written in pieces should end with the same flights as decoding the whole log
+    """
+    with open("tests/test.log", "rb") as file:
+        data = file.read()
+    path = tmp_path / "live.log"
+    path.write_bytes(b"")
+    follower = LogFollower(str(path))
+
+    rows = 0
+    # Odd sized pieces split the lines and the UTF-16 code units
+    for start in range(0, len(data), 40_001):
+        with open(path, "ab") as file:
+            file.write(data[start : start + 40_001])
+        rows += sum(len(table) for table in follower.poll().values())
+    assert follower.poll() == {}
+
+    log = follower.log
+    assert rows == sum(
+        len(getattr(record.log, section))
+        for section in [*FLIGHT_SECTIONS, "flight_events"]
+    )
+    assert log.gen_info.structure == record.log.gen_info.structure
+    assert log.flight_time == record.get_flight_time()
+
+    live = follower.record
+    assert len(live) == len(record)
+    for a, b in zip(live.flights, record.flights):
+        assert (a.start, a.end) == (b.start, b.end)
+        for section in FLIGHT_SECTIONS:
+            np.testing.assert_array_equal(
+                a.table(section).raw_column("recNumb"),
+                b.table(section).raw_column("recNumb"),
+            )
+
+
+def test_follow_extends_flight(tmp_path):
+    """
+    Records appended to a flight that was already read should replace its cached records
+    """
+    with open("tests/test.log", "rb") as file:
+        data = file.read()
+    path = tmp_path / "live.log"
+    path.write_bytes(data)
+    follower = LogFollower(str(path))
+    follower.poll()
+    live = follower.record
+    flight = live.flights[0]
+    before = len(live.to_dataframe(0)[0])
+
+    # Append a Second Rollup section with a copy of the first rollup record of the flight
+    index = int(flight.indices("second_rollup")[0])
+    row = parse_log(str(path))["Second Rollup"][index]
+    text = "Second Rollup\r\nrec#  Offset  payload\r\n" + row + "\r\n"
+    with open(path, "ab") as file:
+        file.write(text.encode("utf-16-le"))
+
+    assert len(follower.poll()["second_rollup"]) == 1
+    assert len(live.flights) == len(record.flights)
+    assert len(live.to_dataframe(0)[0]) == before + 1
+
+
+def test_section_buffer():
+    """
+    Appending should grow the columns by doubling and keep the earlier tables unchanged
+    """
+    table = record.log.milli_detail
+    buffer = SectionBuffer(table.packet, capacity=100)
+    buffer.append(table.take(np.arange(60)))
+    first = buffer.table()
+    buffer.append(table.take(np.arange(60, 500)))
+    assert len(buffer.columns["recNumb"]) == 500
+    buffer.append(table.take(np.arange(10)))
+    assert len(buffer.columns["recNumb"]) == 1000
+
+    assert len(first) == 60
+    np.testing.assert_array_equal(
+        first.raw_column("recNumb"), table.raw_column("recNumb")[:60]
+    )
+    recs = buffer.table().raw_column("recNumb")
+    np.testing.assert_array_equal(recs[:500], table.raw_column("recNumb"))
+    np.testing.assert_array_equal(recs[500:], table.raw_column("recNumb")[:10])
@@ -0,0 +1,69 @@
+import datetime
+import os
+import shutil
+
+import pandas as pd
+
+from blackbox_decoder.cache import LogCache
+from blackbox_decoder.index import FleetIndex
+from blackbox_decoder.log import FlightRecord
+
+
+def test_index(tmp_path):
+    """
+    The flights of a log should be indexed once and opened again from a query result
+    """
+    log = str(tmp_path / "test.log")
+    shutil.copy("tests/test.log", log)
+    cache = LogCache(str(tmp_path / "cache"))
+
+    with FleetIndex(str(tmp_path / "fleet.sqlite"), cache) as fleet:
+        record = FlightRecord(log)
+        assert fleet.update([log]) == {log: len(record)}
+        assert len(fleet) == len(record)
+        # An unchanged log is not indexed again
+        assert fleet.update([log]) == {}
+
+        rows = fleet.query(drone=record.get_drone_name())
+        assert len(rows) == len(record)
+        assert fleet.query(drone="nobody") == []
+        assert fleet.query(since=datetime.datetime(2030, 1, 1)) == []
+
+        row = fleet.query(where="detailRows > ?", params=[0])[0]
+        assert row["logBegin"] == "2024-07-13T10:56:59"
+        assert row["tethVoltMin"] <= row["tethVoltAvg"] <= row["tethVoltMax"]
+
+        opened, i = fleet.open(row)
+        assert i == row["flight"]
+        expected = record.to_dataframe(i)
+        for a, b in zip(opened.to_dataframe(i), expected):
+            pd.testing.assert_frame_equal(a, b)
+        assert len(opened.to_dataframe(i)) == len(expected)
+
+        # A changed log is indexed again and a removed one is pruned
+        os.utime(log, ns=(0, 0))
+        assert fleet.update([log]) == {log: len(record)}
+        os.remove(log)
+        assert fleet.prune() == [log]
+        assert len(fleet) == 0
+
+
+def test_index_incomplete(tmp_path):
+    """
+    A log without its [END] timestamp should be indexed with a NULL end, and a missing
+    log should be reported without stopping the update
+    """
+    text = open("tests/test.log", encoding="utf-16").read()
+    log = str(tmp_path / "writing.log")
+    with open(log, "w", encoding="utf-16") as file:
+        file.write("".join(text.splitlines(keepends=True)[:-1]))
+    missing = str(tmp_path / "missing.log")
+
+    with FleetIndex(str(tmp_path / "fleet.sqlite"), False) as fleet:
+        updated = fleet.update([missing, log])
+        assert "FileNotFoundError" in updated[missing]
+        assert updated[log] == 46
+
+        row = fleet.query()[0]
+        assert row["logBegin"] == "2024-07-13T10:56:59"
+        assert row["logEnd"] is None
@@ -107,3 +107,18 @@ def test_log():
     """
     log = Log("tests/test.log")
     assert log.flight_time == timedelta(seconds=129)
+
+
+def test_record_slots():
+    """
+    Test that the per record classes only keep their decoded values
+    """
+    detail = Detail(data["Millisecond detail"][0])
+    assert not hasattr(detail, "__dict__")
+    assert list(detail) == list(detail.structure.values())
+    assert list(detail.structure) == list(Detail.get_size_struct())
+    assert str(detail).startswith("recNumb: 3758637126\n")
+
+    gen_info = GeneralInfo(data["General Info"][0])
+    assert list(gen_info.structure)[0] == "ID"
+    assert gen_info["last_rec_number"] == 4325189
@@ -0,0 +1,99 @@
+from blackbox_decoder.main import main
+
+import os
+import pytest
+
+
+def lines(capsys):
+    return [line.split("\t") for line in capsys.readouterr().out.splitlines()]
+
+
+def test_summary(capsys):
+    """
+    Test that the summary of a log is printed without building any DataFrame
+    """
+    assert main(["summary", "tests/test.log"]) == 0
+    assert lines(capsys) == [
+        ["path", "drone", "flights", "flight_time"],
+        ["tests/test.log", "BV-ALEDPM", "46", "0:02:09"],
+    ]
+
+
+def test_flights(capsys):
+    """
+    Test that every flight is listed with its recNumb range and rows per section
+    """
+    assert main(["flights", "tests/test.log"]) == 0
+    output = lines(capsys)
+    assert output[0] == [
+        "flight",
+        "begRecNumb",
+        "endRecNumb",
+        "milli_detail",
+        "minute_rollup",
+        "second_rollup",
+    ]
+    assert len(output) == 1 + 46
+    assert output[1] == ["0", "4325189", "4294967295", "491", "1", "68"]
+    assert sum(int(row[3]) for row in output[1:]) == 500
+
+
+def test_stats(capsys):
+    """
+    Test that the channel aggregates of the selected flights are printed
+    """
+    assert main(["stats", "tests/test.log", "-f", "0", "-f", "3"]) == 0
+    output = lines(capsys)
+    assert output[0] == ["flight", "rows", "channel", "min", "max", "mean"]
+    assert output[1] == ["0", "491", "tethCurrentX10", "0", "51.1", "18.8363"]
+    assert {row[0] for row in output[1:]} == {"0", "3"}
+    # A flight without Detail records has no aggregates
+    assert all(row[3:] == ["", "", ""] for row in output[1:] if row[0] == "3")
+
+
+@pytest.mark.parametrize("flight", ["46", "-1"])
+def test_stats_invalid_flight(capsys, flight):
+    """
+    Test that a flight index out of the log is an argument error
+    """
+    with pytest.raises(SystemExit) as exc:
+        main(["stats", "tests/test.log", "-f", "0", "-f", flight])
+    assert exc.value.code == 2
+    output = capsys.readouterr()
+    assert output.out == ""
+    assert f"invalid flight {flight}" in output.err
+
+
+@pytest.mark.parametrize(
+    "args, files",
+    [
+        ([], ["GenInfo.csv", "Detail.csv"]),
+        (["--per-flight"], ["flight=0/Rollup.csv", "flight=0/Detail.csv"]),
+    ],
+)
+def test_export(tmp_path, capsys, args, files):
+    """
+    Test that the sections or the flights are written to the output directory
+    """
+    assert main(["export", "tests/test.log", "-o", str(tmp_path), *args]) == 0
+    paths = capsys.readouterr().out.splitlines()
+    for name in files:
+        assert str(tmp_path / name) in paths
+    assert all(os.path.isfile(path) for path in paths)
+
+
+def test_index_since(tmp_path, monkeypatch, capsys):
+    """
+    Test that --since lists the flights of later logs and rejects an invalid date
+    """
+    monkeypatch.setenv("BLACKBOX_CACHE_DIR", str(tmp_path))
+    db = str(tmp_path / "fleet.sqlite")
+    assert main(["index", "tests/test.log", "--db", db, "--since", "2024-07-01"]) == 0
+    assert len(lines(capsys)) == 46
+
+    with pytest.raises(SystemExit) as exc:
+        main(["index", "--db", db, "--since", "2024-13-01"])
+    assert exc.value.code == 2
+    output = capsys.readouterr()
+    assert output.out == ""
+    assert "--since: invalid fromisoformat value: '2024-13-01'" in output.err
@@ -0,0 +1,69 @@
+from blackbox_decoder.decode import pack_rows
+from blackbox_decoder import log as log_module
+from blackbox_decoder.log import FLIGHT_SECTIONS, Detail, Rollup, Log
+from blackbox_decoder.parallel import MIN_PARALLEL_ROWS, decode_parallel, split_chunks
+from blackbox_decoder.parse import parse_log
+from blackbox_decoder.synth import write_log
+from blackbox_decoder.table import LogTable
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+data = parse_log("tests/test.log")
+
+
+def test_split_chunks():
+    """
+    Test that the chunks cover every row once and in order
+    """
+    assert split_chunks(10, 3) == [(0, 3), (3, 6), (6, 10)]
+    assert split_chunks(2, 4) == [(0, 1), (1, 2)]
+    assert split_chunks(0, 2) == []
+
+
+def test_decode_parallel():
+    """
+    Test that the chunks decoded by the workers are reassembled in order
+    """
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        for packet, section in [
+            (Detail, "Millisecond detail"),
+            (Rollup, "Second Rollup"),
+        ]:
+            packed = pack_rows(data[section], packet.packet_size())
+            expected = LogTable.from_packed(packet, packed)
+            table = decode_parallel(packet, packed, executor, chunks=3)
+            assert table.keys() == expected.keys()
+            for key in expected.keys():
+                assert table.columns[key].dtype == expected.columns[key].dtype
+                assert np.array_equal(table.columns[key], expected.columns[key])
+
+
+def test_log_workers(tmp_path, monkeypatch):
+    """
+    Test that a Log decoded with workers matches a Log decoded in this process
+    """
+    path = str(tmp_path / "synthetic.log")
+    write_log(path, detail_rows=MIN_PARALLEL_ROWS + 1000, flights=3)
+
+    calls = []
+
+    def spy(packet, packed, executor, chunks):
+        calls.append(packet)
+        return decode_parallel(packet, packed, executor, chunks)
+
+    monkeypatch.setattr(log_module, "decode_parallel", spy)
+    parallel = Log(path, workers=2)
+    # Only the Detail section is large enough to be decoded by the workers
+    assert calls == [Detail]
+
+    expected = Log(path)
+    assert parallel.gen_info.structure == expected.gen_info.structure
+    assert parallel.flight_time == expected.flight_time
+    for section in (*FLIGHT_SECTIONS, "flight_events"):
+        table, reference = getattr(parallel, section), getattr(expected, section)
+        assert len(table) == len(reference)
+        assert table.keys() == reference.keys()
+        for key in reference.keys():
+            assert table.columns[key].dtype == reference.columns[key].dtype
+            assert np.array_equal(table.columns[key], reference.columns[key])
@@ -0,0 +1,153 @@
+from blackbox_decoder.parse import (
+    HEADER,
+    PATTERNS,
+    LineScanner,
+    block_payload,
+    iter_records,
+    map_sections,
+    parse_log,
+    read_ascii,
+    read_flight_time,
+    split_row,
+    split_rows,
+)
+from datetime import timedelta
+
+data = parse_log("tests/test.log")
+
+
+def test_iter_records():
+    """
+    Test that the streamed records match the rows of parse_log
+    """
+    records = list(iter_records("tests/test.log"))
+    rows = [
+        (section, row)
+        for section, rows in data.items()
+        if section != "Flight Time"
+        for row in rows
+    ]
+    assert len(records) == len(rows)
+
+    records.sort(key=lambda x: list(data).index(x[0]))
+    for (section, rec, offset, payload), (row_section, row) in zip(records, rows):
+        parts = row.split()
+        assert section == row_section
+        assert rec == int(parts[0])
+        assert offset == int(parts[1], 16)
+        assert payload == bytes.fromhex("".join(parts[2:]))
+
+
+def test_read_flight_time():
+    """
+    Test the flight time read from the timestamps
+    """
+    assert read_flight_time("tests/test.log") == timedelta(seconds=129)
+    assert read_flight_time("tests/test.log") == data["Flight Time"]
+
+
+def test_memory_map():
+    """
+    Test that the memory mapped reader matches the text reader
+    """
+    assert parse_log("tests/test.log", memory_map=False) == data
+
+    sections = map_sections("tests/test.log")
+    for section, rows in data.items():
+        if section == "Flight Time":
+            assert sections[section] == rows
+            continue
+        payload = b"".join(block_payload(block) for block in sections[section])
+        assert payload == bytes.fromhex(
+            "".join("".join(row.split()[2:]) for row in rows)
+        )
+
+
+def test_split_rows():
+    """
+    Test that the rows checked in batches are exactly the ones matching the PATTERNS
+    """
+
+    def reference(line, section):
+        line = line.strip()
+        return split_row(line) if PATTERNS[section].match(line) else None
+
+    for section in HEADER:
+        row = data[section][0]
+        rec, offset, words = row.split(None, 2)
+        lines = [
+            row + " \r\n",
+            row,
+            "  " + row + "\t",
+            f"{rec}\t0x{offset[2:].upper()}  {words}",
+            f"{rec} {offset} " + "  ".join(words.split()),
+            row.replace(" ", "\u3000", 1),
+            row + " 00",
+            row[:-1],
+            row[:-1] + "g",
+            row.replace("0x", "0X", 1),
+            "1" + row,
+            "\u0661\u0662\u0663" + row[3:],
+            "",
+        ]
+        for line in lines:
+            assert split_rows([row, line, row], section)[1:2] == (
+                [reference(line, section)] if reference(line, section) else []
+            ), (section, line)
+
+    # The rows up to the first line that is not a row of the section
+    rows = data["Millisecond detail"][:50]
+    lines = [row + "\n" for row in rows] + ["\n", "Minute Rollup\n"] + rows
+    assert split_rows(lines, "Millisecond detail") == [split_row(r) for r in rows]
+    assert split_rows([], "Millisecond detail") == []
+
+
+def test_line_scanner():
+    """
+    Test that lines fed in pieces are scanned like the whole log
+    """
+    with open("tests/test.log", encoding="utf-16-le") as file:
+        lines = file.read().splitlines()
+    scanner = LineScanner()
+    pieces = [
+        row
+        for start in range(0, len(lines), 777)
+        for row in scanner.scan(lines[start : start + 777])
+    ]
+    assert pieces == list(LineScanner().scan(lines))
+    assert [row for section, row in pieces if section == HEADER[1]] == data[HEADER[1]]
+
+
+def test_header_with_extra_text(tmp_path):
+    """
+    Test that a header line holding more than the section name still starts the section
+    """
+    with open("tests/test.log", encoding="utf-16-le", newline="") as file:
+        text = file.read()
+    assert "\r\nMillisecond detail\r\n" in text
+    text = text.replace(
+        "\r\nMillisecond detail\r\n", "\r\n== Millisecond detail (16 bytes) ==\r\n"
+    )
+    path = tmp_path / "extra.log"
+    with open(path, "w", encoding="utf-16-le", newline="") as file:
+        file.write(text)
+
+    assert parse_log(str(path), memory_map=False) == data
+    assert parse_log(str(path)) == data
+
+
+def test_non_ascii_description(tmp_path):
+    """
+    Test that a log with a Latin-1 character is left to the text reader
+    """
+    with open("tests/test.log", encoding="utf-16-le", newline="") as file:
+        text = file.read()
+    assert "\r\nHex Dump of Logs:\r\n" in text
+    text = text.replace("\r\nHex Dump of Logs:\r\n", "\r\nHex Dump of Logs: \u00b0\r\n")
+    path = tmp_path / "latin1.log"
+    with open(path, "w", encoding="utf-16-le", newline="") as file:
+        file.write(text)
+
+    assert read_ascii(str(path)) is None
+    assert parse_log(str(path), memory_map=False) == data
+    assert parse_log(str(path)) == data
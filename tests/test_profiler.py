@@ -0,0 +1,76 @@
+import json
+
+from blackbox_decoder.log import FlightRecord
+from blackbox_decoder.main import main
+from blackbox_decoder.parse import parse_log
+from blackbox_decoder.profiler import LISTENERS, Profiler, add_listener, remove_listener
+
+
+def test_profiler(tmp_path):
+    """
+    The stages of a decode should be collected with their rows and saved as JSON and Chrome traces
+    """
+    with Profiler() as profiler:
+        record = FlightRecord("tests/test.log")
+        frames = record.to_dataframe(0)
+    assert profiler.record not in LISTENERS
+
+    stages = profiler.summary()
+    for name in (
+        "read_utf16",
+        "scan",
+        "decode/Detail",
+        "Log",
+        "splice",
+        "to_dataframe",
+    ):
+        assert stages[name]["calls"] >= 1, name
+    assert stages["decode/Detail"]["rows"] == len(record.log.milli_detail)
+    assert stages["decode/Detail"]["bytes"] == 16 * len(record.log.milli_detail)
+    assert stages["decode/Rollup"]["calls"] == 2
+    assert stages["splice/sort"]["calls"] == 3
+    assert stages["to_dataframe"]["rows"] == sum(len(frame) for frame in frames)
+
+    # The stages of the Log constructor are nested within it
+    spans = {span.name: span for span in profiler.spans}
+    assert spans["Log"].depth == 0 and spans["decode/Detail"].depth == 1
+    assert spans["Log"].duration >= spans["decode/Detail"].duration
+
+    profile = json.loads(open(profiler.save(str(tmp_path / "profile.json"))).read())
+    assert profile["stages"]["Log"]["calls"] == 1
+    assert len(profile["spans"]) == len(profiler.spans)
+
+    trace = json.loads(open(profiler.save(str(tmp_path / "p.trace.json"))).read())
+    events = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+    assert len(events) == len(profiler.spans)
+    assert all(event["dur"] >= 0 for event in events)
+
+
+def test_listener():
+    """
+    A listener should receive every stage and nothing once removed
+    """
+    names = []
+
+    def listener(span):
+        names.append(span.name)
+
+    add_listener(listener)
+    try:
+        parse_log("tests/test.log")
+    finally:
+        remove_listener(listener)
+    assert names[-1] == "parse_log"
+    parse_log("tests/test.log")
+    assert names.count("parse_log") == 1
+
+
+def test_profile_flag(tmp_path, capsys):
+    """
+    The --profile flag should print the stages and save them
+    """
+    path = str(tmp_path / "decode.trace.json")
+    assert main(["--profile", path, "decode", "tests/test.log"]) == 0
+    assert "splice" in capsys.readouterr().err
+    with open(path) as file:
+        assert "traceEvents" in json.load(file)
@@ -0,0 +1,50 @@
+import pytest
+
+from blackbox_decoder.log import FlightRecord
+from blackbox_decoder.parse import parse_log
+from blackbox_decoder.progress import Cancelled, Progress
+
+
+def test_progress():
+    """
+    Every stage of a decode should report its progress up to completion
+    """
+    reports = []
+    record = FlightRecord(
+        "tests/test.log", progress=Progress(lambda *r: reports.append(r))
+    )
+    assert len(record) == 46
+
+    stages = [stage for stage, _ in reports]
+    assert [s for i, s in enumerate(stages) if s not in stages[:i]] == [
+        "parse",
+        "decode",
+        "splice",
+    ]
+    for stage in ["parse", "decode", "splice"]:
+        fractions = [fraction for s, fraction in reports if s == stage]
+        assert fractions == sorted(fractions)
+        assert fractions[-1] == 1.0
+
+
+@pytest.mark.parametrize("memory_map", [True, False])
+def test_parse_progress(memory_map):
+    reports = []
+    parse_log("tests/test.log", memory_map, Progress(lambda *r: reports.append(r)))
+    assert reports and all(stage == "parse" for stage, _ in reports)
+
+
+def test_cancel():
+    """
+    A cancelled decode should stop at its next progress report
+    """
+    progress = Progress()
+
+    def cancel(stage, fraction):
+        if stage == "decode":
+            progress.cancel()
+
+    progress.callback = cancel
+    with pytest.raises(Cancelled):
+        FlightRecord("tests/test.log", progress=progress)
+    assert progress.cancelled
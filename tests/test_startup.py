@@ -0,0 +1,38 @@
+import json
+import subprocess
+import sys
+
+# The seconds allowed to import the decoder, generous as importing numpy alone takes
+# tens of milliseconds on a fast machine
+STARTUP_SECONDS = 2.0
+
+# The modules the decoder must not import until they are needed
+HEAVY_MODULES = ["pandas", "matplotlib", "PyQt6", "bitstring"]
+
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import blackbox_decoder.log, blackbox_decoder.main
+seconds = time.perf_counter() - start
+record = blackbox_decoder.log.FlightRecord("tests/test.log")
+decoded = [module for module in {modules} if module in sys.modules]
+record.to_dataframe(0)
+print(json.dumps([seconds, decoded, "pandas" in sys.modules]))
+"""
+
+
+def test_startup():
+    """
+    Decoding a log should not import pandas or the GUI libraries, and should start quickly
+    """
+    output = subprocess.run(
+        [sys.executable, "-c", SCRIPT.format(modules=HEAVY_MODULES)],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    seconds, imported, dataframes = json.loads(output)
+    assert imported == []
+    # pandas is imported by the first DataFrame
+    assert dataframes
+    assert seconds < STARTUP_SECONDS, f"Importing the decoder took {seconds:.2f} s"
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from blackbox_decoder.log import Detail, FlightRecord
+from blackbox_decoder.stats import FLAGS, FlagTransitions, analog_fields
+
+
+def test_flight_stats():
+    """
+    The statistics of every flight should match a scan of its records
+    """
+    record = FlightRecord("tests/test.log", lazy=True)
+    for i in range(len(record)):
+        stats = record.stats(i)
+        detail = record.flights[i].table("milli_detail").frame_columns()
+        if len(detail["recNumb"]) == 0:
+            assert stats.sections["milli_detail"].rows == 0
+            assert stats.channel("tethVoltX10").min is None
+            continue
+
+        for key in analog_fields(Detail):
+            channel = stats.channel(key)
+            assert channel.min == pytest.approx(detail[key].min())
+            assert channel.max == pytest.approx(detail[key].max())
+            assert channel.mean == pytest.approx(detail[key].mean())
+
+        recs = detail["recNumb"]
+        for flag in FLAGS:
+            column = detail[flag].astype(int)
+            changes = np.flatnonzero(np.diff(column)) + 1
+            transitions = stats.flag(flag)
+            assert transitions.initial == column[0]
+            np.testing.assert_array_equal(transitions.recs, recs[changes])
+            np.testing.assert_array_equal(transitions.values, column[changes])
+            np.testing.assert_array_equal(
+                transitions.msecs, detail["entryTimeMsecs"][changes]
+            )
+
+
+def test_flag_transitions():
+    """
+    The lookups of a flag should follow its alternating changes
+    """
+    transitions = FlagTransitions(
+        1,
+        np.array([10, 20, 30, 40]),
+        np.array([100, 200, 300, 400]),
+        np.array([0, 1, 0, 1]),
+    )
+    assert transitions.value_at(5) == 1
+    assert transitions.value_at(10) == 0
+    assert transitions.value_at(35) == 0
+    assert transitions.next_change(0) == (10, 100)
+    assert transitions.next_change(11, value=0) == (30, 300)
+    assert transitions.next_change(11, value=1) == (20, 200)
+    assert transitions.next_change(41) is None
+    assert list(transitions.drops()) == [10, 30]
+    assert list(transitions.rises()) == [20, 40]
+    assert list(transitions.between(15, 40)) == [1, 2]
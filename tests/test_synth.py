@@ -0,0 +1,41 @@
+import datetime
+
+from blackbox_decoder.log import FlightRecord, Log
+from blackbox_decoder.parse import HEADER, parse_log
+from blackbox_decoder.synth import FIRST_REC, write_log
+
+
+def test_write_log(tmp_path):
+    """
+    A synthetic log should be decoded into its flights like a log of the powerboard
+    """
+    path = str(tmp_path / "synthetic.log")
+    rows = write_log(path, 2500, 3, drone="BV-TEST", chunk_rows=1000)
+    assert rows[HEADER[1]] == 2500
+
+    data = parse_log(path, memory_map=False)
+    assert {header: len(data[header]) for header in HEADER} == rows
+    # The timestamps are written to the second
+    assert data["Flight Time"] == datetime.timedelta(seconds=2)
+    # The memory mapped reader finds the same rows
+    assert parse_log(path) == data
+
+    log = Log(path)
+    assert len(log.milli_detail) == 2500
+    assert log.milli_detail.column("recNumb")[-1] == FIRST_REC + 2499
+    # The erased flight event is decoded like the ones of a real log
+    assert log.flight_events.column("begRecNumb")[-1] == 0xFFFFFFFF
+
+    record = FlightRecord(log)
+    assert len(record) == 3
+    assert record.get_drone_name() == "BV-TEST"
+    assert sorted(len(f.table("milli_detail")) for f in record.flights) == [
+        833,
+        833,
+        834,
+    ]
+    for i in range(len(record)):
+        rollup, detail = record.to_dataframe(i)
+        assert detail["entryTimeMsecs"].iloc[0] == 0
+        assert detail["tethVoltX10"].between(46, 50).all()
+        assert len(rollup) > 0
@@ -0,0 +1,38 @@
+from blackbox_decoder.log import Detail, Rollup, FlightInfo
+from blackbox_decoder.parse import parse_log
+from blackbox_decoder.table import LogTable
+
+import numpy as np
+
+data = parse_log("tests/test.log")
+
+
+def test_log_table():
+    """
+    Test that every record of a LogTable matches the per record classes
+    """
+    for packet, section in [
+        (Detail, "Millisecond detail"),
+        (Rollup, "Second Rollup"),
+        (FlightInfo, "Flight Events"),
+    ]:
+        table = LogTable.from_rows(packet, data[section])
+        assert len(table) == len(data[section])
+        for row, record in zip(data[section], table):
+            assert record.structure == packet(row).structure
+
+
+def test_log_table_dtypes():
+    """
+    Test that each column uses the smallest dtype that fits its field
+    """
+    table = LogTable.from_rows(Detail, data["Millisecond detail"])
+    assert table.columns["recNumb"].dtype == np.uint32
+    assert table.columns["type"].dtype == np.uint8
+    assert table.columns["tethCurrentX10"].dtype == np.int16
+    assert table.columns["outVoltX10"].dtype == np.uint16
+    assert table.nbytes == 26 * len(table)
+
+    assert table[0]["tethCurrentX10"] == 51.1
+    assert table[-1]["recNumb"] == table["recNumb"][-1]
+    assert table["outVoltX10"][0] == 153.6